@@ -0,0 +1,206 @@
+"""
+Local algod stand-in for load testing without touching testnet
+"""
+
+import argparse
+import base64
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import msgpack
+from confirmation import block_transaction_ids
+
+GENESIS_ID = "standin-v1"
+GENESIS_HASH = b"\x00" * 32
+MIN_FEE = 1000
+MAX_TXNS_PER_BLOCK = 10000
+
+class StandinLedger:
+    """In-memory transaction pool and block history"""
+    
+    def __init__(self, block_time=1.0, max_txns_per_block=MAX_TXNS_PER_BLOCK, history=1000):
+        self.block_time = block_time
+        self.max_txns_per_block = max_txns_per_block
+        self.history = history
+        self.round = 1
+        self.next_app_id = 1000
+        self.last_round_at = time.time()
+        self.pool = []
+        # An empty first block, so block readers registered at round 1 find it
+        self.blocks = {1: {'gh': GENESIS_HASH, 'gen': GENESIS_ID, 'txns': []}}
+        self.confirmed = {}
+        self.condition = threading.Condition()
+        self.stats = {'submitted': 0, 'rejected': 0, 'confirmed': 0, 'blocks': 0}
+    
+    def submit(self, signed_txns):
+        """Add signed transaction dicts to the pool and return their ids"""
+        tx_ids = [tx_id for tx_id, _ in block_transaction_ids({'txns': signed_txns})]
+        with self.condition:
+            self.pool.extend(zip(tx_ids, signed_txns))
+            self.stats['submitted'] += len(signed_txns)
+        return tx_ids
+    
+    def produce_blocks(self, stop_event):
+        while not stop_event.wait(self.block_time):
+            with self.condition:
+                batch = self.pool[:self.max_txns_per_block]
+                del self.pool[:len(batch)]
+                self.round += 1
+                self.last_round_at = time.time()
+                txns = [stxn for _, stxn in batch]
+                for stxn in txns:
+                    # App creations get an id in the block's apply data, as on a real node
+                    if stxn['txn'].get('type') == 'appl' and not stxn['txn'].get('apid'):
+                        self.next_app_id += 1
+                        stxn['apid'] = self.next_app_id
+                self.blocks[self.round] = {'gh': GENESIS_HASH, 'gen': GENESIS_ID, 'txns': txns}
+                for tx_id, _ in batch:
+                    self.confirmed[tx_id] = self.round
+                self.blocks.pop(self.round - self.history, None)
+                self.stats['confirmed'] += len(batch)
+                self.stats['blocks'] += 1
+                self.condition.notify_all()
+    
+    def status(self):
+        return {
+            'last-round': self.round,
+            'time-since-last-round': int((time.time() - self.last_round_at) * 1e9),
+            'catchup-time': 0,
+            'last-version': 'standin'
+        }
+    
+    def wait_for_block_after(self, round_number, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.round > round_number, timeout=timeout)
+            return self.status()
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ledger = None
+    latency = 0.0
+    read_latency = 0.0
+    error_rate = 0.0
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _reply(self, status, body, content_type="application/json"):
+        if content_type == "application/json":
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        path = urlparse(self.path).path
+        ledger = self.ledger
+        
+        if self.read_latency:
+            time.sleep(self.read_latency)
+        if path == "/v2/status":
+            return self._reply(200, ledger.status())
+        if path == "/v2/transactions/params":
+            return self._reply(200, {
+                'consensus-version': 'standin', 'fee': 0, 'min-fee': MIN_FEE,
+                'genesis-hash': base64.b64encode(GENESIS_HASH).decode(),
+                'genesis-id': GENESIS_ID, 'last-round': ledger.round
+            })
+        if path == "/stats":
+            return self._reply(200, dict(ledger.stats, round=ledger.round, pool=len(ledger.pool)))
+        
+        match = re.fullmatch(r"/v2/status/wait-for-block-after/(\d+)", path)
+        if match:
+            return self._reply(200, ledger.wait_for_block_after(int(match.group(1)), ledger.block_time * 2))
+        
+        match = re.fullmatch(r"/v2/transactions/pending/(\w+)", path)
+        if match:
+            return self._reply(200, {'pool-error': '', 'confirmed-round': ledger.confirmed.get(match.group(1), 0)})
+        
+        match = re.fullmatch(r"/v2/blocks/(\d+)", path)
+        if match:
+            block = ledger.blocks.get(int(match.group(1)))
+            if block is None:
+                return self._reply(404, {'message': 'block not available'})
+            return self._reply(200, msgpack.packb({'block': block}, use_bin_type=True), "application/msgpack")
+        
+        self._reply(404, {'message': f'unknown path {path}'})
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if urlparse(self.path).path != "/v2/transactions":
+            return self._reply(404, {'message': 'unknown path'})
+        
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            self.ledger.stats['rejected'] += 1
+            return self._reply(503, {'message': 'injected failure'})
+        
+        try:
+            unpacker = msgpack.Unpacker(raw=False)
+            unpacker.feed(body)
+            signed_txns = list(unpacker)
+        except Exception as e:
+            self.ledger.stats['rejected'] += 1
+            return self._reply(400, {'message': f'could not decode transactions: {e}'})
+        
+        tx_ids = self.ledger.submit(signed_txns)
+        self._reply(200, {'txId': tx_ids[0]})
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 resets connections from concurrent submitters
+    request_queue_size = 128
+
+def _build(port, block_time, latency, error_rate, read_latency):
+    ledger = StandinLedger(block_time)
+    handler = type("Handler", (StandinHandler,), {
+        'ledger': ledger, 'latency': latency, 'read_latency': read_latency, 'error_rate': error_rate
+    })
+    server = StandinServer(("127.0.0.1", port), handler)
+    
+    stop_event = threading.Event()
+    threading.Thread(target=ledger.produce_blocks, args=(stop_event,), daemon=True).start()
+    return server, stop_event
+
+def serve(port=0, block_time=1.0, latency=0.0, error_rate=0.0, ready=None, read_latency=0.0):
+    """Run the stand-in until interrupted; ready(port) is called once it is listening"""
+    server, stop_event = _build(port, block_time, latency, error_rate, read_latency)
+    if ready:
+        ready(server.server_address[1])
+    try:
+        server.serve_forever()
+    finally:
+        stop_event.set()
+        server.server_close()
+
+def start(port=0, block_time=1.0, latency=0.0, error_rate=0.0, read_latency=0.0):
+    """Run a stand-in on a background thread; returns its URL and a function that stops it"""
+    server, stop_event = _build(port, block_time, latency, error_rate, read_latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    def stop():
+        stop_event.set()
+        server.shutdown()
+        server.server_close()
+    
+    return f"http://127.0.0.1:{server.server_address[1]}", stop
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--port", type=int, default=4001)
+    parser.add_argument("--block-time", type=float, default=1.0, help="Seconds between blocks")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added delay per submission")
+    parser.add_argument("--read-latency-ms", type=float, default=0, help="Added delay per read")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of submissions rejected with 503")
+    args = parser.parse_args()
+    
+    serve(args.port, args.block_time, args.latency_ms / 1000, args.error_rate,
+          ready=lambda port: print(f"algod stand-in listening on http://127.0.0.1:{port}"),
+          read_latency=args.read_latency_ms / 1000)
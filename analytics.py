@@ -2,16 +2,34 @@
 Analytics module for voting contract data
 """
 
-import matplotlib.pyplot as plt
-import pandas as pd
+import os
+import sqlite3
 from datetime import datetime, timedelta
 from schema import VotingDatabase
 from logger import setup_logger
+from config import COLUMNAR_DIR
 
 class VotingAnalytics:
-    def __init__(self):
+    def __init__(self, db_path="voting_data.db"):
         self.logger = setup_logger("analytics")
-        self.db = VotingDatabase()
+        self.db = VotingDatabase(db_path)
+    
+    def tally_votes(self, proposal_id):
+        """Count votes per option for a proposal in one aggregate query"""
+        try:
+            conn = sqlite3.connect(self.db.db_path)
+            rows = conn.execute('''
+                SELECT vote_option, COUNT(*) FROM votes
+                WHERE proposal_id = ? GROUP BY vote_option
+            ''', (proposal_id,)).fetchall()
+            conn.close()
+            
+            tally = {'yes': 0, 'no': 0, 'abstain': 0}
+            tally.update(rows)
+            return tally
+        except Exception as e:
+            self.logger.error(f"Vote tally failed: {e}")
+            return None
     
     def generate_vote_summary(self, proposal_id):
         """Generate vote summary for a proposal"""
@@ -42,6 +60,9 @@ class VotingAnalytics:
     def create_vote_chart(self, proposal_id):
         """Create pie chart for vote distribution"""
         try:
+            # matplotlib takes longer to import than the rest of the module, so load it on demand
+            import matplotlib.pyplot as plt
+            
             summary = self.generate_vote_summary(proposal_id)
             if not summary:
                 return None
@@ -83,6 +104,57 @@ class VotingAnalytics:
             self.logger.error(f"Trend analysis failed: {e}")
             return None
 
+    def load_columnar(self, name='votes', columns=None, proposal_id=None, since=None, until=None,
+                      export_dir=COLUMNAR_DIR):
+        """Read an exported Parquet dataset, scanning only the given columns and matching partitions"""
+        # pyarrow is optional and only needed for columnar analyses
+        import pyarrow.parquet as pq
+        from columnar_export import PROPOSALS_FILE, dataset_partitioning
+        
+        filters = []
+        if proposal_id is not None:
+            filters.append(('proposal_id', '=', proposal_id))
+        if since:
+            filters.append(('date', '>=', str(since)))
+        if until:
+            filters.append(('date', '<=', str(until)))
+        
+        path = os.path.join(export_dir, PROPOSALS_FILE if name == 'proposals' else name)
+        return pq.read_table(
+            path, columns=columns, filters=filters or None,
+            partitioning=dataset_partitioning(name), memory_map=True
+        )
+    
+    def daily_vote_history(self, proposal_id=None, since=None, until=None):
+        """Votes per day from the exported rollups"""
+        try:
+            rollup = self.load_columnar('daily_votes', ['date', 'votes'], proposal_id, since, until)
+            daily = rollup.group_by('date').aggregate([('votes', 'sum')]).sort_by('date')
+            
+            history = {
+                'dates': daily['date'].to_pylist(),
+                'daily_votes': daily['votes_sum'].to_pylist()
+            }
+            self.logger.info(f"Loaded {len(history['dates'])} days of vote history")
+            return history
+        except Exception as e:
+            self.logger.error(f"Vote history failed: {e}")
+            return None
+    
+    def participation(self, proposal_id, since=None, until=None):
+        """Vote and unique voter counts for a proposal from the exported votes"""
+        try:
+            import pyarrow.compute as pc
+            
+            voters = self.load_columnar('votes', ['voter_address'], proposal_id, since, until)['voter_address']
+            return {
+                'total_votes': len(voters),
+                'unique_voters': pc.count_distinct(voters).as_py()
+            }
+        except Exception as e:
+            self.logger.error(f"Participation analysis failed: {e}")
+            return None
+
 if __name__ == "__main__":
     analytics = VotingAnalytics()
     summary = analytics.generate_vote_summary(1)
@@ -2,30 +2,96 @@
 API handler for voting contract interactions
 """
 
-from flask import Flask, request, jsonify
-from algosdk.v2client import algod
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, stream_with_context
+from algosdk import encoding, transaction
+from algosdk.error import AlgodHTTPError
 from utils import validate_address, VotingUtils
 from logger import setup_logger
+from config import (
+    ContractConfig, PROPOSALS_PAGE_SIZE, PROPOSALS_MAX_PAGE_SIZE,
+    VOTE_BATCH_MAX_SIZE, VOTE_BATCH_SUBMIT_WORKERS, EXPORT_PAGE_SIZE
+)
+from rate_limiter import rate_limiter
+from metrics import PerformanceMetrics
+from schema import VotingDatabase
+from validation import InputValidator
+from concurrent.futures import ThreadPoolExecutor
+import base64
 import json
+import threading
 
-app = Flask(__name__)
+bp = Blueprint('api', __name__)
 logger = setup_logger("api")
+validator = InputValidator()
+submit_pool = ThreadPoolExecutor(max_workers=VOTE_BATCH_SUBMIT_WORKERS)
+row_encoder = json.JSONEncoder(separators=(',', ':'))
 
-@app.route('/api/proposals', methods=['GET'])
+# Built in the process that first needs them, so preforked workers never inherit the parent's
+RESOURCE_FACTORIES = {'algod_client': lambda: ContractConfig().algod_client(), 'db': VotingDatabase}
+resources_lock = threading.Lock()
+
+def _resource(name):
+    """The app's algod client or database, created on first use unless create_app was given one"""
+    extensions = current_app.extensions
+    if extensions.get(name) is None:
+        with resources_lock:
+            if extensions.get(name) is None:
+                extensions[name] = RESOURCE_FACTORIES[name]()
+    return extensions[name]
+
+def encode_cursor(position):
+    """Opaque page cursor carrying the last id and the filters it belongs to"""
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a page cursor, returning None if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(raw)
+        return position if isinstance(position, dict) and isinstance(position.get('after'), int) else None
+    except ValueError:
+        return None
+
+@bp.route('/api/proposals', methods=['GET'])
 def get_proposals():
-    """Get all active proposals"""
+    """Get one page of proposals, optionally filtered by status or creator"""
     try:
-        # Mock data for now
-        proposals = [
-            {"id": 1, "title": "Upgrade Protocol", "status": "active"},
-            {"id": 2, "title": "Change Governance", "status": "closed"}
-        ]
-        return jsonify({"proposals": proposals})
+        status = request.args.get('status')
+        creator = request.args.get('creator')
+        order = request.args.get('order', 'desc')
+        if order not in ('asc', 'desc'):
+            return jsonify({"error": "order must be 'asc' or 'desc'"}), 400
+        
+        try:
+            limit = int(request.args.get('limit', PROPOSALS_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, PROPOSALS_MAX_PAGE_SIZE))
+        
+        filters = {'status': status, 'creator': creator, 'order': order}
+        after_id = None
+        cursor = request.args.get('cursor')
+        if cursor:
+            position = decode_cursor(cursor)
+            # A cursor only continues the listing it was issued for
+            if position is None or {key: position.get(key) for key in filters} != filters:
+                return jsonify({"error": "Invalid cursor"}), 400
+            after_id = position['after']
+        
+        # One extra row tells us whether another page exists without a COUNT
+        proposals = _resource('db').list_proposals(status, creator, after_id, order == 'desc', limit + 1)
+        next_cursor = None
+        if len(proposals) > limit:
+            proposals = proposals[:limit]
+            next_cursor = encode_cursor(dict(filters, after=proposals[-1]['id']))
+        
+        return jsonify({"proposals": proposals, "next_cursor": next_cursor})
     except Exception as e:
         logger.error(f"Error fetching proposals: {e}")
         return jsonify({"error": "Failed to fetch proposals"}), 500
 
-@app.route('/api/vote', methods=['POST'])
+@bp.route('/api/vote', methods=['POST'])
 def cast_vote():
     """Cast a vote via API"""
     try:
@@ -36,12 +102,30 @@ def cast_vote():
         
         if not VotingUtils.validate_vote_option(vote_option):
             return jsonify({"error": "Invalid vote option"}), 400
-            
+        
         if not validate_address(voter_address):
             return jsonify({"error": "Invalid address"}), 400
         
-        # Process vote (mock for now)
-        result = {"tx_id": "mock_tx_123", "status": "success"}
+        # A client-signed transaction is relayed to algod, so it must be exactly the stated vote
+        signed_txn = data.get('signed_txn')
+        if signed_txn:
+            _, error = _decode_vote_txn(data)
+            if error:
+                return jsonify({"error": error}), 400
+        
+        if not current_app.extensions['rate_limiter'].is_allowed(voter_address, 'vote'):
+            return jsonify({"error": "Rate limit exceeded"}), 429
+        
+        if signed_txn:
+            try:
+                tx_id = _resource('algod_client').send_raw_transaction(signed_txn)
+            except AlgodHTTPError as e:
+                logger.error(f"algod rejected vote from {voter_address}: {e}")
+                return jsonify({"error": "Transaction rejected by node"}), 502
+            result = {"tx_id": tx_id, "status": "submitted"}
+        else:
+            # Process vote (mock for now)
+            result = {"tx_id": "mock_tx_123", "status": "success"}
         logger.info(f"Vote cast: {vote_option} by {voter_address}")
         
         return jsonify(result)
@@ -49,5 +133,186 @@ def cast_vote():
         logger.error(f"Error casting vote: {e}")
         return jsonify({"error": "Failed to cast vote"}), 500
 
+def _proposal_app_id(proposal_id, app_ids):
+    """App id of a proposal, looked up once per request"""
+    try:
+        proposal_id = int(proposal_id)
+    except (TypeError, ValueError):
+        return None
+    if proposal_id not in app_ids:
+        app_ids[proposal_id] = _resource('db').get_proposal_app_id(proposal_id)
+    return app_ids[proposal_id]
+
+def _decode_vote_txn(item, app_ids=None):
+    """Decode an item's signed vote transaction, returning (signed_txn, error)
+    
+    Only a NoOp call of the proposal's app from the voter with the args
+    ['vote', option] is accepted, so nothing else can be relayed.
+    """
+    try:
+        signed_txn = encoding.msgpack_decode(item['signed_txn'])
+        txn = signed_txn.transaction
+    except Exception:
+        return None, "Invalid signed transaction"
+    
+    if not isinstance(txn, transaction.ApplicationCallTxn) or txn.on_complete != transaction.OnComplete.NoOpOC:
+        return signed_txn, "Transaction is not a vote call"
+    if txn.sender != item.get('voter_address'):
+        return signed_txn, "Transaction sender does not match voter"
+    args = [arg.decode() if isinstance(arg, bytes) else arg for arg in (txn.app_args or [])]
+    if args != ['vote', str(item.get('vote_option')).lower()]:
+        return signed_txn, "Transaction does not cast the stated vote"
+    
+    app_id = _proposal_app_id(item.get('proposal_id'), {} if app_ids is None else app_ids)
+    if app_id is None:
+        return signed_txn, "Unknown proposal"
+    if txn.index != app_id:
+        return signed_txn, "Transaction does not vote on the stated proposal"
+    return signed_txn, None
+
+def _send(algod_client, signed_txns):
+    """Send one transaction or atomic group, returning (tx_ids, error)"""
+    try:
+        algod_client.send_transactions(signed_txns)
+        return [signed_txn.get_txid() for signed_txn in signed_txns], None
+    except AlgodHTTPError as e:
+        return None, str(e)
+
+@bp.route('/api/votes/batch', methods=['POST'])
+def cast_votes_batch():
+    """Cast many pre-signed votes in one request with a result per item"""
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('votes')
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Expected a non-empty 'votes' list"}), 400
+        if len(items) > VOTE_BATCH_MAX_SIZE:
+            return jsonify({"error": f"At most {VOTE_BATCH_MAX_SIZE} votes per batch"}), 413
+        if not all(isinstance(item, dict) and item.get('signed_txn') for item in items):
+            return jsonify({"error": "Every vote needs a signed_txn"}), 400
+        
+        results = [{'index': index} for index in range(len(items))]
+        
+        # Field validation for the whole batch in one pass
+        _, errors = validator.validate_batch(items, 'vote')
+        for error in errors:
+            results[error['row']].setdefault('error', f"{error['field']}: {error['error']}")
+        
+        # Transactions a client grouped must be submitted together, so bucket them by group id
+        units = {}
+        app_ids = {}
+        for index, item in enumerate(items):
+            signed_txn, error = _decode_vote_txn(item, app_ids)
+            if error:
+                results[index].setdefault('error', error)
+            group = signed_txn.transaction.group if signed_txn else None
+            units.setdefault(group or index, []).append((index, signed_txn))
+        
+        limiter = current_app.extensions['rate_limiter']
+        algod_client = _resource('algod_client')
+        submissions = []
+        for members in units.values():
+            # A group with an invalid member would fail on chain, so none of it is sent
+            if any('error' in results[index] for index, _ in members):
+                for index, _ in members:
+                    if 'error' in results[index]:
+                        results[index]['status'] = 'invalid'
+                    else:
+                        results[index].update(status='rejected', error="Another vote in its group is invalid")
+                continue
+            
+            # The whole group's quota is reserved in one step, so concurrent batches cannot both
+            # pass; nothing is taken when a member is over its limit
+            voters = [items[index]['voter_address'] for index, _ in members]
+            allowed = limiter.reserve_all(voters, 'vote')
+            if not all(allowed):
+                for (index, _), ok in zip(members, allowed):
+                    if ok:
+                        results[index].update(status='rejected', error="Another vote in its group is rate limited")
+                    else:
+                        results[index].update(status='rate_limited', error="Rate limit exceeded")
+                continue
+            
+            submissions.append((members, submit_pool.submit(_send, algod_client, [signed_txn for _, signed_txn in members])))
+        
+        for members, future in submissions:
+            tx_ids, error = future.result()
+            if error:
+                # Votes algod refused give their reservation back
+                for index, _ in members:
+                    limiter.refund(items[index]['voter_address'], 'vote')
+            for position, (index, _) in enumerate(members):
+                if error:
+                    results[index].update(status='rejected', error=error)
+                else:
+                    results[index].update(status='submitted', tx_id=tx_ids[position])
+        
+        submitted = sum(result['status'] == 'submitted' for result in results)
+        logger.info(f"Vote batch: {submitted}/{len(items)} submitted")
+        return jsonify({"results": results, "submitted": submitted})
+    except Exception as e:
+        logger.error(f"Error casting vote batch: {e}")
+        return jsonify({"error": "Failed to cast votes"}), 500
+
+@bp.route('/api/export/<table>', methods=['GET'])
+def export_rows(table):
+    """Stream votes or transactions as NDJSON, filtered by proposal and confirmed round range"""
+    if table not in ('votes', 'transactions'):
+        return jsonify({"error": "Unknown export"}), 404
+    
+    filters = {}
+    for name in ('proposal_id', 'min_round', 'max_round', 'after_id'):
+        value = request.args.get(name)
+        if value is None:
+            continue
+        try:
+            filters[name] = int(value)
+        except ValueError:
+            return jsonify({"error": f"{name} must be an integer"}), 400
+    
+    db = _resource('db')
+    
+    def generate():
+        exported = 0
+        try:
+            # One chunk per keyset page keeps server memory flat however large the export
+            for columns, rows in db.iter_export_pages(table, page_size=EXPORT_PAGE_SIZE, **filters):
+                exported += len(rows)
+                yield ''.join([row_encoder.encode(dict(zip(columns, row))) + '\n' for row in rows])
+        except Exception as e:
+            # Headers are already sent; aborting the stream tells the client it is incomplete
+            logger.error(f"Export of {table} failed after {exported} rows: {e}")
+            raise
+        logger.info(f"Exported {exported} {table} rows")
+    
+    # Resume an interrupted download by passing the last id received as after_id
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@bp.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request and transaction counters (summed across workers when served by serve.py)"""
+    return jsonify(current_app.extensions['metrics'].counters.snapshot())
+
+def create_app(limiter=None, metrics=None, algod_client=None, db=None):
+    """Build the API application; serve.py passes shared-memory state for multi-worker serving
+    
+    Without algod_client or db, each process opens its own on first use.
+    """
+    app = Flask(__name__)
+    app.extensions['rate_limiter'] = limiter or rate_limiter
+    app.extensions['metrics'] = metrics = metrics or PerformanceMetrics()
+    app.extensions['algod_client'] = algod_client
+    app.extensions['db'] = db
+    app.register_blueprint(bp)
+    
+    @app.after_request
+    def count_request(response):
+        metrics.record_request(response.status_code)
+        return response
+    
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
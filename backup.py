@@ -2,65 +2,217 @@
 Backup utility for voting contract data
 """
 
+import gzip
+import hashlib
 import json
 import os
+import sqlite3
 from datetime import datetime
-from algosdk.v2client import algod
 from schema import VotingDatabase
 from logger import setup_logger
+from config import BACKUP_DIR, BACKUP_CHUNK_ROWS
+
+BACKUP_TABLES = ["proposals", "votes", "transactions"]
+MANIFEST_FILE = "manifest.json"
+WATERMARK_FILE = "watermarks.json"
+ROW_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+def file_checksum(path):
+    """SHA-256 of a file, read in blocks so large files use constant memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
 class DataBackup:
-    def __init__(self):
+    def __init__(self, db_path="voting_data.db", backup_dir=BACKUP_DIR, chunk_rows=BACKUP_CHUNK_ROWS):
         self.logger = setup_logger("backup")
-        self.db = VotingDatabase()
+        self.db = VotingDatabase(db_path)
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.chunk_rows = chunk_rows
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        # In WAL mode readers never block writers, so backups can run online
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+    
+    def _new_backup_dir(self):
+        path = os.path.join(self.backup_dir, datetime.now().strftime('%Y%m%d_%H%M%S_%f'))
+        os.makedirs(path, exist_ok=True)
+        return path
+    
+    def load_watermarks(self):
+        """Get the last exported rowid per table"""
+        path = os.path.join(self.backup_dir, WATERMARK_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+    
+    def _save_watermarks(self, watermarks):
+        path = os.path.join(self.backup_dir, WATERMARK_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(watermarks, f)
+        os.replace(path + '.tmp', path)
+    
+    def snapshot_database(self, target_dir, source=None):
+        """Copy the live database with SQLite's online backup API
         
-    def backup_proposals(self):
-        """Backup all proposals to JSON"""
+        A source connection inside a read transaction is copied as of that
+        transaction's snapshot.
+        """
+        target = os.path.join(target_dir, os.path.basename(self.db_path))
+        own_source = source is None
+        source = source or self._connect()
+        destination = sqlite3.connect(target)
         try:
-            # Mock backup data
-            proposals = [
-                {"id": 1, "title": "Test Proposal", "created": str(datetime.now())},
-                {"id": 2, "title": "Another Proposal", "created": str(datetime.now())}
-            ]
-            
-            backup_file = f"backups/proposals_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            os.makedirs("backups", exist_ok=True)
-            
-            with open(backup_file, 'w') as f:
-                json.dump(proposals, f, indent=2)
+            # A single step copies from one read snapshot; under WAL writers keep going
+            source.backup(destination)
+        finally:
+            destination.close()
+            if own_source:
+                source.close()
+        
+        self.logger.info(f"Database snapshot written to {target}")
+        return {
+            'file': os.path.basename(target),
+            'size': os.path.getsize(target),
+            'sha256': file_checksum(target)
+        }
+    
+    def table_schema(self, conn, tables):
+        """CREATE statements of the exported tables and their indexes, tables first"""
+        placeholders = ', '.join('?' * len(tables))
+        rows = conn.execute(f'''
+            SELECT type, name, sql FROM sqlite_master
+            WHERE tbl_name IN ({placeholders}) AND type IN ('table', 'index') AND sql IS NOT NULL
+            ORDER BY type = 'index', rowid
+        ''', tables).fetchall()
+        return [{'type': kind, 'name': name, 'sql': sql} for kind, name, sql in rows]
+    
+    def export_table(self, conn, table, target_dir, since_id=0):
+        """Stream rows past since_id into gzip NDJSON chunks"""
+        cursor = conn.execute(f'SELECT * FROM {table} WHERE id > ? ORDER BY id', (since_id,))
+        columns = [column[0] for column in cursor.description]
+        id_index = columns.index('id')
+        
+        entry = {'columns': columns, 'since_id': since_id, 'last_id': since_id, 'rows': 0, 'chunks': []}
+        chunk_file = None
+        chunk = None
+        
+        def close_chunk():
+            chunk_file.close()
+            chunk['sha256'] = file_checksum(os.path.join(target_dir, chunk['file']))
+            entry['chunks'].append(chunk)
+        
+        encode = ROW_ENCODER.encode
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
             
-            self.logger.info(f"Proposals backed up to {backup_file}")
-            return backup_file
+            while rows:
+                if chunk is None or chunk['rows'] >= self.chunk_rows:
+                    if chunk is not None:
+                        close_chunk()
+                    chunk = {
+                        'file': f"{table}_{len(entry['chunks']) + 1:05d}.ndjson.gz",
+                        'rows': 0,
+                        'first_id': rows[0][id_index]
+                    }
+                    chunk_file = gzip.open(
+                        os.path.join(target_dir, chunk['file']), 'wt', encoding='utf-8', compresslevel=6
+                    )
+                
+                # Write up to the chunk boundary in one call
+                batch = rows[:self.chunk_rows - chunk['rows']]
+                rows = rows[len(batch):]
+                chunk_file.write(''.join([encode(row) + '\n' for row in batch]))
+                chunk['rows'] += len(batch)
+                chunk['last_id'] = batch[-1][id_index]
+                entry['rows'] += len(batch)
+                entry['last_id'] = batch[-1][id_index]
+        
+        if chunk is not None:
+            close_chunk()
+        
+        self.logger.info(f"Exported {entry['rows']} {table} rows in {len(entry['chunks'])} chunks")
+        return entry
+    
+    def run_backup(self, tables=None, incremental=True, snapshot=False):
+        """Export tables (and optionally snapshot the database) with a checksummed manifest"""
+        tables = tables or BACKUP_TABLES
+        target_dir = self._new_backup_dir()
+        watermarks = self.load_watermarks() if incremental else {}
+        
+        manifest = {
+            'created_at': datetime.now().isoformat(),
+            'database': os.path.basename(self.db_path),
+            'type': 'incremental' if incremental else 'full',
+            'snapshot': None,
+            'tables': {}
+        }
+        
+        conn = self._connect()
+        try:
+            # One read transaction gives the snapshot and every table the same point-in-time view;
+            # BEGIN is deferred, so the first read is what pins it
+            conn.execute('BEGIN')
+            conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+            if snapshot:
+                manifest['snapshot'] = self.snapshot_database(target_dir, source=conn)
+            # Restore recreates tables from this, so rows keep every column SELECT * exported
+            manifest['schema'] = self.table_schema(conn, tables)
+            for table in tables:
+                manifest['tables'][table] = self.export_table(
+                    conn, table, target_dir, since_id=watermarks.get(table, 0)
+                )
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        
+        manifest_path = os.path.join(target_dir, MANIFEST_FILE)
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        
+        # Watermarks only advance once the manifest is durable
+        for table, entry in manifest['tables'].items():
+            watermarks[table] = entry['last_id']
+        self._save_watermarks(watermarks)
+        
+        self.logger.info(f"Backup manifest written to {manifest_path}")
+        return manifest_path
+    
+    def backup_proposals(self):
+        """Back up new proposals since the last backup"""
+        try:
+            return self.run_backup(tables=["proposals"])
         except Exception as e:
             self.logger.error(f"Backup failed: {e}")
             return None
     
     def backup_votes(self):
-        """Backup all votes to JSON"""
+        """Back up new votes since the last backup"""
         try:
-            votes = [
-                {"proposal_id": 1, "voter": "ADDR123", "option": "yes", "timestamp": str(datetime.now())},
-                {"proposal_id": 1, "voter": "ADDR456", "option": "no", "timestamp": str(datetime.now())}
-            ]
-            
-            backup_file = f"backups/votes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            
-            with open(backup_file, 'w') as f:
-                json.dump(votes, f, indent=2)
-            
-            self.logger.info(f"Votes backed up to {backup_file}")
-            return backup_file
+            return self.run_backup(tables=["votes"])
         except Exception as e:
             self.logger.error(f"Vote backup failed: {e}")
             return None
     
-    def full_backup(self):
+    def full_backup(self, incremental=False):
         """Perform full system backup"""
         self.logger.info("Starting full backup...")
-        self.backup_proposals()
-        self.backup_votes()
-        self.logger.info("Full backup completed")
+        try:
+            manifest_path = self.run_backup(incremental=incremental, snapshot=True)
+            self.logger.info("Full backup completed")
+            return manifest_path
+        except Exception as e:
+            self.logger.error(f"Full backup failed: {e}")
+            return None
 
 if __name__ == "__main__":
     backup = DataBackup()
-    backup.full_backup()
\ No newline at end of file
+    backup.full_backup()
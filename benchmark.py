@@ -0,0 +1,250 @@
+"""
+Offline micro-benchmarks for the voting contract hot paths
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BASELINE_FILE = "benchmark_baseline.json"
+REGRESSION_THRESHOLD = 0.10  # Relative slowdown that counts as a regression
+NOISE_FACTOR = 3  # ...and only if it also exceeds this many median absolute deviations
+
+BENCHMARKS = {}
+
+def benchmark(name, ops):
+    """Register a benchmark setup function
+    
+    The setup function receives a scratch directory and returns a callable;
+    each call of that callable performs `ops` operations.
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = (setup, ops)
+        return setup
+    return decorator
+
+def _addresses(count):
+    from algosdk import account
+    return [account.generate_account()[1] for _ in range(count)]
+
+@benchmark("rate_limiter.is_allowed_contended", ops=8 * 500)
+def bench_rate_limiter(workdir):
+    from rate_limiter import RateLimiter
+    
+    def run():
+        limiter = RateLimiter()
+        barrier = threading.Barrier(8)
+        
+        def worker(worker_id):
+            barrier.wait()
+            for i in range(500):
+                limiter.is_allowed(f"user{worker_id}_{i % 50}", 'api_call')
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return run
+
+@benchmark("validation.validate_algorand_address", ops=1000)
+def bench_validate_address(workdir):
+    from validation import InputValidator
+    validator = InputValidator()
+    addresses = _addresses(1000)
+    return lambda: [validator.validate_algorand_address(address) for address in addresses]
+
+@benchmark("validation.validate_proposal_description", ops=1000)
+def bench_validate_description(workdir):
+    from validation import InputValidator
+    validator = InputValidator()
+    description = "Upgrade the protocol treasury allocation for the next quarter. " * 8
+    return lambda: [validator.validate_proposal_description(description) for _ in range(1000)]
+
+@benchmark("validation.validate_batch_votes", ops=1000)
+def bench_validate_batch(workdir):
+    from validation import InputValidator
+    validator = InputValidator()
+    records = [
+        {'voter_address': address, 'vote_option': 'yes', 'proposal_id': '1'}
+        for address in _addresses(1000)
+    ]
+    return lambda: validator.validate_batch(records, 'vote')
+
+@benchmark("schema.record_vote", ops=100)
+def bench_record_vote(workdir):
+    from schema import VotingDatabase
+    db = VotingDatabase(os.path.join(workdir, "record_vote.db"))
+    addresses = _addresses(100)
+    return lambda: [db.record_vote(1, address, 'yes', None) for address in addresses]
+
+@benchmark("schema.get_proposal_app_id", ops=1000)
+def bench_get_proposal(workdir):
+    from schema import VotingDatabase
+    db = VotingDatabase(os.path.join(workdir, "get_proposal.db"))
+    for i in range(100):
+        db.add_proposal(1000 + i, f"Proposal {i}", "creator", None)
+    return lambda: [db.get_proposal_app_id(i % 100 + 1) for i in range(1000)]
+
+@benchmark("analytics.tally_votes", ops=1)
+def bench_tally(workdir):
+    import sqlite3
+    from analytics import VotingAnalytics
+    path = os.path.join(workdir, "tally.db")
+    analytics = VotingAnalytics(path)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO votes (proposal_id, voter_address, vote_option) VALUES (?, ?, ?)',
+        ((i % 10, f"voter{i}", ('yes', 'no', 'abstain')[i % 3]) for i in range(100000))
+    )
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_votes_proposal ON votes(proposal_id)')
+    conn.commit()
+    conn.close()
+    return lambda: analytics.tally_votes(3)
+
+@benchmark("contract.compile_teal", ops=1)
+def bench_compile_teal(workdir):
+    from pyteal import compileTeal, Mode
+    from voting_contract import voting_contract
+    return lambda: compileTeal(voting_contract(), Mode.Application, version=8)
+
+@benchmark("security.generate_vote_token", ops=1000)
+def bench_generate_token(workdir):
+    from security import SecurityManager
+    manager = SecurityManager(secret_key="benchmark")
+    addresses = _addresses(100)
+    return lambda: [manager.generate_vote_token(addresses[i % 100], 1) for i in range(1000)]
+
+@benchmark("security.verify_many", ops=1000)
+def bench_verify_tokens(workdir):
+    from security import SecurityManager, ReplayCache
+    manager = SecurityManager(secret_key="benchmark")
+    addresses = _addresses(100)
+    items = [(manager.generate_vote_token(addresses[i % 100], i), addresses[i % 100], i) for i in range(1000)]
+    
+    def run():
+        # A fresh replay cache per call so every token is accepted
+        manager.replay_cache = ReplayCache()
+        manager.verify_many(items)
+    return run
+
+def _vote_calls(count):
+    import base64
+    from algosdk import transaction
+    from config import VALID_VOTE_OPTIONS
+    params = transaction.SuggestedParams(1000, 1000, 2000, base64.b64encode(bytes(32)).decode(), flat_fee=True)
+    return params, [(address, VALID_VOTE_OPTIONS[i % 3]) for i, address in enumerate(_addresses(count))]
+
+@benchmark("vote_txn.algosdk_encode", ops=1000)
+def bench_algosdk_encode(workdir):
+    from algosdk import encoding, transaction
+    params, votes = _vote_calls(1000)
+    return lambda: [encoding.msgpack_encode(transaction.ApplicationCallTxn(
+        sender, params, 1, transaction.OnComplete.NoOpOC, app_args=["vote", option]
+    )) for sender, option in votes]
+
+@benchmark("vote_txn.template_encode", ops=1000)
+def bench_template_encode(workdir):
+    from txn_templates import VoteTxnTemplate
+    params, votes = _vote_calls(1000)
+    template = VoteTxnTemplate(1, params)
+    return lambda: [template.encode(sender, option) for sender, option in votes]
+
+def measure(fn, ops, repeats, min_time=0.05):
+    """Time fn and return per-operation nanoseconds for each repeat"""
+    fn()  # Warm caches and lazy imports
+    
+    # Loop enough calls per repeat that short benchmarks rise above timer noise
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - started >= min_time or loops >= 1000:
+            break
+        loops *= 2
+    
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - started) * 1e9 / (loops * ops))
+    return samples
+
+def summarize(samples):
+    median = statistics.median(samples)
+    mad = statistics.median(abs(sample - median) for sample in samples)
+    return {'median_ns': round(median, 1), 'mad_ns': round(mad, 1), 'repeats': len(samples)}
+
+def run_benchmarks(names=None, repeats=7):
+    """Run the selected benchmarks and return {name: summary}"""
+    results = {}
+    # Per-call INFO logging would dominate the console and the measurements alike
+    logging.disable(logging.CRITICAL)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for name, (setup, ops) in BENCHMARKS.items():
+                if names and not any(pattern in name for pattern in names):
+                    continue
+                try:
+                    fn = setup(workdir)
+                except ImportError as e:
+                    print(f"SKIP {name}: {e}")
+                    continue
+                results[name] = summarize(measure(fn, ops, repeats))
+                print(f"{name:45s} {results[name]['median_ns']:12.1f} ns/op  ±{results[name]['mad_ns']:.1f}")
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD, noise_factor=NOISE_FACTOR):
+    """Return (name, baseline_ns, current_ns, change) for benchmarks that regressed
+    
+    A change counts only if it exceeds the relative threshold and is larger
+    than noise_factor times the spread seen in either run.
+    """
+    regressions = []
+    for name, result in current.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        delta = result['median_ns'] - previous['median_ns']
+        noise = noise_factor * max(result['mad_ns'], previous['mad_ns'])
+        if delta > threshold * previous['median_ns'] and delta > noise:
+            regressions.append((name, previous['median_ns'], result['median_ns'], delta / previous['median_ns']))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("names", nargs="*", help="Only run benchmarks whose name contains one of these")
+    parser.add_argument("--repeats", type=int, default=7, help="Timed repeats per benchmark")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Relative regression threshold")
+    args = parser.parse_args()
+    
+    current = run_benchmarks(args.names, args.repeats)
+    
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        sys.exit(0)
+    
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save to create one")
+        sys.exit(0)
+    
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    for name, before, after, change in regressions:
+        print(f"REGRESSION {name}: {before:.1f} -> {after:.1f} ns/op (+{change:.0%})")
+    sys.exit(1 if regressions else 0)
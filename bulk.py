@@ -0,0 +1,302 @@
+"""
+Bulk vote, proposal and contract instance submission for voting contract
+"""
+
+import csv
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from algosdk import account, mnemonic, transaction
+from algosdk.error import AlgodHTTPError
+from confirmation import get_confirmation_tracker
+from validation import InputValidator
+from schema import VotingDatabase
+from logger import setup_logger
+from config import (
+    BULK_BATCH_SIZE, BULK_CONCURRENCY, BULK_GROUP_SIZE, BULK_MAX_PENDING, PARAMS_REFRESH_SECONDS,
+    DEFAULT_VOTING_PERIOD, MIN_VOTES_REQUIRED
+)
+
+RESULT_FIELDS = ['row', 'status', 'tx_id', 'confirmed_round', 'app_id', 'error']
+
+def load_signing_keys(path=None, private_key=None):
+    """Load private keys (base64 or 25-word mnemonic, one per line) keyed by address"""
+    keys = {}
+    lines = []
+    if private_key:
+        lines.append(private_key)
+    if path:
+        with open(path) as f:
+            lines.extend(line.strip() for line in f)
+    
+    for line in lines:
+        if not line or line.startswith('#'):
+            continue
+        key = mnemonic.to_private_key(line) if len(line.split()) == 25 else line
+        keys[account.address_from_private_key(key)] = key
+    return keys
+
+def read_records(path):
+    """Stream CSV rows as dicts without loading the file"""
+    with open(path, newline='') as f:
+        for record in csv.DictReader(f):
+            yield {key.strip(): (value.strip() if isinstance(value, str) else value)
+                   for key, value in record.items() if key}
+
+class BulkSubmitter:
+    """Validate, sign and submit large vote or proposal files in grouped transactions"""
+    
+    def __init__(self, algod_client, keys, concurrency=BULK_CONCURRENCY, group_size=BULK_GROUP_SIZE,
+                 batch_size=BULK_BATCH_SIZE, max_pending=BULK_MAX_PENDING, progress=None, signer=None):
+        self.logger = setup_logger("bulk")
+        self.algod_client = algod_client
+        self.keys = keys
+        # Optional SigningPool; without one, groups are signed on the submitting threads
+        self.signer = signer
+        self.concurrency = concurrency
+        self.group_size = group_size
+        self.batch_size = batch_size
+        self.progress = progress
+        self.validator = InputValidator()
+        self.tracker = get_confirmation_tracker(algod_client)
+        self.max_pending = max_pending
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.params = None
+        self.params_fetched_at = 0
+        self.stats = {'processed': 0, 'confirmed': 0, 'failed': 0, 'started': time.time()}
+    
+    def _suggested_params(self):
+        # One suggested-params call per refresh window instead of per transaction
+        if self.params is None or time.time() - self.params_fetched_at > PARAMS_REFRESH_SECONDS:
+            self.params = self.algod_client.suggested_params()
+            self.params_fetched_at = time.time()
+        return self.params
+    
+    def _batches(self, records):
+        batch = []
+        for row, record in enumerate(records, start=1):
+            batch.append((row, record))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def _record(self, writer, row, status, tx_id=None, confirmed_round=None, error=None, app_id=None):
+        with self.lock:
+            writer.writerow({
+                'row': row, 'status': status, 'tx_id': tx_id or '',
+                'confirmed_round': confirmed_round or '', 'app_id': app_id or '', 'error': error or ''
+            })
+            self.stats['processed'] += 1
+            self.stats['confirmed' if status == 'confirmed' else 'failed'] += 1
+            if self.progress:
+                self.progress(dict(self.stats))
+    
+    def cast_votes(self, records, writer, app_id=None, db=None):
+        """Cast votes from records with voter_address, vote_option and proposal_id (or app_id)"""
+        db = db or VotingDatabase()
+        app_ids = {}
+        
+        def resolve_app_id(record):
+            if record.get('app_id'):
+                return int(record['app_id'])
+            if app_id:
+                return app_id
+            proposal_id = int(record['proposal_id'])
+            if proposal_id not in app_ids:
+                app_ids[proposal_id] = db.get_proposal_app_id(proposal_id)
+            if app_ids[proposal_id] is None:
+                raise ValueError(f"Unknown proposal {proposal_id}")
+            return app_ids[proposal_id]
+        
+        def build(record, params):
+            return transaction.ApplicationCallTxn(
+                sender=record['voter_address'],
+                sp=params,
+                index=resolve_app_id(record),
+                on_complete=transaction.OnComplete.NoOpOC,
+                app_args=["vote", record['vote_option'].lower()]
+            )
+        
+        return self._run(records, writer, 'vote', build, lambda record: record['voter_address'])
+    
+    def create_proposals(self, records, writer, app_id, sender):
+        """Create proposals from records with title, description and duration"""
+        def build(record, params):
+            return transaction.ApplicationCallTxn(
+                sender=sender,
+                sp=params,
+                index=int(record.get('app_id') or app_id),
+                on_complete=transaction.OnComplete.NoOpOC,
+                app_args=["create_proposal", record['title']]
+            )
+        
+        return self._run(records, writer, 'proposal', build, lambda record: sender)
+    
+    def deploy_instances(self, records, writer, approval_template, clear_program, sender, db=None):
+        """Create and open one voting app per record with title and optional duration, min_votes and admin
+        
+        approval_template is the compiled template program; each record's
+        parameters are patched into a copy. Once an app is confirmed, sender
+        calls create_proposal on it to open voting, and its app id and
+        voting end are added to the database and written to the results.
+        """
+        from deploy import patch_program, GLOBAL_SCHEMA, LOCAL_SCHEMA
+        
+        db = db or VotingDatabase()
+        
+        def voting_period(record):
+            return int(record['duration']) * 3600 if record.get('duration') else DEFAULT_VOTING_PERIOD
+        
+        def build(record, params):
+            approval_program = patch_program(
+                approval_template,
+                record.get('admin') or sender,
+                voting_period=voting_period(record),
+                min_votes=int(record['min_votes']) if record.get('min_votes') else MIN_VOTES_REQUIRED
+            )
+            return transaction.ApplicationCreateTxn(
+                sender=sender,
+                sp=params,
+                on_complete=transaction.OnComplete.NoOpOC,
+                approval_program=approval_program,
+                clear_program=clear_program,
+                global_schema=GLOBAL_SCHEMA,
+                local_schema=LOCAL_SCHEMA,
+                # Instances with equal parameters would otherwise be one transaction id
+                note=uuid.uuid4().bytes
+            )
+        
+        def created(record, info):
+            app_id = info['application-index']
+            # A new app accepts no votes until create_proposal starts its voting period
+            opening = transaction.ApplicationCallTxn(
+                sender=sender,
+                sp=self._suggested_params(),
+                index=app_id,
+                on_complete=transaction.OnComplete.NoOpOC,
+                app_args=["create_proposal", record['title']]
+            )
+            try:
+                self._send([opening])
+            except Exception as e:
+                raise RuntimeError(f"App {app_id} created but not opened: {e}") from e
+            voting_end = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() + voting_period(record)))
+            db.add_proposal(app_id, record['title'], record.get('admin') or sender, voting_end)
+            return app_id
+        
+        return self._run(records, writer, 'instance', build, lambda record: sender, on_confirmed=created)
+    
+    def _run(self, records, writer, record_type, build, sender_of, on_confirmed=None):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for batch in self._batches(records):
+                _, errors = self.validator.validate_batch([record for _, record in batch], record_type)
+                
+                invalid_rows = {}
+                for error in errors:
+                    invalid_rows.setdefault(batch[error['row']][0], []).append(f"{error['field']}: {error['error']}")
+                for row, messages in invalid_rows.items():
+                    self._record(writer, row, 'invalid', error='; '.join(messages))
+                
+                params = self._suggested_params()
+                signable = []
+                for row, record in batch:
+                    if row in invalid_rows:
+                        continue
+                    if sender_of(record) not in self.keys:
+                        self._record(writer, row, 'error', error="No signing key for address")
+                        continue
+                    try:
+                        signable.append((row, record, build(record, params)))
+                    except Exception as e:
+                        self._record(writer, row, 'error', error=str(e))
+                
+                for start in range(0, len(signable), self.group_size):
+                    group = signable[start:start + self.group_size]
+                    for _ in group:
+                        self.pending.acquire()
+                    pool.submit(self._submit_group, writer, group, on_confirmed)
+        
+        # Wait for every outstanding confirmation before reporting
+        for _ in range(self.max_pending):
+            self.pending.acquire()
+        for _ in range(self.max_pending):
+            self.pending.release()
+        
+        self.stats['elapsed'] = time.time() - self.stats['started']
+        self.logger.info(f"Bulk {record_type} run finished: {self.stats}")
+        return self.stats
+    
+    def _sign(self, txn):
+        return txn.sign(self.keys[txn.sender])
+    
+    def _send(self, txns):
+        if self.signer:
+            return self.algod_client.send_raw_transaction(self.signer.sign_group(txns))
+        return self.algod_client.send_transactions([self._sign(txn) for txn in txns])
+    
+    def _submit_group(self, writer, group, on_confirmed=None):
+        """Sign and send a group atomically, falling back to single transactions if it is rejected"""
+        txns = [txn for _, _, txn in group]
+        try:
+            if len(txns) > 1:
+                transaction.assign_group_id(txns)
+            self._send(txns)
+        except AlgodHTTPError as e:
+            if len(txns) == 1:
+                self._fail(writer, group, str(e))
+                return
+            self.logger.warning(f"Group of {len(txns)} rejected ({e}); resubmitting individually")
+        except Exception as e:
+            self._fail(writer, group, str(e))
+            return
+        else:
+            # Only send errors reach the handlers above; once algod accepted the group it is never resent
+            self._track(writer, group, on_confirmed)
+            return
+        
+        # One bad vote rejects its whole atomic group, so retry the members alone
+        for row, record, txn in group:
+            txn.group = None
+            try:
+                self._send([txn])
+            except Exception as e:
+                self._fail(writer, [(row, record, txn)], str(e))
+                continue
+            self._track(writer, [(row, record, txn)], on_confirmed)
+    
+    def _track(self, writer, group, on_confirmed=None):
+        """Follow sent transactions to confirmation; each member's pending slot is released exactly once"""
+        for row, record, txn in group:
+            tx_id = txn.get_txid()
+            try:
+                future = self.tracker.register_transaction(txn, tx_id=tx_id)
+            except Exception as e:
+                # Sent but not followed: report the id so it can be checked, rather than resending it
+                self._record(writer, row, 'unconfirmed', tx_id=tx_id, error=f"Confirmation not tracked: {e}")
+                self.pending.release()
+                continue
+            future.add_done_callback(
+                lambda f, row=row, record=record, tx_id=tx_id:
+                    self._confirmed(writer, row, record, tx_id, f, on_confirmed)
+            )
+    
+    def _confirmed(self, writer, row, record, tx_id, future, on_confirmed=None):
+        try:
+            info = future.result()
+            # on_confirmed gets the input record and may return the id of an app the transaction created
+            app_id = on_confirmed(record, info) if on_confirmed else None
+            self._record(writer, row, 'confirmed', tx_id=tx_id, confirmed_round=info['confirmed-round'],
+                         app_id=app_id)
+        except Exception as e:
+            self._record(writer, row, 'failed', tx_id=tx_id, error=str(e))
+        finally:
+            self.pending.release()
+    
+    def _fail(self, writer, group, error):
+        for row, _, _ in group:
+            self._record(writer, row, 'failed', error=error)
+            self.pending.release()
@@ -3,11 +3,12 @@ Command Line Interface for voting contract
 """
 
 import click
-import json
-from algosdk.v2client import algod
-from config import ContractConfig
-from utils import validate_address
-from logger import setup_logger
+import os
+import time
+from config import BACKUP_DIR, BULK_CONCURRENCY, BULK_GROUP_SIZE
+
+# algosdk, the database layer and logging are imported inside the commands
+# that use them, so --help and simple commands start without paying for them
 
 @click.group()
 def cli():
@@ -19,6 +20,8 @@ def cli():
 @click.option('--duration', default=24, help='Voting duration in hours')
 def create_proposal(title, duration):
     """Create a new voting proposal"""
+    from logger import setup_logger
+    
     try:
         logger = setup_logger("cli")
         logger.info(f"Creating proposal: {title}")
@@ -39,6 +42,9 @@ def create_proposal(title, duration):
 @click.option('--address', required=True, help='Voter address')
 def cast_vote(proposal_id, vote, address):
     """Cast a vote on a proposal"""
+    from logger import setup_logger
+    from utils import validate_address
+    
     try:
         logger = setup_logger("cli")
         
@@ -62,25 +68,26 @@ def cast_vote(proposal_id, vote, address):
 @click.option('--proposal-id', required=True, type=int, help='Proposal ID')
 def get_results(proposal_id):
     """Get voting results for a proposal"""
+    from logger import setup_logger
+    from schema import VotingDatabase
+    from vote import get_results as read_results
+    
     try:
         logger = setup_logger("cli")
         logger.info(f"Fetching results for proposal {proposal_id}")
         
-        # Mock results
-        results = {
-            'proposal_id': proposal_id,
-            'total_votes': 100,
-            'yes': 60,
-            'no': 30,
-            'abstain': 10,
-            'status': 'completed'
-        }
+        app_id = VotingDatabase().get_proposal_app_id(proposal_id)
+        if app_id is None:
+            click.echo(f"❌ No application recorded for proposal {proposal_id}")
+            return
+        results = read_results(app_id)
+        total = results['total_votes']
         
         click.echo(f"📊 Voting Results for Proposal {proposal_id}")
-        click.echo(f"Total Votes: {results['total_votes']}")
-        click.echo(f"Yes: {results['yes']} ({results['yes']/results['total_votes']*100:.1f}%)")
-        click.echo(f"No: {results['no']} ({results['no']/results['total_votes']*100:.1f}%)")
-        click.echo(f"Abstain: {results['abstain']} ({results['abstain']/results['total_votes']*100:.1f}%)")
+        click.echo(f"Total Votes: {total}")
+        for option in ('yes', 'no', 'abstain'):
+            share = results[option] / total * 100 if total else 0.0
+            click.echo(f"{option.capitalize()}: {results[option]} ({share:.1f}%)")
         
     except Exception as e:
         click.echo(f"❌ Error fetching results: {e}")
@@ -88,6 +95,8 @@ def get_results(proposal_id):
 @cli.command()
 def list_proposals():
     """List all active proposals"""
+    from logger import setup_logger
+    
     try:
         logger = setup_logger("cli")
         logger.info("Fetching all proposals")
@@ -107,5 +116,139 @@ def list_proposals():
     except Exception as e:
         click.echo(f"❌ Error listing proposals: {e}")
 
+@cli.command()
+@click.option('--backup-dir', default=BACKUP_DIR, help='Directory containing backup manifests')
+@click.option('--db', 'db_path', default='voting_data_restored.db', help='Fresh database to restore into')
+@click.option('--workers', type=int, default=None, help='Parallel chunk decoders (default: CPU count)')
+@click.option('--no-analyze', is_flag=True, help='Skip ANALYZE after the load')
+def restore(backup_dir, db_path, workers, no_analyze):
+    """Restore the latest backup chain into a fresh database"""
+    from restore import DataRestore
+    
+    try:
+        loaded = DataRestore(db_path, workers=workers).restore(backup_dir, analyze=not no_analyze)
+        
+        click.echo(f"✅ Restore completed into {db_path}")
+        for table, rows in loaded.items():
+            click.echo(f"{table}: {rows} rows")
+        
+    except Exception as e:
+        click.echo(f"❌ Error restoring backup: {e}")
+
+def _progress_printer(label):
+    """Build a callback that redraws one progress/throughput line at most 10 times a second"""
+    last_draw = [0]
+    
+    def show(stats, final=False):
+        now = time.time()
+        if not final and now - last_draw[0] < 0.1:
+            return
+        last_draw[0] = now
+        elapsed = max(now - stats['started'], 1e-6)
+        click.echo(
+            f"\r{label}: {stats['processed']} processed, {stats['confirmed']} confirmed, "
+            f"{stats['failed']} failed ({stats['processed'] / elapsed:.1f}/s)",
+            nl=final
+        )
+    return show
+
+def _run_bulk(label, file_path, results_path, keys, concurrency, group_size, submit, sign_workers=0):
+    import csv
+    from config import ContractConfig
+    from bulk import BulkSubmitter, RESULT_FIELDS, read_records
+    from signing import SigningPool
+    
+    if not keys:
+        click.echo("❌ No signing keys: pass --keyfile or set PRIVATE_KEY")
+        return
+    
+    algod_client = ContractConfig().algod_client()
+    progress = _progress_printer(label)
+    signer = SigningPool(keys, workers=sign_workers) if sign_workers else None
+    submitter = BulkSubmitter(algod_client, keys, concurrency=concurrency,
+                              group_size=group_size, progress=progress, signer=signer)
+    
+    try:
+        with open(results_path, 'w', newline='') as results_file:
+            writer = csv.DictWriter(results_file, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            stats = submit(submitter, read_records(file_path), writer)
+    finally:
+        if signer:
+            signer.close()
+    
+    progress(stats, final=True)
+    click.echo(f"✅ {label} finished in {stats['elapsed']:.1f}s, results written to {results_path}")
+
+@cli.command()
+@click.option('--file', 'file_path', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='CSV with voter_address, vote_option, proposal_id and optional app_id columns')
+@click.option('--app-id', type=int, default=None, help='Application ID for rows without app_id')
+@click.option('--keyfile', type=click.Path(exists=True, dir_okay=False),
+              help='File with one private key or mnemonic per line')
+@click.option('--results', 'results_path', default='vote_results.csv', help='Per-row results CSV')
+@click.option('--concurrency', default=BULK_CONCURRENCY, help='Concurrent submissions')
+@click.option('--group-size', default=BULK_GROUP_SIZE, type=click.IntRange(1, 16), help='Transactions per group')
+@click.option('--sign-workers', default=0, help='Signing processes (0 signs on the submitting threads)')
+def cast_votes(file_path, app_id, keyfile, results_path, concurrency, group_size, sign_workers):
+    """Cast votes in bulk from a CSV file"""
+    from bulk import load_signing_keys
+    
+    try:
+        keys = load_signing_keys(keyfile, os.getenv('PRIVATE_KEY'))
+        _run_bulk("Votes", file_path, results_path, keys, concurrency, group_size,
+                  lambda submitter, records, writer: submitter.cast_votes(records, writer, app_id=app_id),
+                  sign_workers)
+        
+    except Exception as e:
+        click.echo(f"\n❌ Error casting votes: {e}")
+
+@cli.command()
+@click.option('--file', 'file_path', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='CSV with title, description, duration and optional app_id columns')
+@click.option('--app-id', type=int, default=None, help='Application ID for rows without app_id')
+@click.option('--results', 'results_path', default='proposal_results.csv', help='Per-row results CSV')
+@click.option('--concurrency', default=BULK_CONCURRENCY, help='Concurrent submissions')
+@click.option('--group-size', default=BULK_GROUP_SIZE, type=click.IntRange(1, 16), help='Transactions per group')
+@click.option('--sign-workers', default=0, help='Signing processes (0 signs on the submitting threads)')
+def create_proposals(file_path, app_id, results_path, concurrency, group_size, sign_workers):
+    """Create proposals in bulk from a CSV file"""
+    from algosdk import account
+    from bulk import load_signing_keys
+    
+    try:
+        private_key = os.getenv('PRIVATE_KEY')
+        keys = load_signing_keys(private_key=private_key)
+        sender = account.address_from_private_key(private_key) if private_key else None
+        _run_bulk("Proposals", file_path, results_path, keys, concurrency, group_size,
+                  lambda submitter, records, writer: submitter.create_proposals(records, writer, app_id, sender),
+                  sign_workers)
+        
+    except Exception as e:
+        click.echo(f"\n❌ Error creating proposals: {e}")
+
+@cli.command()
+@click.option('--file', 'file_path', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='CSV with title and optional duration, min_votes and admin columns')
+@click.option('--results', 'results_path', default='deploy_results.csv', help='Per-row results CSV')
+@click.option('--concurrency', default=BULK_CONCURRENCY, help='Concurrent submissions')
+@click.option('--group-size', default=BULK_GROUP_SIZE, type=click.IntRange(1, 16), help='Transactions per group')
+def deploy_many(file_path, results_path, concurrency, group_size):
+    """Deploy one voting contract per CSV row from a single compiled template"""
+    from bulk import read_records
+    import deploy
+    
+    try:
+        progress = _progress_printer("Deployments")
+        stats = deploy.deploy_many(read_records(file_path), results_path, concurrency=concurrency,
+                                   group_size=group_size, progress=progress)
+        if stats is None:
+            return
+        progress(stats, final=True)
+        click.echo(f"✅ Deployments finished in {stats['elapsed']:.1f}s, results written to {results_path}")
+        
+    except Exception as e:
+        click.echo(f"\n❌ Error deploying contracts: {e}")
+
 if __name__ == '__main__':
     cli()
\ No newline at end of file
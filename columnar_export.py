@@ -0,0 +1,196 @@
+"""
+Columnar (Parquet) export of voting history for analytics
+"""
+
+import json
+import os
+import re
+import sqlite3
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from logger import setup_logger
+from config import COLUMNAR_DIR, COLUMNAR_BATCH_ROWS
+
+WATERMARK_FILE = "watermarks.json"
+PROPOSALS_FILE = "proposals.parquet"
+VOTES_DIR = "votes"
+ROLLUP_DIR = "daily_votes"
+# Part files are named after the first vote id they hold, so files from an interrupted run can be found
+PART_FILE = re.compile(r"part-(\d+)-\d+\.parquet$")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Proposal-day partitions one export may touch; years of history can exceed pyarrow's default of 1024
+MAX_PARTITIONS = 1 << 20
+
+VOTE_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('proposal_id', pa.int64()),
+    ('voter_address', pa.string()),
+    ('vote_option', pa.string()),
+    ('voted_at', pa.string()),
+    ('tx_id', pa.string()),
+    ('confirmed_round', pa.int64()),
+    ('date', pa.string())
+])
+PROPOSAL_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('app_id', pa.int64()),
+    ('title', pa.string()),
+    ('creator', pa.string()),
+    ('created_at', pa.string()),
+    ('voting_end', pa.string()),
+    ('status', pa.string())
+])
+
+def dataset_partitioning(name):
+    """Hive partitioning of an exported dataset (None for unpartitioned files)"""
+    if name == VOTES_DIR:
+        return ds.partitioning(pa.schema([('proposal_id', pa.int64()), ('date', pa.string())]), flavor='hive')
+    if name == ROLLUP_DIR:
+        return ds.partitioning(pa.schema([('proposal_id', pa.int64())]), flavor='hive')
+    return None
+
+def _parse_timestamps(table, columns):
+    """Convert SQLite timestamp text to Arrow timestamps; unparseable values become null"""
+    for column in columns:
+        index = table.schema.get_field_index(column)
+        parsed = pc.strptime(table[column], format=TIMESTAMP_FORMAT, unit='s', error_is_null=True)
+        table = table.set_column(index, column, parsed)
+    return table
+
+class ColumnarExporter:
+    """Append-only Parquet export of proposals, votes and daily vote rollups"""
+    
+    def __init__(self, db_path="voting_data.db", export_dir=COLUMNAR_DIR, batch_rows=COLUMNAR_BATCH_ROWS):
+        self.logger = setup_logger("columnar_export")
+        self.db_path = db_path
+        self.export_dir = export_dir
+        self.batch_rows = batch_rows
+    
+    def _connect(self):
+        # pyarrow pulls record batches on its own thread, one at a time
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        # In WAL mode readers never block writers, so exports can run online
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+    
+    def load_watermarks(self):
+        """Get the last exported id per table"""
+        path = os.path.join(self.export_dir, WATERMARK_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+    
+    def _save_watermarks(self, watermarks):
+        path = os.path.join(self.export_dir, WATERMARK_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(watermarks, f)
+        os.replace(path + ".tmp", path)
+    
+    def _remove_orphans(self, name, since_id):
+        """Delete part files past the watermark, left behind by an interrupted export"""
+        removed = 0
+        for root, _, files in os.walk(os.path.join(self.export_dir, name)):
+            for file_name in files:
+                match = PART_FILE.match(file_name)
+                if match and int(match.group(1)) > since_id:
+                    os.remove(os.path.join(root, file_name))
+                    removed += 1
+        if removed:
+            self.logger.warning(f"Removed {removed} {name} files from an interrupted export")
+    
+    def _write(self, data, name, first_id, schema=None):
+        files = []
+        ds.write_dataset(
+            data, os.path.join(self.export_dir, name), format='parquet', schema=schema,
+            partitioning=dataset_partitioning(name),
+            basename_template=f"part-{first_id:012d}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+            max_partitions=MAX_PARTITIONS,
+            file_visitor=lambda written: files.append(written.path)
+        )
+        return len(files)
+    
+    def export_proposals(self, conn):
+        """Rewrite the proposals file; proposals are few and their status changes in place"""
+        rows = conn.execute('''
+            SELECT id, app_id, title, creator, created_at, voting_end, status FROM proposals ORDER BY id
+        ''').fetchall()
+        table = pa.Table.from_pylist([dict(zip(PROPOSAL_SCHEMA.names, row)) for row in rows], schema=PROPOSAL_SCHEMA)
+        table = _parse_timestamps(table, ['created_at', 'voting_end'])
+        
+        path = os.path.join(self.export_dir, PROPOSALS_FILE)
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        return len(rows)
+    
+    def export_votes(self, conn, since_id=0):
+        """Append votes past since_id, partitioned by proposal and day, with matching rollup deltas"""
+        self._remove_orphans(VOTES_DIR, since_id)
+        self._remove_orphans(ROLLUP_DIR, since_id)
+        
+        cursor = conn.execute('''
+            SELECT id, proposal_id, voter_address, vote_option, voted_at, tx_id, confirmed_round,
+                   substr(voted_at, 1, 10)
+            FROM votes WHERE id > ? ORDER BY id
+        ''', (since_id,))
+        
+        entry = {'since_id': since_id, 'last_id': since_id, 'rows': 0, 'files': 0}
+        rollups = []
+        
+        def batches():
+            while True:
+                rows = cursor.fetchmany(self.batch_rows)
+                if not rows:
+                    break
+                
+                columns = [list(column) for column in zip(*rows)]
+                table = _parse_timestamps(pa.Table.from_arrays(columns, schema=VOTE_SCHEMA), ['voted_at'])
+                rollups.append(table.group_by(['proposal_id', 'date', 'vote_option']).aggregate([('id', 'count')]))
+                entry['rows'] += len(rows)
+                entry['last_id'] = rows[-1][0]
+                yield from table.to_batches()
+        
+        # One dataset write per run, so each partition gains one file per export rather than per batch
+        schema = VOTE_SCHEMA.set(VOTE_SCHEMA.get_field_index('voted_at'), pa.field('voted_at', pa.timestamp('s')))
+        entry['files'] += self._write(batches(), VOTES_DIR, since_id + 1, schema)
+        
+        if rollups:
+            # Daily counts per option; readers sum the deltas from every export
+            rollup = pa.concat_tables(rollups).group_by(['proposal_id', 'date', 'vote_option'])
+            rollup = rollup.aggregate([('id_count', 'sum')])
+            rollup = rollup.rename_columns(['proposal_id', 'date', 'vote_option', 'votes'])
+            entry['files'] += self._write(rollup, ROLLUP_DIR, since_id + 1)
+        
+        self.logger.info(f"Exported {entry['rows']} votes in {entry['files']} Parquet files")
+        return entry
+    
+    def run_export(self, incremental=True):
+        """Export everything past the watermarks and advance them"""
+        os.makedirs(self.export_dir, exist_ok=True)
+        watermarks = self.load_watermarks() if incremental else {}
+        
+        conn = self._connect()
+        try:
+            # One read transaction gives every table the same point-in-time view
+            conn.execute('BEGIN')
+            summary = {
+                'proposals': self.export_proposals(conn),
+                'votes': self.export_votes(conn, since_id=watermarks.get('votes', 0))
+            }
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        
+        # Watermarks only advance once the files are written
+        watermarks['votes'] = summary['votes']['last_id']
+        self._save_watermarks(watermarks)
+        return summary
+
+if __name__ == "__main__":
+    import sys
+    
+    exporter = ColumnarExporter()
+    print(exporter.run_export(incremental='--full' not in sys.argv))
@@ -2,6 +2,8 @@
 Configuration settings for Algorand Voting Contract
 """
 
+import os
+
 # Network Configuration
 ALGORAND_TESTNET_URL = "https://testnet-api.algonode.cloud"
 ALGORAND_MAINNET_URL = "https://mainnet-api.algonode.cloud"
@@ -10,6 +12,9 @@ ALGORAND_MAINNET_URL = "https://mainnet-api.algonode.cloud"
 DEFAULT_VOTING_PERIOD = 86400  # 24 hours in seconds
 MIN_VOTES_REQUIRED = 10
 MAX_PROPOSAL_LENGTH = 256
+VOTING_ACTIVE_FLAG = 1 << 63  # Top bit of the packed voting state; the low 63 bits hold voting_end
+RESULTS_KEY = "results"  # Packed tallies: one big-endian uint64 per vote option; the total is their sum
+ABI_RETURN_PREFIX = bytes.fromhex("151f7c75")  # ARC-4 marker on the log line carrying a return value
 
 # Gas and Fee Configuration
 MIN_BALANCE = 100000  # Minimum balance in microAlgos
@@ -21,13 +26,82 @@ VALID_VOTE_OPTIONS = ["yes", "no", "abstain"]
 # Security Settings
 MAX_VOTES_PER_ADDRESS = 1
 REQUIRE_OPT_IN = True
+VOTE_TOKEN_SECRET = os.getenv("VOTE_TOKEN_SECRET", "")  # Shared by all API workers
+VOTE_TOKEN_MAX_AGE = 3600  # Seconds a vote token stays valid
+VOTE_TOKEN_CLOCK_SKEW = 30  # Seconds a token timestamp may be ahead of this host
+REPLAY_CACHE_SIZE = 1000000  # Used tokens remembered for replay protection
+
+# Notification Settings
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "25"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "0") == "1"
+NOTIFICATION_SENDER = os.getenv("NOTIFICATION_SENDER", "voting@localhost")
+OUTBOX_WORKERS = 4
+OUTBOX_BATCH_SIZE = 50  # Recipients per SMTP message
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BACKOFF = 30  # Seconds, doubled on each retry
+REMINDER_OFFSETS_HOURS = [24, 1]  # Reminders sent this many hours before voting_end
+SCHEDULER_HORIZON = 3600  # Seconds of upcoming jobs kept in memory
+
+# API Settings
+PROPOSALS_PAGE_SIZE = 50  # Default proposals per page
+PROPOSALS_MAX_PAGE_SIZE = 500
+VOTE_BATCH_MAX_SIZE = 256  # Votes accepted per /api/votes/batch request
+VOTE_BATCH_SUBMIT_WORKERS = 16  # Concurrent algod submissions per API process
+EXPORT_PAGE_SIZE = 5000  # Rows per keyset page (and response chunk) in NDJSON exports
+
+# Serving Settings
+SERVER_WORKERS = os.cpu_count() or 1  # Preforked worker processes
+SHARED_RATE_LIMIT_SLOTS = 1 << 20  # Rate-limit table entries in shared memory (24 bytes each)
+SHARED_LOCK_STRIPES = 64
+
+# State Decoder Settings
+STATE_CACHE_SIZE = 4096  # Decoded (app, round) entries kept
+STATE_ROUND_TTL = 1.0  # Seconds the current round is reused before asking algod again
+
+# Backup Settings
+BACKUP_DIR = "backups"
+BACKUP_CHUNK_ROWS = 100000  # Rows per compressed NDJSON chunk
+
+# Columnar Export Settings
+COLUMNAR_DIR = "columnar"
+COLUMNAR_BATCH_ROWS = 250000  # Rows read from SQLite per Parquet write
+
+# Migration Settings
+
+# Endpoint Pool Settings
+ENDPOINT_PROBE_INTERVAL = 5  # Seconds between background status probes of each algod node
+ENDPOINT_MAX_ROUND_LAG = 2  # Rounds a node may trail the best one before reads avoid it
+ENDPOINT_TIMEOUT = 10  # Seconds before a request to one node is abandoned
+ENDPOINT_MAX_BACKOFF = 60  # Longest a failed node is skipped before being retried
+ENDPOINT_PIN_CACHE_SIZE = 100000  # Submitted transaction ids remembered with the node that took them
+
+# Signing Settings
+SIGNING_WORKERS = os.cpu_count() or 1  # Processes in a SigningPool
+SIGNING_CHUNK_SIZE = 256  # Transactions per worker task; larger chunks amortize inter-process overhead
+
+# Bulk Submission Settings
+BULK_BATCH_SIZE = 500  # Input rows validated per batch
+BULK_GROUP_SIZE = 16  # Transactions per atomic group (protocol maximum)
+BULK_CONCURRENCY = 8  # Concurrent submissions to algod
+BULK_MAX_PENDING = 4096  # Submitted transactions awaiting confirmation
+PARAMS_REFRESH_SECONDS = 30  # Reuse suggested params for this long
 
 class ContractConfig:
     """Contract configuration class"""
     
-    def __init__(self, network="testnet"):
+    def __init__(self, network="testnet", algod_urls=None):
         self.network = network
-        self.algod_url = ALGORAND_TESTNET_URL if network == "testnet" else ALGORAND_MAINNET_URL
+        # ALGOD_URLS_TESTNET and ALGOD_URLS_MAINNET list several nodes of their network, comma-separated;
+        # ALGOD_URL points every client at one other node, whatever the network
+        self.algod_urls = algod_urls or [
+            url.strip() for url in os.getenv(f"ALGOD_URLS_{network.upper()}", "").split(",") if url.strip()
+        ] or [os.getenv("ALGOD_URL") or (
+            ALGORAND_TESTNET_URL if network == "testnet" else ALGORAND_MAINNET_URL
+        )]
+        self.algod_url = self.algod_urls[0]
         self.voting_period = DEFAULT_VOTING_PERIOD
         self.min_votes = MIN_VOTES_REQUIRED
     
@@ -35,6 +109,16 @@ class ContractConfig:
         """Get network-specific parameters"""
         return {
             "url": self.algod_url,
+            "urls": self.algod_urls,
             "voting_period": self.voting_period,
             "min_votes": self.min_votes
-        }
\ No newline at end of file
+        }
+    
+    def algod_client(self):
+        """Algod client for this network, pooled with failover when several nodes are configured"""
+        if len(self.algod_urls) == 1:
+            from algosdk.v2client import algod
+            return algod.AlgodClient("", self.algod_url)
+        
+        from endpoints import get_endpoint_pool
+        return get_endpoint_pool(self.algod_urls).client()
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+Shared transaction confirmation tracker for voting contract
+"""
+
+import base64
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import msgpack
+from algosdk import constants, encoding
+from logger import setup_logger
+from exceptions import ConfirmationTimeoutError, TransactionExpiredError
+
+DEFAULT_WAIT_ROUNDS = 1000
+RECENT_ROUNDS = 8
+RETRY_DELAY = 1
+
+def _canonical(value):
+    """Sort msgpack maps recursively so re-encoding matches the signed bytes"""
+    if isinstance(value, dict):
+        return {key: _canonical(value[key]) for key in sorted(value)}
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    return value
+
+def block_transaction_ids(block):
+    """Yield (tx_id, signed_txn_in_block) for every top-level transaction in a block"""
+    genesis_id = block.get("gen")
+    genesis_hash = block.get("gh")
+    
+    for stxn in block.get("txns") or []:
+        txn = dict(stxn["txn"])
+        # Blocks strip genesis fields from each transaction to save space
+        if stxn.get("hgi"):
+            txn["gen"] = genesis_id
+        if genesis_hash:
+            txn["gh"] = genesis_hash
+        
+        encoded = msgpack.packb(_canonical(txn), use_bin_type=True)
+        digest = encoding.checksum(constants.txid_prefix + encoded)
+        yield base64.b32encode(digest).decode().strip("="), stxn
+
+class ConfirmationTracker:
+    """Follow new blocks once and resolve every pending transaction found in them"""
+    
+    def __init__(self, algod_client, wait_rounds=DEFAULT_WAIT_ROUNDS):
+        self.logger = setup_logger("confirmation")
+        self.algod_client = algod_client
+        self.wait_rounds = wait_rounds
+        self.pending = {}
+        self.lock = threading.Condition()
+        self.next_round = None
+        self.recent = deque(maxlen=RECENT_ROUNDS)
+        self.thread = None
+        self.stopped = False
+    
+    def register(self, tx_id, last_valid=None, first_valid=None, wait_rounds=None):
+        """Register a submitted transaction and return a future for its confirmation"""
+        future = Future()
+        current_round = None
+        
+        while True:
+            with self.lock:
+                if tx_id in self.pending:
+                    return self.pending[tx_id]['future']
+                
+                # The transaction may have landed in a block scanned before it was registered
+                for round_number, scanned in self.recent:
+                    if tx_id in scanned:
+                        future.set_result(self._confirmation_info(tx_id, round_number, scanned[tx_id]))
+                        return future
+                
+                if self.pending or current_round is not None:
+                    if not self.pending:
+                        # Rounds are not scanned while idle, so resume from the transaction's
+                        # first valid round (or the current one) rather than the stale pointer
+                        start = first_valid or current_round
+                        if self.next_round is not None:
+                            start = max(start, self.next_round)
+                        self.next_round = min(start, current_round + 1)
+                    
+                    self.pending[tx_id] = {
+                        'future': future,
+                        'last_valid': last_valid,
+                        'deadline': self.next_round + (wait_rounds or self.wait_rounds)
+                    }
+                    self._ensure_running()
+                    self.lock.notify_all()
+                    break
+            
+            # Asked outside the lock, so a slow node does not hold up the block follower
+            # or other registrations; the checks above are repeated with the answer
+            current_round = self.algod_client.status()['last-round']
+        
+        self.logger.debug(f"Tracking transaction {tx_id}")
+        return future
+    
+    def register_transaction(self, txn, tx_id=None, wait_rounds=None):
+        """Register an algosdk transaction using its own validity window"""
+        return self.register(
+            tx_id or txn.get_txid(),
+            last_valid=txn.last_valid_round,
+            first_valid=txn.first_valid_round,
+            wait_rounds=wait_rounds
+        )
+    
+    def wait(self, tx_id, last_valid=None, timeout=None):
+        """Block until a transaction is confirmed and return its confirmation info"""
+        return self.register(tx_id, last_valid=last_valid).result(timeout=timeout)
+    
+    def stop(self):
+        """Stop following blocks and fail every outstanding future"""
+        with self.lock:
+            self.stopped = True
+            pending = list(self.pending.items())
+            self.pending.clear()
+            self.lock.notify_all()
+        
+        for tx_id, entry in pending:
+            entry['future'].set_exception(ConfirmationTimeoutError(f"Tracker stopped before {tx_id} confirmed"))
+    
+    def _ensure_running(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped = False
+            self.thread = threading.Thread(target=self._follow_blocks, name="confirmation-tracker", daemon=True)
+            self.thread.start()
+    
+    def _follow_blocks(self):
+        """Scan each new block once for every registered transaction"""
+        last_round = 0
+        
+        while True:
+            with self.lock:
+                while not self.pending and not self.stopped:
+                    self.lock.wait()
+                if self.stopped:
+                    return
+                round_number = self.next_round
+            
+            try:
+                if round_number > last_round:
+                    # Returns immediately when the round already exists
+                    last_round = self.algod_client.status_after_block(round_number - 1)['last-round']
+                    continue
+                
+                raw_block = self.algod_client.block_info(round_number, response_format="msgpack")
+                block = msgpack.unpackb(raw_block, raw=False, strict_map_key=False)['block']
+                self._resolve_block(round_number, block)
+            except Exception as e:
+                self.logger.error(f"Block scan failed at round {round_number}: {e}")
+                time.sleep(RETRY_DELAY)
+    
+    def _resolve_block(self, round_number, block):
+        confirmed = []
+        expired = []
+        
+        scanned = dict(block_transaction_ids(block))
+        
+        with self.lock:
+            self.recent.append((round_number, scanned))
+            for tx_id in [tx_id for tx_id in self.pending if tx_id in scanned]:
+                entry = self.pending.pop(tx_id)
+                confirmed.append((entry['future'], self._confirmation_info(tx_id, round_number, scanned[tx_id])))
+            
+            for tx_id, entry in list(self.pending.items()):
+                if entry['last_valid'] is not None and round_number >= entry['last_valid']:
+                    expired.append((entry['future'], TransactionExpiredError(
+                        f"Transaction {tx_id} expired at round {entry['last_valid']}",
+                        tx_id=tx_id,
+                        last_valid_round=entry['last_valid']
+                    )))
+                    del self.pending[tx_id]
+                elif round_number >= entry['deadline']:
+                    expired.append((entry['future'], ConfirmationTimeoutError(f"Wait for transaction id {tx_id} timed out")))
+                    del self.pending[tx_id]
+            
+            self.next_round = round_number + 1
+        
+        # Resolve outside the lock so callbacks can register follow-up transactions
+        for future, info in confirmed:
+            future.set_result(info)
+        for future, error in expired:
+            future.set_exception(error)
+        
+        if confirmed or expired:
+            self.logger.info(f"Round {round_number}: {len(confirmed)} confirmed, {len(expired)} expired")
+    
+    @staticmethod
+    def _confirmation_info(tx_id, round_number, stxn):
+        """Shape block data like pending_transaction_info for existing callers"""
+        info = {'txid': tx_id, 'confirmed-round': round_number}
+        if 'apid' in stxn:
+            info['application-index'] = stxn['apid']
+        if 'caid' in stxn:
+            info['asset-index'] = stxn['caid']
+        if 'dt' in stxn:
+            info['logs'] = [base64.b64encode(log).decode() for log in stxn['dt'].get('lg', [])]
+        return info
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+def get_confirmation_tracker(algod_client):
+    """Get the shared tracker for an algod endpoint"""
+    key = (algod_client.algod_address, algod_client.algod_token)
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = ConfirmationTracker(algod_client)
+            _trackers[key] = tracker
+        return tracker
+
+def wait_for_confirmation(algod_client, tx_id, txn=None, timeout=None):
+    """Drop-in replacement for algosdk's wait_for_confirmation using the shared tracker"""
+    tracker = get_confirmation_tracker(algod_client)
+    if txn is not None:
+        future = tracker.register_transaction(txn, tx_id=tx_id)
+    else:
+        future = tracker.register(tx_id)
+    return future.result(timeout=timeout)
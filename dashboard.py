@@ -2,16 +2,18 @@
 Web dashboard for voting contract management
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Blueprint, Flask, current_app, render_template, request, jsonify, redirect, url_for
 import json
 from datetime import datetime
 from analytics import VotingAnalytics
 from logger import setup_logger
+from rate_limiter import rate_limiter
+from metrics import PerformanceMetrics
 
-app = Flask(__name__)
+bp = Blueprint('dashboard', __name__)
 logger = setup_logger("dashboard")
 
-@app.route('/')
+@bp.route('/')
 def index():
     """Main dashboard page"""
     try:
@@ -35,7 +37,7 @@ def index():
         logger.error(f"Dashboard error: {e}")
         return f"Dashboard error: {e}", 500
 
-@app.route('/proposal/<int:proposal_id>')
+@bp.route('/proposal/<int:proposal_id>')
 def proposal_detail(proposal_id):
     """Detailed view of a specific proposal"""
     try:
@@ -59,7 +61,7 @@ def proposal_detail(proposal_id):
         logger.error(f"Proposal detail error: {e}")
         return f"Error: {e}", 500
 
-@app.route('/api/dashboard/stats')
+@bp.route('/api/dashboard/stats')
 def api_stats():
     """API endpoint for dashboard statistics"""
     try:
@@ -77,7 +79,8 @@ def api_stats():
             'participation': {
                 'unique_voters': 89,
                 'average_participation': 75.5
-            }
+            },
+            'serving': current_app.extensions['metrics'].counters.snapshot()
         }
         
         logger.info("Stats API accessed")
@@ -86,7 +89,7 @@ def api_stats():
         logger.error(f"Stats API error: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/analytics')
+@bp.route('/analytics')
 def analytics_page():
     """Analytics and charts page"""
     try:
@@ -105,7 +108,7 @@ def analytics_page():
         logger.error(f"Analytics error: {e}")
         return f"Analytics error: {e}", 500
 
-@app.route('/create_proposal', methods=['GET', 'POST'])
+@bp.route('/create_proposal', methods=['GET', 'POST'])
 def create_proposal():
     """Create new proposal page"""
     if request.method == 'POST':
@@ -114,16 +117,35 @@ def create_proposal():
             description = request.form.get('description')
             duration = request.form.get('duration', 24)
             
+            if not current_app.extensions['rate_limiter'].is_allowed(request.remote_addr, 'proposal'):
+                return "Proposal limit reached, try again later", 429
+            
             # Mock proposal creation
             proposal_id = 999
             
             logger.info(f"Proposal created: {title}")
-            return redirect(url_for('proposal_detail', proposal_id=proposal_id))
+            return redirect(url_for('dashboard.proposal_detail', proposal_id=proposal_id))
         except Exception as e:
             logger.error(f"Proposal creation error: {e}")
             return f"Error: {e}", 500
     
     return render_template('create_proposal.html')
 
+def create_app(limiter=None, metrics=None):
+    """Build the dashboard application; serve.py passes shared-memory state for multi-worker serving"""
+    app = Flask(__name__)
+    app.extensions['rate_limiter'] = limiter or rate_limiter
+    app.extensions['metrics'] = metrics = metrics or PerformanceMetrics()
+    app.register_blueprint(bp)
+    
+    @app.after_request
+    def count_request(response):
+        metrics.record_request(response.status_code)
+        return response
+    
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True, port=8080)
\ No newline at end of file
@@ -1,22 +1,54 @@
-from algosdk import account, mnemonic
-from algosdk.v2client import algod
-from algosdk.transaction import ApplicationCreateTxn, wait_for_confirmation
-from voting_contract import voting_contract
-from pyteal import compileTeal, Mode
-from config import ContractConfig
+from algosdk import account, encoding, mnemonic
+from algosdk.transaction import ApplicationCreateTxn, StateSchema
+from confirmation import wait_for_confirmation
+from voting_contract import voting_contract_optimized, voting_contract_template, TEMPLATE_PLACEHOLDERS
+from pyteal import Approve, compileTeal, Mode
+from config import ContractConfig, DEFAULT_VOTING_PERIOD, MIN_VOTES_REQUIRED, BULK_CONCURRENCY, BULK_GROUP_SIZE
 from utils import validate_address, get_account_balance
+import base64
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+GLOBAL_SCHEMA = StateSchema(num_uints=10, num_byte_slices=10)
+LOCAL_SCHEMA = StateSchema(num_uints=5, num_byte_slices=5)
+
+def compile_program(algod_client, teal):
+    """Assemble TEAL source into program bytes with algod"""
+    return base64.b64decode(algod_client.compile(teal)['result'])
+
+def compile_template(algod_client):
+    """Compile the template approval and clear programs once for many instances"""
+    approval = compile_program(algod_client, compileTeal(voting_contract_template(), Mode.Application, version=8))
+    clear = compile_program(algod_client, compileTeal(Approve(), Mode.Application, version=8))
+    return approval, clear
+
+def patch_program(template, admin, voting_period=DEFAULT_VOTING_PERIOD, min_votes=MIN_VOTES_REQUIRED):
+    """Approval program for one instance, with its parameters written over the template placeholders
+    
+    Each placeholder is a byte constant the same size as its value, so the
+    values replace it in place and no branch offsets move.
+    """
+    values = {
+        'TMPL_VOTING_PERIOD': int(voting_period).to_bytes(8, 'big'),
+        'TMPL_MIN_VOTES': int(min_votes).to_bytes(8, 'big'),
+        'TMPL_ADMIN': encoding.decode_address(admin)
+    }
+    program = template
+    for name, placeholder in TEMPLATE_PLACEHOLDERS.items():
+        # Byte constants are stored after their length, which keeps matches to whole constants
+        encoded = bytes([len(placeholder)]) + placeholder
+        if encoded not in program:
+            raise ValueError(f"{name} not found in template program")
+        program = program.replace(encoded, bytes([len(placeholder)]) + values[name])
+    return program
+
 def deploy_contract():
     """Deploy the voting smart contract to Algorand"""
     
     # Algorand client setup
-    algod_address = "https://testnet-api.algonode.cloud"
-    algod_token = ""
-    algod_client = algod.AlgodClient(algod_token, algod_address)
+    algod_client = ContractConfig().algod_client()
     
     # Account setup (use environment variables in production)
     private_key = os.getenv('PRIVATE_KEY')
@@ -26,13 +58,9 @@ def deploy_contract():
     
     sender = account.address_from_private_key(private_key)
     
-    # Compile contract
-    approval_program = compileTeal(voting_contract(), Mode.Application, version=8)
-    clear_program = compileTeal(Approve(), Mode.Application, version=8)
-    
-    # Contract parameters
-    global_schema = StateSchema(num_uints=10, num_byte_slices=10)
-    local_schema = StateSchema(num_uints=5, num_byte_slices=5)
+    # Compile contract; the optimized program is the one vote.get_results can read
+    approval_program = compile_program(algod_client, compileTeal(voting_contract_optimized(), Mode.Application, version=8))
+    clear_program = compile_program(algod_client, compileTeal(Approve(), Mode.Application, version=8))
     
     # Get suggested parameters
     params = algod_client.suggested_params()
@@ -42,10 +70,10 @@ def deploy_contract():
         sender=sender,
         sp=params,
         on_complete=0,
-        approval_program=approval_program.encode(),
-        clear_program=clear_program.encode(),
-        global_schema=global_schema,
-        local_schema=local_schema
+        approval_program=approval_program,
+        clear_program=clear_program,
+        global_schema=GLOBAL_SCHEMA,
+        local_schema=LOCAL_SCHEMA
     )
     
     # Sign and send transaction
@@ -53,7 +81,7 @@ def deploy_contract():
     tx_id = algod_client.send_transaction(signed_txn)
     
     # Wait for confirmation
-    result = wait_for_confirmation(algod_client, tx_id)
+    result = wait_for_confirmation(algod_client, tx_id, txn=txn)
     app_id = result['application-index']
     
     print(f"Contract deployed successfully!")
@@ -62,5 +90,32 @@ def deploy_contract():
     
     return app_id
 
+def deploy_many(records, results_path="deploy_results.csv", algod_client=None,
+                concurrency=BULK_CONCURRENCY, group_size=BULK_GROUP_SIZE, progress=None):
+    """Deploy one app per record (title, optional duration hours, min_votes and admin)
+    
+    The template is compiled once and patched per instance; creations go out
+    in parallel atomic groups, and each app is opened with create_proposal
+    and added to VotingDatabase as a proposal once confirmed.
+    """
+    import csv
+    from bulk import BulkSubmitter, RESULT_FIELDS, load_signing_keys
+    
+    private_key = os.getenv('PRIVATE_KEY')
+    if not private_key:
+        print("Please set PRIVATE_KEY in .env file")
+        return None
+    
+    algod_client = algod_client or ContractConfig().algod_client()
+    approval_template, clear_program = compile_template(algod_client)
+    submitter = BulkSubmitter(algod_client, load_signing_keys(private_key=private_key), concurrency=concurrency,
+                              group_size=group_size, progress=progress)
+    
+    with open(results_path, 'w', newline='') as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        return submitter.deploy_instances(records, writer, approval_template, clear_program,
+                                          account.address_from_private_key(private_key))
+
 if __name__ == "__main__":
     deploy_contract()
\ No newline at end of file
@@ -0,0 +1,294 @@
+"""
+Latency-aware algod endpoint pool with failover
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.error
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+import msgpack
+from algosdk import constants, error
+from algosdk.v2client import algod
+from logger import setup_logger
+from confirmation import block_transaction_ids
+from config import (
+    ENDPOINT_PROBE_INTERVAL, ENDPOINT_MAX_ROUND_LAG, ENDPOINT_TIMEOUT,
+    ENDPOINT_MAX_BACKOFF, ENDPOINT_PIN_CACHE_SIZE
+)
+
+# Smoothing of probe latencies; higher follows changes faster
+LATENCY_WEIGHT = 0.3
+# Rejections meaning a failed-over group already reached the ledger through the first node
+ALREADY_SUBMITTED = ("already in ledger", "transaction already in pool")
+# Prefix of every algod REST path outside constants.unversioned_paths
+API_VERSION_PREFIX = "/v2"
+
+class TimeoutAlgodClient(algod.AlgodClient):
+    """AlgodClient whose requests give up after a timeout instead of waiting forever
+    
+    The SDK opens its requests without a timeout and offers no way to pass
+    one, so algod_request is made here with urllib and the public constants.
+    """
+    
+    def __init__(self, algod_token, algod_address, headers=None, timeout=ENDPOINT_TIMEOUT):
+        super().__init__(algod_token, algod_address, headers)
+        self.timeout = timeout
+    
+    def algod_request(self, method, requrl, params=None, data=None, headers=None, response_format="json"):
+        header = {"User-Agent": "py-algorand-sdk"}
+        header.update(self.headers or {})
+        header.update(headers or {})
+        if requrl not in constants.no_auth:
+            header[constants.algod_auth_header] = self.algod_token
+        if requrl not in constants.unversioned_paths:
+            requrl = API_VERSION_PREFIX + requrl
+        if params:
+            requrl = requrl + "?" + urlencode(params)
+        
+        req = Request(self.algod_address + requrl, headers=header, method=method, data=data)
+        try:
+            resp = urlopen(req, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            body = e.read().decode("utf-8", "replace")
+            try:
+                message = json.loads(body)["message"]
+            except Exception:
+                message = body
+            raise error.AlgodHTTPError(message, e.code)
+        
+        if response_format != "json":
+            return resp.read()
+        body = resp.read()
+        # Some algod responses are an empty 200
+        return json.loads(body) if body else {}
+
+class Endpoint:
+    """One algod node and what the pool has learned about it"""
+    
+    def __init__(self, url, token="", timeout=ENDPOINT_TIMEOUT):
+        self.url = url
+        self.client = TimeoutAlgodClient(token, url, timeout=timeout)
+        self.latency = None
+        self.round = 0
+        self.failures = 0
+        self.retry_at = 0.0
+    
+    def healthy(self, now):
+        return self.failures == 0 or now >= self.retry_at
+    
+    def to_dict(self):
+        return {
+            'url': self.url, 'latency_ms': None if self.latency is None else round(self.latency * 1000, 1),
+            'round': self.round, 'failures': self.failures
+        }
+
+def is_retryable(e):
+    """Whether another node might succeed where this one failed"""
+    if isinstance(e, error.AlgodHTTPError):
+        return e.code is None or e.code >= 500
+    # URLError, timeouts and connection resets are all OSErrors
+    return isinstance(e, (OSError, error.AlgodResponseError))
+
+class EndpointPool:
+    """Route algod requests to the fastest node that is healthy and caught up
+    
+    A background thread probes every node's status, tracking latency and
+    round lag. Reads go to the best ranked node and move down the ranking
+    on connection errors or 5xx replies; a failed node is skipped with
+    exponential backoff until a probe or retry succeeds. Submissions send
+    the whole group to one node and remember it, so confirmation lookups
+    for those transactions ask the node that accepted them.
+    """
+    
+    def __init__(self, urls, token="", probe_interval=ENDPOINT_PROBE_INTERVAL,
+                 max_round_lag=ENDPOINT_MAX_ROUND_LAG, timeout=ENDPOINT_TIMEOUT,
+                 max_backoff=ENDPOINT_MAX_BACKOFF, pin_cache_size=ENDPOINT_PIN_CACHE_SIZE):
+        if not urls:
+            raise ValueError("EndpointPool needs at least one algod URL")
+        self.logger = setup_logger("endpoints")
+        self.endpoints = [Endpoint(url, token, timeout) for url in urls]
+        self.token = token
+        self.probe_interval = probe_interval
+        self.max_round_lag = max_round_lag
+        self.max_backoff = max_backoff
+        self.pin_cache_size = pin_cache_size
+        self.pins = OrderedDict()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.pid = None
+    
+    def probe_endpoint(self, endpoint):
+        started = time.monotonic()
+        try:
+            status = endpoint.client.status()
+        except Exception as e:
+            self._failed(endpoint, e)
+            return
+        
+        latency = time.monotonic() - started
+        with self.lock:
+            endpoint.latency = latency if endpoint.latency is None else (
+                LATENCY_WEIGHT * latency + (1 - LATENCY_WEIGHT) * endpoint.latency
+            )
+            endpoint.round = status.get('last-round', 0)
+            endpoint.failures = 0
+    
+    def probe(self):
+        """Probe every node at once, so one stalled node does not delay the others"""
+        with ThreadPoolExecutor(max_workers=len(self.endpoints)) as pool:
+            list(pool.map(self.probe_endpoint, self.endpoints))
+    
+    def _probe_loop(self):
+        while not self.stop_event.wait(self.probe_interval):
+            self.probe()
+    
+    def start(self):
+        """Probe once and start the background prober; again in a forked child"""
+        with self.lock:
+            if self.pid == os.getpid() and self.thread is not None:
+                return
+            self.pid = os.getpid()
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._probe_loop, name="endpoint-prober", daemon=True)
+        
+        self.probe()
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        with self.lock:
+            self.thread = None
+    
+    def ranked(self):
+        """Nodes in the order requests should try them"""
+        now = time.monotonic()
+        with self.lock:
+            tip = max(endpoint.round for endpoint in self.endpoints)
+            
+            def rank(endpoint):
+                if not endpoint.healthy(now):
+                    return (2, endpoint.retry_at)
+                lagging = tip - endpoint.round > self.max_round_lag
+                return (int(lagging), endpoint.latency if endpoint.latency is not None else float('inf'))
+            
+            return sorted(self.endpoints, key=rank)
+    
+    def _failed(self, endpoint, e):
+        with self.lock:
+            endpoint.failures += 1
+            backoff = min(self.max_backoff, 2 ** (endpoint.failures - 1))
+            endpoint.retry_at = time.monotonic() + backoff
+        self.logger.warning(f"algod {endpoint.url} failed ({e}); skipping it for {backoff}s")
+    
+    def _succeeded(self, endpoint):
+        if endpoint.failures:
+            with self.lock:
+                endpoint.failures = 0
+            self.logger.info(f"algod {endpoint.url} recovered")
+    
+    def call(self, method, *args, prefer=None, recover=None, **kwargs):
+        """Call a client method on the best node, failing over to the next on node errors
+        
+        After a failover, recover(error) may turn a node's rejection into a
+        result (or return None to raise it).
+        """
+        self.start()
+        endpoints = self.ranked()
+        if prefer is not None and prefer in endpoints:
+            endpoints.remove(prefer)
+            endpoints.insert(0, prefer)
+        
+        last_error = None
+        for attempt, endpoint in enumerate(endpoints):
+            try:
+                result = getattr(endpoint.client, method)(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The node answered, so it is up; the request itself was refused
+                    self._succeeded(endpoint)
+                    recovered = recover(e) if attempt and recover is not None else None
+                    if recovered is None:
+                        raise
+                    return endpoint, recovered
+                self._failed(endpoint, e)
+                last_error = e
+                continue
+            
+            self._succeeded(endpoint)
+            return endpoint, result
+        raise last_error
+    
+    def submit(self, method, requrl, params=None, data=None, headers=None, response_format="json"):
+        """POST a transaction group to one node and pin its transaction ids to that node"""
+        unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+        unpacker.feed(data or b"")
+        tx_ids = [tx_id for tx_id, _ in block_transaction_ids({'txns': list(unpacker)})]
+        
+        def recover(e):
+            # A node that timed out may still have accepted the group before failing over
+            if any(marker in str(e) for marker in ALREADY_SUBMITTED):
+                return {'txId': tx_ids[0]}
+            return None
+        
+        endpoint, result = self.call('algod_request', method, requrl, params, data, headers, response_format,
+                                     recover=recover)
+        with self.lock:
+            for tx_id in tx_ids:
+                self.pins[tx_id] = endpoint
+                self.pins.move_to_end(tx_id)
+            while len(self.pins) > self.pin_cache_size:
+                self.pins.popitem(last=False)
+        return result
+    
+    def pinned(self, tx_id):
+        with self.lock:
+            return self.pins.get(tx_id)
+    
+    def status(self):
+        """Snapshot of every node, best first"""
+        return [endpoint.to_dict() for endpoint in self.ranked()]
+    
+    def client(self):
+        return PooledAlgodClient(self)
+
+class PooledAlgodClient(algod.AlgodClient):
+    """AlgodClient that sends each request through an EndpointPool
+    
+    Every SDK method works unchanged because they all go through
+    algod_request, which this class routes instead of calling one node.
+    """
+    
+    def __init__(self, pool):
+        # The joined URLs identify the pool, e.g. for the shared confirmation tracker
+        super().__init__(pool.token, ",".join(endpoint.url for endpoint in pool.endpoints))
+        self.pool = pool
+    
+    def algod_request(self, method, requrl, params=None, data=None, headers=None, response_format="json"):
+        if method == "POST" and requrl == "/transactions":
+            return self.pool.submit(method, requrl, params, data, headers, response_format)
+        
+        prefer = None
+        if requrl.startswith("/transactions/pending/"):
+            prefer = self.pool.pinned(requrl.rsplit("/", 1)[-1])
+        _, result = self.pool.call('algod_request', method, requrl, params, data, headers, response_format,
+                                   prefer=prefer)
+        return result
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_endpoint_pool(urls, token=""):
+    """Get the shared pool for a set of algod nodes, so each process probes them once"""
+    key = (tuple(urls), token)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = EndpointPool(list(urls), token)
+            _pools[key] = pool
+        return pool
@@ -42,6 +42,32 @@ class ContractNotFoundError(VotingContractError):
         self.message = message
         super().__init__(self.message)
 
+class RestoreError(VotingContractError):
+    """Raised when a backup cannot be restored or fails verification"""
+    def __init__(self, message="Backup restore failed"):
+        self.message = message
+        super().__init__(self.message)
+
+class ProgramRejectedError(VotingContractError):
+    """Raised when an approval program fails (err, failed assert, bad access or arithmetic)"""
+    def __init__(self, message="Approval program rejected the transaction"):
+        self.message = message
+        super().__init__(self.message)
+
+class ConfirmationTimeoutError(VotingContractError):
+    """Raised when a transaction is not confirmed within the wait window"""
+    def __init__(self, message="Transaction confirmation timed out"):
+        self.message = message
+        super().__init__(self.message)
+
+class TransactionExpiredError(VotingContractError):
+    """Raised when a transaction's last valid round passes without confirmation"""
+    def __init__(self, message="Transaction expired before confirmation", tx_id=None, last_valid_round=None):
+        self.message = message
+        self.tx_id = tx_id
+        self.last_valid_round = last_valid_round
+        super().__init__(self.message)
+
 def handle_contract_error(error, logger=None):
     """Handle and log contract errors"""
     if isinstance(error, VotingContractError):
@@ -0,0 +1,324 @@
+"""
+Synthetic voter load generator for the voting API
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+def arrival_offsets(voters, duration, open_burst=0.3, close_spike=0.3, seed=None):
+    """Sorted arrival times (seconds after voting opens) for each voter
+    
+    A share of voters arrive in a burst right after opening, another share
+    in a spike just before voting_end, and the rest uniformly in between.
+    """
+    rng = random.Random(seed)
+    burst_scale = duration * 0.05
+    offsets = []
+    for _ in range(voters):
+        draw = rng.random()
+        if draw < open_burst:
+            offset = rng.expovariate(1 / burst_scale)
+        elif draw < open_burst + close_spike:
+            offset = duration - rng.expovariate(1 / burst_scale)
+        else:
+            offset = rng.uniform(0, duration)
+        offsets.append(min(max(offset, 0.0), duration))
+    return sorted(offsets)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class EndpointStats:
+    """Latencies and status counts for one endpoint"""
+    
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.outcomes = Counter()
+        self.completed_at = []
+        self.items = 0
+        self.lock = threading.Lock()
+    
+    def record(self, status, latency, completed_at, items=1, outcomes=None):
+        with self.lock:
+            self.items += items
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.outcomes.update(outcomes or {})
+            self.completed_at.append(completed_at)
+    
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        total = len(latencies)
+        # A refused request is an error too; 429s are counted separately as rate limited
+        errors = sum(count for status, count in self.statuses.items()
+                     if status == 'error' or (status >= 400 and status != 429))
+        outcomes = sum(self.outcomes.values())
+        
+        # Busiest one-second window, which is what capacity has to cover
+        per_second = {}
+        for completed_at in self.completed_at:
+            per_second[int(completed_at)] = per_second.get(int(completed_at), 0) + 1
+        
+        return {
+            'requests': total,
+            'items': self.items,
+            'throughput_rps': round(total / elapsed, 1) if elapsed else 0.0,
+            'items_per_second': round(self.items / elapsed, 1) if elapsed else 0.0,
+            'peak_rps': max(per_second.values(), default=0),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.50) * 1000, 1),
+                'p90': round(percentile(latencies, 0.90) * 1000, 1),
+                'p99': round(percentile(latencies, 0.99) * 1000, 1),
+                'max': round(latencies[-1] * 1000, 1) if latencies else 0.0
+            },
+            'error_rate': round(errors / total, 4) if total else 0.0,
+            'rate_limited': self.statuses.get(429, 0),
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items(), key=str)},
+            # What happened to each vote, so a target rejecting everything cannot look healthy
+            'item_outcomes': dict(sorted(self.outcomes.items())),
+            'item_failure_rate': round(self.outcomes['failed'] / outcomes, 4) if outcomes else 0.0
+        }
+
+class LoadGenerator:
+    """Open-loop load generator: requests start at their scheduled arrival time"""
+    
+    def __init__(self, api_url, concurrency=64, timeout=30):
+        parsed = urlparse(api_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.local = threading.local()
+        self.stats = {
+            'GET /api/proposals': EndpointStats(),
+            'POST /api/vote': EndpointStats(),
+            'POST /api/votes/batch': EndpointStats()
+        }
+    
+    def _connection(self):
+        # One keep-alive connection per worker thread
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self.local.connection
+    
+    def _request(self, method, path, body, scheduled_at, items=1):
+        endpoint = f"{method} {path}"
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        try:
+            connection = self._connection()
+            connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+            status = response.status
+        except Exception:
+            self.local.connection = None
+            status, body = 'error', None
+        now = time.perf_counter()
+        # Measured from the scheduled arrival, so queueing behind a slow server is counted
+        outcomes = self._outcomes(status, body, items) if method == 'POST' else None
+        self.stats[endpoint].record(status, now - scheduled_at, now, items, outcomes)
+    
+    @staticmethod
+    def _outcomes(status, body, items):
+        """Count the request's votes as submitted, rate_limited or failed"""
+        if status == 429:
+            return {'rate_limited': items}
+        if status != 200:
+            return {'failed': items}
+        try:
+            result = json.loads(body)
+        except ValueError:
+            return {'failed': items}
+        # A batch answers 200 with a status per vote
+        statuses = [item.get('status') for item in result['results']] if 'results' in result else [result.get('status')]
+        return Counter(status if status in ('submitted', 'rate_limited') else 'failed' for status in statuses)
+    
+    def _voter_session(self, voter, scheduled_at):
+        self._request('GET', '/api/proposals', None, scheduled_at)
+        # Follow-up requests in a session are timed from when they are sent
+        for _ in range(voter['attempts']):
+            self._request('POST', '/api/vote', voter['payload'], time.perf_counter())
+    
+    def _relay_session(self, batch, scheduled_at):
+        votes = [voter['payload'] for voter in batch for _ in range(voter['attempts'])]
+        self._request('POST', '/api/votes/batch', {'votes': votes}, scheduled_at, len(votes))
+    
+    def run(self, voters, offsets, relay_batch=0):
+        """Replay voter sessions at their arrival offsets and return the report
+        
+        With relay_batch, votes are forwarded by a relayer in batches of that
+        size, each sent when its last voter arrives.
+        """
+        if relay_batch:
+            sessions = [
+                (self._relay_session, voters[start:start + relay_batch], offsets[min(start + relay_batch, len(offsets)) - 1])
+                for start in range(0, len(voters), relay_batch)
+            ]
+        else:
+            sessions = [(self._voter_session, voter, offset) for voter, offset in zip(voters, offsets)]
+        
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for session, work, offset in sessions:
+                scheduled_at = started + offset
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(session, work, scheduled_at)
+        elapsed = time.perf_counter() - started
+        
+        return {
+            'voters': len(voters),
+            'elapsed_s': round(elapsed, 2),
+            'endpoints': {
+                endpoint: stats.summary(elapsed) for endpoint, stats in self.stats.items() if stats.latencies
+            }
+        }
+
+def build_voters(count, algod_url, app_id=1, proposal_id=1, duplicate_rate=0.02, seed=None):
+    """Create voter accounts with pre-signed vote transactions"""
+    from algosdk import account
+    from algosdk.v2client import algod
+    from txn_templates import VoteTxnTemplate
+    
+    rng = random.Random(seed)
+    # Every vote shares the params window, so only sender and option are encoded per voter
+    template = VoteTxnTemplate(app_id, algod.AlgodClient("", algod_url).suggested_params())
+    voters = []
+    for _ in range(count):
+        private_key, address = account.generate_account()
+        option = rng.choice(['yes', 'no', 'abstain'])
+        voters.append({
+            'payload': {
+                'proposal_id': proposal_id, 'vote_option': option, 'voter_address': address,
+                'signed_txn': base64.b64encode(template.sign(private_key, option)).decode()
+            },
+            # Some voters retry, which the API's per-voter rate limit should reject
+            'attempts': 2 if rng.random() < duplicate_rate else 1
+        })
+    return voters
+
+def _serve_algod(port_queue, block_time, latency, error_rate):
+    from algod_standin import serve
+    serve(0, block_time, latency, error_rate, ready=port_queue.put)
+
+def _serve_api(port_queue, algod_url, log_path, app_id=1):
+    # Route per-request console logging away from the report before the API sets up its loggers
+    sys.stderr = open(log_path, 'a')
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    from algosdk.v2client import algod
+    from werkzeug.serving import make_server
+    from api import create_app
+    from schema import VotingDatabase
+    
+    # The API checks each vote's app against its proposal, so the run gets a database where
+    # proposal 1 is the voters' app
+    db = VotingDatabase(os.path.join(tempfile.mkdtemp(prefix="loadgen-"), "voting_data.db"))
+    db.add_proposal(app_id, "Load test", "LOADGEN", None)
+    app = create_app(algod_client=algod.AlgodClient("", algod_url), db=db)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+def _start(target, *args):
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=target, args=(port_queue,) + args, daemon=True)
+    process.start()
+    return process, port_queue.get(timeout=30)
+
+def _wait_ready(host, port, path, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=1)
+            connection.request('GET', path)
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{host}:{port} did not become ready")
+
+def algod_stats(algod_url):
+    parsed = urlparse(algod_url)
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=5)
+    connection.request('GET', '/stats')
+    return json.loads(connection.getresponse().read())
+
+def print_report(report, algod=None):
+    print(f"\n{report['voters']} voters in {report['elapsed_s']}s")
+    for endpoint, summary in report['endpoints'].items():
+        latency = summary['latency_ms']
+        print(f"{endpoint}")
+        print(f"  requests {summary['requests']}  throughput {summary['throughput_rps']}/s  peak {summary['peak_rps']}/s"
+              f"  items {summary['items_per_second']}/s")
+        print(f"  latency p50 {latency['p50']}ms  p90 {latency['p90']}ms  p99 {latency['p99']}ms  max {latency['max']}ms")
+        print(f"  errors {summary['error_rate']:.2%}  rate limited {summary['rate_limited']}  statuses {summary['statuses']}")
+        if summary['item_outcomes']:
+            print(f"  votes {summary['item_outcomes']}  failed {summary['item_failure_rate']:.2%}")
+    if algod:
+        print(f"algod stand-in: {algod}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--voters", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=60, help="Seconds the voting window is compressed into")
+    parser.add_argument("--open-burst", type=float, default=0.3, help="Share of voters arriving at open")
+    parser.add_argument("--close-spike", type=float, default=0.3, help="Share of voters arriving before voting_end")
+    parser.add_argument("--duplicate-rate", type=float, default=0.02, help="Share of voters who vote twice")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent client connections")
+    parser.add_argument("--relay-batch", type=int, default=0, help="Send votes through /api/votes/batch in batches")
+    parser.add_argument("--api-url", help="Target an already running API instead of starting one")
+    parser.add_argument("--algod-url", help="Target an already running algod stand-in")
+    parser.add_argument("--block-time", type=float, default=1.0)
+    parser.add_argument("--algod-latency-ms", type=float, default=0)
+    parser.add_argument("--algod-error-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", dest="json_path", help="Write the report to this file")
+    args = parser.parse_args()
+    
+    algod_url = args.algod_url
+    if not algod_url:
+        _, algod_port = _start(_serve_algod, args.block_time, args.algod_latency_ms / 1000, args.algod_error_rate)
+        algod_url = f"http://127.0.0.1:{algod_port}"
+    
+    api_url = args.api_url
+    if not api_url:
+        os.makedirs("logs", exist_ok=True)
+        _, api_port = _start(_serve_api, algod_url, os.path.join("logs", "loadgen_api.log"))
+        api_url = f"http://127.0.0.1:{api_port}"
+    parsed = urlparse(api_url)
+    _wait_ready(parsed.hostname, parsed.port, '/api/proposals')
+    
+    print(f"Signing votes for {args.voters} voters against {algod_url}...")
+    voters = build_voters(args.voters, algod_url, duplicate_rate=args.duplicate_rate, seed=args.seed)
+    offsets = arrival_offsets(args.voters, args.duration, args.open_burst, args.close_spike, seed=args.seed)
+    
+    print(f"Driving {api_url} for {args.duration}s...")
+    report = LoadGenerator(api_url, args.concurrency).run(voters, offsets, args.relay_batch)
+    report['algod'] = algod_stats(algod_url)
+    print_report(report, report['algod'])
+    
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    
+    # Smoke check: a run where no vote reached algod measured nothing but rejections
+    if not report['algod'].get('submitted'):
+        sys.exit("No vote reached algod; see the statuses and vote outcomes above")
@@ -6,17 +6,27 @@ import logging
 import os
 from datetime import datetime
 
+class LazyFileHandler(logging.FileHandler):
+    """File handler that creates its directory and opens the file on the first record"""
+    
+    def __init__(self, filename):
+        super().__init__(filename, delay=True)
+    
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
 def setup_logger(name="voting_contract", level=logging.INFO):
     """Setup logger with file and console handlers"""
     
-    # Create logs directory if it doesn't exist
-    if not os.path.exists("logs"):
-        os.makedirs("logs")
-    
     # Create logger
     logger = logging.getLogger(name)
     logger.setLevel(level)
     
+    # Handlers are attached once per logger, however often it is set up
+    if logger.handlers:
+        return logger
+    
     # Create formatters
     file_formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -25,9 +35,9 @@ def setup_logger(name="voting_contract", level=logging.INFO):
         '%(levelname)s: %(message)s'
     )
     
-    # File handler
+    # File handler (logs directory and file are created on first write)
     log_filename = f"logs/voting_contract_{datetime.now().strftime('%Y%m%d')}.log"
-    file_handler = logging.FileHandler(log_filename)
+    file_handler = LazyFileHandler(log_filename)
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(file_formatter)
     
@@ -3,27 +3,35 @@ Performance metrics for voting contract
 """
 
 import time
-import psutil
 from datetime import datetime
 from logger import setup_logger
+from shared_state import SharedCounters
+
+METRIC_COUNTERS = ['transactions', 'errors', 'requests', 'server_errors']
 
 class PerformanceMetrics:
-    def __init__(self):
+    def __init__(self, counters=None):
         self.logger = setup_logger("metrics")
         self.start_time = time.time()
-        self.transaction_count = 0
-        self.error_count = 0
+        # Counters live in shared memory so forked workers report one total
+        self.counters = counters or SharedCounters(METRIC_COUNTERS)
+    
+    @property
+    def transaction_count(self):
+        return self.counters.get('transactions')
+    
+    @property
+    def error_count(self):
+        return self.counters.get('errors')
     
     def record_transaction(self, tx_type, duration):
         """Record transaction performance"""
         try:
-            self.transaction_count += 1
-            
             metric = {
                 'type': tx_type,
                 'duration': duration,
                 'timestamp': datetime.now().isoformat(),
-                'total_transactions': self.transaction_count
+                'total_transactions': self.counters.increment('transactions')
             }
             
             self.logger.info(f"Transaction recorded: {tx_type} - {duration:.3f}s")
@@ -35,6 +43,8 @@ class PerformanceMetrics:
     def get_system_metrics(self):
         """Get system performance metrics"""
         try:
+            import psutil
+            
             metrics = {
                 'cpu_percent': psutil.cpu_percent(interval=1),
                 'memory_percent': psutil.virtual_memory().percent,
@@ -64,13 +74,11 @@ class PerformanceMetrics:
     def record_error(self, error_type, details=None):
         """Record error occurrence"""
         try:
-            self.error_count += 1
-            
             error_metric = {
                 'type': error_type,
                 'details': details,
                 'timestamp': datetime.now().isoformat(),
-                'total_errors': self.error_count
+                'total_errors': self.counters.increment('errors')
             }
             
             self.logger.warning(f"Error recorded: {error_type}")
@@ -79,6 +87,12 @@ class PerformanceMetrics:
             self.logger.error(f"Error recording failed: {e}")
             return None
     
+    def record_request(self, status_code):
+        """Count a served HTTP request"""
+        self.counters.increment('requests')
+        if status_code >= 500:
+            self.counters.increment('server_errors')
+    
     def generate_report(self):
         """Generate performance report"""
         try:
@@ -2,31 +2,78 @@
 Database migration scripts for voting contract
 """
 
+import json
 import sqlite3
 import os
+import time
 from datetime import datetime
 from logger import setup_logger
+from subscribers import create_subscriber_tables
 
 class DatabaseMigration:
     def __init__(self, db_path="voting_data.db"):
         self.db_path = db_path
         self.logger = setup_logger("migration")
+        self.index_timings = []
         self.migrations = [
             self.migration_001_initial_schema,
             self.migration_002_add_indexes,
             self.migration_003_add_audit_table,
-            self.migration_004_add_user_preferences
+            self.migration_004_add_user_preferences,
+            self.migration_005_add_notification_subscriptions,
+            self.migration_006_add_confirmed_round
         ]
+        self.rollbacks = {
+            2: self.rollback_002_add_indexes,
+            3: self.rollback_003_add_audit_table,
+            4: self.rollback_004_add_user_preferences,
+            5: self.rollback_005_add_notification_subscriptions,
+            6: self.rollback_006_add_confirmed_round
+        }
     
-    def migration_001_initial_schema(self, cursor):
-        """Initial database schema"""
+    def _create_version_table(self, cursor):
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS schema_version (
                 version INTEGER PRIMARY KEY,
-                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                name TEXT,
+                duration_ms REAL,
+                index_timings TEXT
             )
         ''')
         
+        # Databases migrated before timings were recorded lack the newer columns
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(schema_version)')]
+        for column, column_type in [('name', 'TEXT'), ('duration_ms', 'REAL'), ('index_timings', 'TEXT')]:
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE schema_version ADD COLUMN {column} {column_type}')
+    
+    def _create_votes_table(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS votes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                proposal_id INTEGER,
+                voter_address TEXT NOT NULL,
+                vote_option TEXT NOT NULL,
+                voted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                tx_id TEXT,
+                FOREIGN KEY (proposal_id) REFERENCES proposals (id)
+            )
+        ''')
+    
+    def _create_index(self, cursor, name, table, columns):
+        """Create an index and record how long the build took"""
+        started = time.perf_counter()
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})')
+        duration_ms = (time.perf_counter() - started) * 1000
+        
+        self.index_timings.append({'index': name, 'table': table, 'duration_ms': round(duration_ms, 3)})
+        self.logger.info(f"Index {name} built in {duration_ms:.1f} ms")
+    
+    def migration_001_initial_schema(self, cursor):
+        """Initial database schema"""
+        self._create_version_table(cursor)
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS proposals (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -40,14 +87,19 @@ class DatabaseMigration:
             )
         ''')
         
+        self._create_votes_table(cursor)
+        
         self.logger.info("Migration 001: Initial schema created")
     
     def migration_002_add_indexes(self, cursor):
         """Add database indexes for performance"""
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_proposals_status ON proposals(status)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_proposals_creator ON proposals(creator)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_votes_proposal ON votes(proposal_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_votes_voter ON votes(voter_address)')
+        # Databases initialized before migration 001 created votes need it here
+        self._create_votes_table(cursor)
+        
+        self._create_index(cursor, 'idx_proposals_status', 'proposals', 'status')
+        self._create_index(cursor, 'idx_proposals_creator', 'proposals', 'creator')
+        self._create_index(cursor, 'idx_votes_proposal', 'votes', 'proposal_id')
+        self._create_index(cursor, 'idx_votes_voter', 'votes', 'voter_address')
         
         self.logger.info("Migration 002: Indexes added")
     
@@ -82,6 +134,48 @@ class DatabaseMigration:
         
         self.logger.info("Migration 004: User preferences table created")
     
+    def migration_005_add_notification_subscriptions(self, cursor):
+        """Store notification subscribers in user preferences"""
+        create_subscriber_tables(cursor)
+        
+        self.logger.info("Migration 005: Notification subscriptions added")
+    
+    def migration_006_add_confirmed_round(self, cursor):
+        """Track the round each vote and transaction confirmed in for round-range exports"""
+        tables = [row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in ['votes', 'transactions']:
+            if table not in tables:
+                continue
+            columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+            if 'confirmed_round' not in columns:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN confirmed_round INTEGER')
+            self._create_index(cursor, f'idx_{table}_round', table, 'confirmed_round')
+        
+        self.logger.info("Migration 006: Confirmed round columns added")
+    
+    def rollback_002_add_indexes(self, cursor):
+        """Drop performance indexes"""
+        for name in ['idx_proposals_status', 'idx_proposals_creator', 'idx_votes_proposal', 'idx_votes_voter']:
+            cursor.execute(f'DROP INDEX IF EXISTS {name}')
+    
+    def rollback_003_add_audit_table(self, cursor):
+        """Drop audit logging table"""
+        cursor.execute('DROP TABLE IF EXISTS audit_log')
+    
+    def rollback_004_add_user_preferences(self, cursor):
+        """Drop user preferences table"""
+        cursor.execute('DROP TABLE IF EXISTS user_preferences')
+    
+    def rollback_005_add_notification_subscriptions(self, cursor):
+        """Drop notification subscriptions (the email column is kept)"""
+        cursor.execute('DROP TABLE IF EXISTS notification_subscriptions')
+        cursor.execute('DROP INDEX IF EXISTS idx_user_preferences_email')
+    
+    def rollback_006_add_confirmed_round(self, cursor):
+        """Drop the round indexes (the confirmed_round columns are kept)"""
+        cursor.execute('DROP INDEX IF EXISTS idx_votes_round')
+        cursor.execute('DROP INDEX IF EXISTS idx_transactions_round')
+    
     def get_current_version(self):
         """Get current schema version"""
         try:
@@ -96,46 +190,115 @@ class DatabaseMigration:
         except sqlite3.OperationalError:
             return 0
     
-    def run_migrations(self):
-        """Run all pending migrations"""
+    def _record_version(self, conn, version, migration, started):
+        duration_ms = (time.perf_counter() - started) * 1000
+        conn.execute('''
+            INSERT INTO schema_version (version, name, duration_ms, index_timings)
+            VALUES (?, ?, ?, ?)
+        ''', (version, migration.__name__, round(duration_ms, 3), json.dumps(self.index_timings)))
+        return duration_ms
+    
+    def run_migrations(self, analyze=False):
+        """Run all pending migrations, each in its own transaction"""
+        conn = None
         try:
             current_version = self.get_current_version()
             self.logger.info(f"Current schema version: {current_version}")
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # Autocommit mode so each migration controls its own BEGIN/COMMIT
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            self._create_version_table(conn.cursor())
             
             for i, migration in enumerate(self.migrations):
                 version = i + 1
-                if version > current_version:
-                    self.logger.info(f"Running migration {version:03d}")
-                    migration(cursor)
-                    
-                    cursor.execute(
-                        'INSERT INTO schema_version (version) VALUES (?)',
-                        (version,)
-                    )
-                    
-                    conn.commit()
+                if version <= current_version:
+                    continue
+                
+                self.logger.info(f"Running migration {version:03d}")
+                self.index_timings = []
+                started = time.perf_counter()
+                
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    migration(conn.cursor())
+                    duration_ms = self._record_version(conn, version, migration, started)
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                
+                self.logger.info(f"Migration {version:03d} applied in {duration_ms:.1f} ms")
+            
+            if analyze:
+                started = time.perf_counter()
+                conn.execute('ANALYZE')
+                self.logger.info(f"ANALYZE completed in {(time.perf_counter() - started) * 1000:.1f} ms")
             
-            conn.close()
             self.logger.info("All migrations completed successfully")
             return True
         except Exception as e:
             self.logger.error(f"Migration failed: {e}")
             return False
+        finally:
+            if conn is not None:
+                conn.close()
+    
+    def get_migration_history(self):
+        """Get applied migrations with their durations and index build timings"""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute('''
+            SELECT version, name, applied_at, duration_ms, index_timings
+            FROM schema_version ORDER BY version
+        ''').fetchall()
+        conn.close()
+        
+        return [
+            {
+                'version': version,
+                'name': name,
+                'applied_at': applied_at,
+                'duration_ms': duration_ms,
+                'index_timings': json.loads(index_timings) if index_timings else []
+            }
+            for version, name, applied_at, duration_ms, index_timings in rows
+        ]
     
     def rollback_migration(self, target_version):
-        """Rollback to specific version (simplified)"""
+        """Roll back applied migrations above target_version, newest first"""
+        conn = None
         try:
-            self.logger.warning(f"Rollback to version {target_version} requested")
-            # In a real implementation, this would contain rollback logic
+            current_version = self.get_current_version()
+            self.logger.warning(f"Rollback from version {current_version} to {target_version} requested")
+            
+            missing = [v for v in range(target_version + 1, current_version + 1)
+                       if v not in self.rollbacks]
+            if missing:
+                self.logger.error(f"No rollback defined for migrations {missing}")
+                return False
+            
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            for version in range(current_version, target_version, -1):
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    self.rollbacks[version](conn.cursor())
+                    conn.execute('DELETE FROM schema_version WHERE version = ?', (version,))
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                self.logger.info(f"Rolled back migration {version:03d}")
+            
             self.logger.info("Rollback completed")
             return True
         except Exception as e:
             self.logger.error(f"Rollback failed: {e}")
             return False
+        finally:
+            if conn is not None:
+                conn.close()
 
 if __name__ == "__main__":
+    import sys
+    
     migration = DatabaseMigration()
-    migration.run_migrations()
\ No newline at end of file
+    migration.run_migrations(analyze='--analyze' in sys.argv)
\ No newline at end of file
@@ -3,15 +3,16 @@ Monitoring script for voting contract health
 """
 
 import time
-from algosdk.v2client import algod
 from logger import setup_logger
 from config import ContractConfig
+from state_decoder import StateDecoder
 
 class ContractMonitor:
     def __init__(self):
         self.logger = setup_logger("monitor")
         self.config = ContractConfig()
-        self.algod_client = algod.AlgodClient("", self.config.algod_url)
+        self.algod_client = self.config.algod_client()
+        self.decoder = StateDecoder(self.algod_client)
     
     def check_network_health(self):
         """Check Algorand network connectivity"""
@@ -33,6 +34,16 @@ class ContractMonitor:
             self.logger.error(f"Contract monitoring failed: {e}")
             return None
     
+    def get_tally(self, app_id):
+        """Decoded tallies and voting window of a contract at the current round"""
+        try:
+            tally = self.decoder.tally(app_id)
+            self.logger.info(f"Contract {app_id} at round {tally.round}: {tally.total_votes} votes")
+            return tally
+        except Exception as e:
+            self.logger.error(f"Contract state decode failed: {e}")
+            return None
+    
     def run_monitoring(self, interval=60):
         """Run continuous monitoring"""
         self.logger.info("Starting contract monitoring...")
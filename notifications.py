@@ -10,13 +10,20 @@ from datetime import datetime
 from logger import setup_logger
 
 class NotificationManager:
-    def __init__(self):
+    def __init__(self, outbox=None, registry=None):
         self.logger = setup_logger("notifications")
         self.subscribers = []
+        self.outbox = outbox
+        self.registry = registry
     
-    def add_subscriber(self, email, notification_types=None):
+    def add_subscriber(self, email, notification_types=None, user_address=None):
         """Add email subscriber for notifications"""
         try:
+            if self.registry is not None:
+                self.registry.add_subscriber(email, notification_types, user_address=user_address)
+                self.logger.info(f"Added subscriber: {email}")
+                return True
+            
             subscriber = {
                 'email': email,
                 'types': notification_types or ['all'],
@@ -44,7 +51,7 @@ class NotificationManager:
             
             self.logger.info(f"Sending proposal notification for: {proposal_title}")
             # Mock email sending
-            return self._mock_send_email("New Proposal", message)
+            return self._send_email("proposal", "New Proposal", message)
         except Exception as e:
             self.logger.error(f"Proposal notification failed: {e}")
             return False
@@ -62,7 +69,7 @@ class NotificationManager:
             """
             
             self.logger.info(f"Sending voting reminder for proposal {proposal_id}")
-            return self._mock_send_email("Voting Reminder", message)
+            return self._send_email("reminder", "Voting Reminder", message)
         except Exception as e:
             self.logger.error(f"Voting reminder failed: {e}")
             return False
@@ -80,11 +87,29 @@ class NotificationManager:
             """
             
             self.logger.info(f"Sending results notification for proposal {proposal_id}")
-            return self._mock_send_email("Voting Results", message)
+            return self._send_email("results", "Voting Results", message)
         except Exception as e:
             self.logger.error(f"Results notification failed: {e}")
             return False
     
+    def _recipients(self, notification_type):
+        """Yield subscriber emails interested in a notification type"""
+        if self.registry is not None:
+            yield from self.registry.iter_recipients(notification_type)
+            return
+        
+        for subscriber in self.subscribers:
+            if 'all' in subscriber['types'] or notification_type in subscriber['types']:
+                yield subscriber['email']
+    
+    def _send_email(self, notification_type, subject, message):
+        """Queue email for subscribers through the outbox when one is configured"""
+        if self.outbox is None:
+            return self._mock_send_email(subject, message)
+        
+        self.outbox.enqueue(notification_type, subject, message, self._recipients(notification_type))
+        return True
+    
     def _mock_send_email(self, subject, message):
         """Mock email sending for demonstration"""
         self.logger.info(f"Email sent - Subject: {subject}")
@@ -0,0 +1,323 @@
+"""
+Durable notification outbox for voting contract events
+"""
+
+import smtplib
+import sqlite3
+import threading
+import time
+from email.mime.text import MIMEText
+from logger import setup_logger
+from config import (
+    SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_USE_TLS, NOTIFICATION_SENDER,
+    OUTBOX_WORKERS, OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BACKOFF
+)
+
+def default_smtp_factory():
+    """Open an SMTP connection using the configured server"""
+    smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+    if SMTP_USE_TLS:
+        smtp.starttls()
+    if SMTP_USERNAME:
+        smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+    return smtp
+
+class NotificationOutbox:
+    """SQLite-backed outbox drained by a pool of SMTP workers"""
+    
+    def __init__(self, db_path="voting_data.db", smtp_factory=None, workers=OUTBOX_WORKERS,
+                 batch_size=OUTBOX_BATCH_SIZE, max_attempts=OUTBOX_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.logger = setup_logger("outbox")
+        self.smtp_factory = smtp_factory or default_smtp_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.threads = []
+        self.stop_event = threading.Event()
+        # Workers wait on the condition until the generation moves, so no enqueue is missed
+        self.wakeup = threading.Condition()
+        self.generation = 0
+        self.init_outbox()
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+    
+    def init_outbox(self):
+        """Initialize outbox tables"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS outbox_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                notification_type TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS outbox_deliveries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id INTEGER NOT NULL,
+                recipient TEXT NOT NULL,
+                status TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at REAL DEFAULT 0,
+                last_error TEXT,
+                FOREIGN KEY (event_id) REFERENCES outbox_events (id)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_outbox_deliveries_due
+            ON outbox_deliveries(status, next_attempt_at, event_id)
+        ''')
+        
+        # Deliveries claimed by a worker that died are sent again
+        cursor.execute("UPDATE outbox_deliveries SET status = 'pending' WHERE status = 'sending'")
+        conn.close()
+    
+    def enqueue(self, notification_type, subject, body, recipients):
+        """Store an event once and queue a delivery row per recipient"""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN')
+            cursor = conn.execute('''
+                INSERT INTO outbox_events (notification_type, subject, body)
+                VALUES (?, ?, ?)
+            ''', (notification_type, subject, body))
+            event_id = cursor.lastrowid
+            
+            # Recipients may be a generator over a large subscriber set
+            queued = 0
+            batch = []
+            for recipient in recipients:
+                batch.append((event_id, recipient))
+                if len(batch) >= 1000:
+                    conn.executemany('INSERT INTO outbox_deliveries (event_id, recipient) VALUES (?, ?)', batch)
+                    queued += len(batch)
+                    batch = []
+            if batch:
+                conn.executemany('INSERT INTO outbox_deliveries (event_id, recipient) VALUES (?, ?)', batch)
+                queued += len(batch)
+            
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        
+        self.logger.info(f"Queued event {event_id} ({notification_type}) for {queued} recipients")
+        self._notify()
+        return event_id
+    
+    def _notify(self):
+        with self.wakeup:
+            self.generation += 1
+            self.wakeup.notify_all()
+    
+    def start(self):
+        """Start the worker pool"""
+        self.stop_event.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"outbox-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.logger.info(f"Started {self.workers} outbox workers")
+    
+    def stop(self, timeout=10):
+        """Stop the worker pool"""
+        self.stop_event.set()
+        self._notify()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+    
+    def pending_count(self):
+        """Get number of deliveries not yet sent or failed"""
+        conn = self._connect()
+        count = conn.execute(
+            "SELECT COUNT(*) FROM outbox_deliveries WHERE status IN ('pending', 'sending')"
+        ).fetchone()[0]
+        conn.close()
+        return count
+    
+    def drain(self, smtp=None):
+        """Send every due delivery on the calling thread (used by tests and cron runs)"""
+        conn = self._connect()
+        messages = {}
+        sent = 0
+        try:
+            while True:
+                claimed = self._claim_batch(conn)
+                if not claimed:
+                    return sent
+                if smtp is None:
+                    smtp = self.smtp_factory()
+                smtp, delivered = self._send_batch(conn, smtp, messages, *claimed)
+                sent += delivered
+        finally:
+            self._close_smtp(smtp)
+            conn.close()
+    
+    def _worker_loop(self):
+        conn = self._connect()
+        smtp = None
+        # Rendered MIME messages keyed by event id, so each event is rendered once per worker
+        messages = {}
+        
+        while not self.stop_event.is_set():
+            try:
+                with self.wakeup:
+                    seen = self.generation
+                claimed = self._claim_batch(conn)
+                if not claimed:
+                    self._close_smtp(smtp)
+                    smtp = None
+                    with self.wakeup:
+                        self.wakeup.wait_for(lambda: self.generation != seen, timeout=1)
+                    continue
+                
+                if smtp is None:
+                    smtp = self.smtp_factory()
+                smtp, _ = self._send_batch(conn, smtp, messages, *claimed)
+            except Exception as e:
+                self.logger.error(f"Outbox worker error: {e}")
+                self._close_smtp(smtp)
+                smtp = None
+                time.sleep(1)
+        
+        self._close_smtp(smtp)
+        conn.close()
+    
+    def _claim_batch(self, conn):
+        """Atomically claim up to batch_size due deliveries for a single event"""
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('''
+                SELECT event_id FROM outbox_deliveries
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at LIMIT 1
+            ''', (now,)).fetchone()
+            if not row:
+                conn.execute('COMMIT')
+                return None
+            
+            event_id = row[0]
+            rows = conn.execute('''
+                SELECT id, recipient, attempts FROM outbox_deliveries
+                WHERE status = 'pending' AND event_id = ? AND next_attempt_at <= ?
+                LIMIT ?
+            ''', (event_id, now, self.batch_size)).fetchall()
+            
+            conn.executemany(
+                "UPDATE outbox_deliveries SET status = 'sending' WHERE id = ?",
+                [(delivery_id,) for delivery_id, _, _ in rows]
+            )
+            conn.execute('COMMIT')
+            return event_id, rows
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    
+    def _render(self, conn, messages, event_id):
+        if event_id not in messages:
+            if len(messages) > 256:
+                messages.clear()
+            subject, body = conn.execute(
+                'SELECT subject, body FROM outbox_events WHERE id = ?', (event_id,)
+            ).fetchone()
+            message = MIMEText(body)
+            message['Subject'] = subject
+            message['From'] = NOTIFICATION_SENDER
+            message['To'] = "undisclosed-recipients:;"
+            messages[event_id] = message.as_string()
+        return messages[event_id]
+    
+    def _send_batch(self, conn, smtp, messages, event_id, rows):
+        """Send one message to all recipients in a batch and record the outcome"""
+        message = self._render(conn, messages, event_id)
+        recipients = [recipient for _, recipient, _ in rows]
+        
+        try:
+            refused = smtp.sendmail(NOTIFICATION_SENDER, recipients, message)
+        except smtplib.SMTPRecipientsRefused as e:
+            refused = e.recipients
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPException, OSError) as e:
+            self.logger.warning(f"SMTP send failed for event {event_id}: {e}")
+            self._schedule_retry(conn, rows, str(e))
+            self._close_smtp(smtp)
+            return None, 0
+        
+        # 5xx refusals are permanent (unknown mailbox, policy), so only 4xx ones are retried
+        rejected = [row for row in rows if row[1] in refused and refused[row[1]][0] >= 500]
+        failed = [row for row in rows if row[1] in refused and refused[row[1]][0] < 500]
+        delivered = [row for row in rows if row[1] not in refused]
+        
+        conn.execute('BEGIN')
+        conn.executemany(
+            "UPDATE outbox_deliveries SET status = 'sent', attempts = attempts + 1 WHERE id = ?",
+            [(delivery_id,) for delivery_id, _, _ in delivered]
+        )
+        conn.execute('COMMIT')
+        
+        if failed:
+            self._schedule_retry(conn, failed, "Recipient refused")
+        if rejected:
+            self._mark_failed(conn, rejected, refused)
+        
+        self.logger.info(
+            f"Event {event_id}: sent to {len(delivered)} recipients, {len(failed)} deferred, {len(rejected)} rejected"
+        )
+        return smtp, len(delivered)
+    
+    def _schedule_retry(self, conn, rows, error):
+        """Back off exponentially, giving up after max_attempts"""
+        now = time.time()
+        updates = []
+        for delivery_id, _, attempts in rows:
+            attempts += 1
+            status = 'failed' if attempts >= self.max_attempts else 'pending'
+            next_attempt = now + OUTBOX_RETRY_BACKOFF * (2 ** (attempts - 1))
+            updates.append((status, attempts, next_attempt, error, delivery_id))
+        
+        conn.execute('BEGIN')
+        conn.executemany('''
+            UPDATE outbox_deliveries
+            SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?
+            WHERE id = ?
+        ''', updates)
+        conn.execute('COMMIT')
+    
+    @staticmethod
+    def _mark_failed(conn, rows, refused):
+        """Give up on recipients the server refused permanently"""
+        updates = []
+        for delivery_id, recipient, attempts in rows:
+            code, reply = refused[recipient]
+            reply = reply.decode(errors='replace') if isinstance(reply, bytes) else str(reply)
+            updates.append((attempts + 1, f"Recipient refused: {code} {reply}", delivery_id))
+        
+        conn.execute('BEGIN')
+        conn.executemany('''
+            UPDATE outbox_deliveries
+            SET status = 'failed', attempts = ?, last_error = ?
+            WHERE id = ?
+        ''', updates)
+        conn.execute('COMMIT')
+    
+    @staticmethod
+    def _close_smtp(smtp):
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except Exception:
+            pass
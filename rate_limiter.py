@@ -3,10 +3,18 @@ Rate limiting module for voting contract
 """
 
 import time
-from collections import defaultdict, deque
+from collections import Counter, defaultdict, deque
 from threading import Lock
 from logger import setup_logger
 
+# Rate limit configurations, shared with SharedRateLimiter
+RATE_LIMITS = {
+    'vote': {'count': 1, 'window': 3600},  # 1 vote per hour
+    'proposal': {'count': 3, 'window': 86400},  # 3 proposals per day
+    'api_call': {'count': 100, 'window': 3600},  # 100 API calls per hour
+    'login': {'count': 5, 'window': 900}  # 5 login attempts per 15 minutes
+}
+
 class RateLimiter:
     def __init__(self):
         self.logger = setup_logger("rate_limiter")
@@ -14,12 +22,7 @@ class RateLimiter:
         self.lock = Lock()
         
         # Rate limit configurations
-        self.limits = {
-            'vote': {'count': 1, 'window': 3600},  # 1 vote per hour
-            'proposal': {'count': 3, 'window': 86400},  # 3 proposals per day
-            'api_call': {'count': 100, 'window': 3600},  # 100 API calls per hour
-            'login': {'count': 5, 'window': 900}  # 5 login attempts per 15 minutes
-        }
+        self.limits = dict(RATE_LIMITS)
     
     def is_allowed(self, identifier, action_type):
         """Check if action is allowed for identifier"""
@@ -51,11 +54,53 @@ class RateLimiter:
                 
                 self.logger.info(f"Rate limit check passed: {identifier} - {action_type} ({len(request_times)}/{max_requests})")
                 return True
-                
+        
         except Exception as e:
             self.logger.error(f"Rate limit check failed: {e}")
             return True  # Allow on error to avoid blocking legitimate users
     
+    def reserve_all(self, identifiers, action_type):
+        """Record one request per identifier only if every one of them is allowed
+        
+        Returns whether each identifier is within its limit. Nothing is
+        recorded unless all are, and an identifier listed twice needs room
+        for two.
+        """
+        try:
+            with self.lock:
+                if action_type not in self.limits:
+                    self.logger.warning(f"Unknown action type: {action_type}")
+                    return [True] * len(identifiers)
+                
+                current_time = time.time()
+                window_size = self.limits[action_type]['window']
+                max_requests = self.limits[action_type]['count']
+                
+                allowed = {}
+                for identifier, count in Counter(identifiers).items():
+                    request_times = self.requests[f"{identifier}:{action_type}"]
+                    while request_times and request_times[0] < current_time - window_size:
+                        request_times.popleft()
+                    allowed[identifier] = len(request_times) + count <= max_requests
+                
+                if all(allowed.values()):
+                    for identifier in identifiers:
+                        self.requests[f"{identifier}:{action_type}"].append(current_time)
+                else:
+                    self.logger.warning(f"Rate limit exceeded for {action_type} reservation of {len(identifiers)}")
+                return [allowed[identifier] for identifier in identifiers]
+        
+        except Exception as e:
+            self.logger.error(f"Rate limit check failed: {e}")
+            return [True] * len(identifiers)  # Allow on error to avoid blocking legitimate users
+    
+    def refund(self, identifier, action_type):
+        """Give back the latest recorded request, as when the action it allowed did not go through"""
+        with self.lock:
+            request_times = self.requests.get(f"{identifier}:{action_type}")
+            if request_times:
+                request_times.pop()
+    
     def get_remaining_requests(self, identifier, action_type):
         """Get remaining requests for identifier"""
         try:
@@ -77,7 +122,7 @@ class RateLimiter:
                 
                 remaining = max_requests - len(request_times)
                 return max(0, remaining)
-                
+        
         except Exception as e:
             self.logger.error(f"Failed to get remaining requests: {e}")
             return -1
@@ -101,7 +146,7 @@ class RateLimiter:
                 # Reset time is when the oldest request expires
                 reset_time = request_times[0] + window_size
                 return reset_time
-                
+        
         except Exception as e:
             self.logger.error(f"Failed to get reset time: {e}")
             return time.time()
@@ -117,7 +162,7 @@ class RateLimiter:
                 
                 self.logger.info(f"Cleared rate limits for {identifier}")
                 return True
-                
+        
         except Exception as e:
             self.logger.error(f"Failed to clear limits: {e}")
             return False
@@ -134,7 +179,7 @@ class RateLimiter:
                 }
                 
                 return stats
-                
+        
         except Exception as e:
             self.logger.error(f"Failed to get stats: {e}")
             return {}
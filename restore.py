@@ -0,0 +1,176 @@
+"""
+Restore utility for voting contract backups
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from schema import VotingDatabase
+from logger import setup_logger
+from backup import BACKUP_TABLES, MANIFEST_FILE, file_checksum
+from config import BACKUP_DIR
+from exceptions import RestoreError
+
+def _load_chunk(path, expected_checksum):
+    """Verify, decompress and parse one NDJSON chunk (runs in a worker process)"""
+    if file_checksum(path) != expected_checksum:
+        raise RestoreError(f"Checksum mismatch for {path}")
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+class DataRestore:
+    def __init__(self, db_path="voting_data_restored.db", workers=None):
+        self.logger = setup_logger("restore")
+        self.db_path = db_path
+        self.workers = workers or os.cpu_count()
+    
+    def find_manifests(self, backup_dir=BACKUP_DIR):
+        """Get the latest full backup and the incremental backups taken after it"""
+        manifests = []
+        for name in sorted(os.listdir(backup_dir)):
+            path = os.path.join(backup_dir, name, MANIFEST_FILE)
+            if os.path.exists(path):
+                with open(path) as f:
+                    manifests.append((path, json.load(f)))
+        
+        full_indexes = [i for i, (_, manifest) in enumerate(manifests) if manifest['type'] == 'full']
+        if not full_indexes:
+            raise RestoreError(f"No full backup found in {backup_dir}")
+        return manifests[full_indexes[-1]:]
+    
+    def _prepare_database(self, manifests):
+        """Create a fresh database without secondary indexes, returning them for after the load
+        
+        Tables come from the schemas recorded in the manifests (the newest for
+        each table), so columns added by migrations are restored too.
+        """
+        if os.path.exists(self.db_path):
+            raise RestoreError(f"Refusing to restore into existing database {self.db_path}")
+        
+        schema = {}
+        for _, manifest in manifests:
+            for item in manifest.get('schema') or []:
+                schema[item['type'], item['name']] = item['sql']
+        
+        if not schema:
+            # Backups taken before manifests recorded the schema
+            VotingDatabase(self.db_path)
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            deferred = conn.execute('''
+                SELECT name, sql FROM sqlite_master
+                WHERE type = 'index' AND sql IS NOT NULL
+            ''').fetchall()
+            for name, _ in deferred:
+                conn.execute(f'DROP INDEX {name}')
+        else:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            for (kind, _), sql in schema.items():
+                if kind == 'table':
+                    conn.execute(sql)
+            deferred = [(name, sql) for (kind, name), sql in schema.items() if kind == 'index']
+        
+        # The target is disposable until verified, so skip durability during the load
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute('PRAGMA cache_size=-262144')
+        return conn, deferred
+    
+    def _chunk_jobs(self, manifests):
+        for path, manifest in manifests:
+            directory = os.path.dirname(path)
+            for table in BACKUP_TABLES:
+                entry = manifest['tables'].get(table)
+                if not entry:
+                    continue
+                for chunk in entry['chunks']:
+                    yield table, entry['columns'], os.path.join(directory, chunk['file']), chunk
+    
+    def restore(self, backup_dir=BACKUP_DIR, analyze=True):
+        """Load a backup chain into a fresh database and verify it"""
+        started = time.time()
+        manifests = self.find_manifests(backup_dir)
+        self.logger.info(f"Restoring {len(manifests)} backups from {backup_dir} into {self.db_path}")
+        
+        conn, deferred = self._prepare_database(manifests)
+        loaded = {}
+        
+        try:
+            conn.execute('BEGIN')
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                # Bound in-flight chunks so parsed rows never pile up faster than inserts
+                in_flight = deque()
+                jobs = self._chunk_jobs(manifests)
+                
+                def submit_next():
+                    job = next(jobs, None)
+                    if job:
+                        table, columns, path, chunk = job
+                        in_flight.append((table, columns, chunk, pool.submit(_load_chunk, path, chunk['sha256'])))
+                
+                for _ in range(self.workers * 2):
+                    submit_next()
+                
+                while in_flight:
+                    table, columns, chunk, future = in_flight.popleft()
+                    rows = future.result()
+                    submit_next()
+                    
+                    if len(rows) != chunk['rows']:
+                        raise RestoreError(f"{chunk['file']} has {len(rows)} rows, manifest says {chunk['rows']}")
+                    
+                    placeholders = ', '.join('?' * len(columns))
+                    conn.executemany(
+                        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+                    )
+                    loaded[table] = loaded.get(table, 0) + len(rows)
+            conn.execute('COMMIT')
+            
+            self._rebuild_indexes(conn, deferred)
+            if analyze:
+                conn.execute('ANALYZE')
+            self.verify(conn, manifests)
+        except Exception:
+            conn.close()
+            os.remove(self.db_path)
+            raise
+        
+        conn.execute('PRAGMA journal_mode=DELETE')
+        conn.close()
+        
+        self.logger.info(f"Restored {loaded} in {time.time() - started:.1f}s")
+        return loaded
+    
+    def _rebuild_indexes(self, conn, deferred):
+        for name, sql in deferred:
+            index_started = time.time()
+            conn.execute(sql)
+            self.logger.info(f"Rebuilt index {name} in {time.time() - index_started:.2f}s")
+    
+    def verify(self, conn, manifests):
+        """Check restored row counts and id ranges against the manifests"""
+        for table in BACKUP_TABLES:
+            entries = [manifest['tables'][table] for _, manifest in manifests if table in manifest['tables']]
+            if not entries:
+                continue
+            
+            expected_rows = sum(entry['rows'] for entry in entries)
+            expected_last_id = max(entry['last_id'] for entry in entries)
+            actual_rows, actual_last_id = conn.execute(
+                f'SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {table}'
+            ).fetchone()
+            
+            if actual_rows != expected_rows or actual_last_id != expected_last_id:
+                raise RestoreError(
+                    f"{table}: restored {actual_rows} rows up to id {actual_last_id}, "
+                    f"expected {expected_rows} rows up to id {expected_last_id}"
+                )
+        
+        self.logger.info("Restore verified against manifests")
+
+if __name__ == "__main__":
+    restore = DataRestore()
+    restore.restore()
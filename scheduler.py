@@ -0,0 +1,259 @@
+"""
+Deadline reminder scheduler for voting proposals
+"""
+
+import heapq
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from logger import setup_logger
+from config import REMINDER_OFFSETS_HOURS, SCHEDULER_HORIZON
+
+# voting_end may be stored as a Unix timestamp or an ISO/SQLite timestamp string;
+# strftime reads strings without an offset as UTC, as to_timestamp does
+VOTING_END_SECONDS = '''
+    CASE WHEN typeof(voting_end) IN ('integer', 'real') THEN voting_end
+         ELSE CAST(strftime('%s', voting_end) AS INTEGER) END
+'''
+
+MISFIRE_GRACE = 3600  # Seconds a reminder may run late before it is skipped
+
+def to_timestamp(voting_end):
+    """Convert a voting_end value to a Unix timestamp, reading naive times as UTC"""
+    if isinstance(voting_end, (int, float)):
+        return float(voting_end)
+    if not isinstance(voting_end, datetime):
+        voting_end = datetime.fromisoformat(str(voting_end))
+    if voting_end.tzinfo is None:
+        voting_end = voting_end.replace(tzinfo=timezone.utc)
+    return voting_end.timestamp()
+
+class ReminderScheduler:
+    """Heap-based scheduler for reminder and results notifications"""
+    
+    def __init__(self, notifier, db_path="voting_data.db", reminder_offsets=None,
+                 results_provider=None, horizon=SCHEDULER_HORIZON):
+        self.logger = setup_logger("scheduler")
+        self.notifier = notifier
+        self.db_path = db_path
+        self.reminder_offsets = reminder_offsets or REMINDER_OFFSETS_HOURS
+        self.results_provider = results_provider or self.tally_results
+        self.horizon = horizon
+        self.heap = []
+        self.loaded_until = 0
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+        self.init_schedule()
+    
+    def init_schedule(self):
+        """Initialize the persistent schedule table"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS notification_schedule (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                proposal_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                hours_remaining INTEGER DEFAULT 0,
+                fire_at REAL NOT NULL,
+                voting_end REAL NOT NULL,
+                status TEXT DEFAULT 'pending',
+                UNIQUE (proposal_id, kind, hours_remaining)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_schedule_due
+            ON notification_schedule(status, fire_at)
+        ''')
+        
+        # Jobs interrupted mid-send by a crash are retried
+        cursor.execute("UPDATE notification_schedule SET status = 'pending' WHERE status = 'firing'")
+        
+        conn.commit()
+        conn.close()
+    
+    def _job_rows(self, proposal_id, voting_end):
+        rows = [(proposal_id, 'reminder', hours, voting_end - hours * 3600, voting_end)
+                for hours in self.reminder_offsets]
+        rows.append((proposal_id, 'results', 0, voting_end, voting_end))
+        return rows
+    
+    def seed_from_proposals(self):
+        """Schedule every active proposal that has no jobs yet (run once at startup)
+        
+        Jobs already overdue by more than MISFIRE_GRACE are recorded as
+        skipped, so proposals that ended long ago do not all send results at once.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        stale_before = time.time() - MISFIRE_GRACE
+        
+        try:
+            for kind, hours in [('reminder', hours) for hours in self.reminder_offsets] + [('results', 0)]:
+                cursor.execute(f'''
+                    INSERT OR IGNORE INTO notification_schedule
+                        (proposal_id, kind, hours_remaining, fire_at, voting_end, status)
+                    SELECT id, ?, ?, end_ts - ?, end_ts,
+                           CASE WHEN end_ts - ? < ? THEN 'skipped' ELSE 'pending' END
+                    FROM (SELECT id, {VOTING_END_SECONDS} AS end_ts FROM proposals
+                          WHERE status = 'active' AND voting_end IS NOT NULL)
+                ''', (kind, hours, hours * 3600, hours * 3600, stale_before))
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"Could not seed from proposals: {e}")
+        finally:
+            conn.close()
+        
+        self.logger.info("Seeded notification schedule from proposals")
+    
+    def schedule_proposal(self, proposal_id, voting_end):
+        """Schedule reminders and results for a newly created proposal"""
+        rows = self._job_rows(proposal_id, to_timestamp(voting_end))
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        jobs = []
+        for row in rows:
+            cursor.execute('''
+                INSERT OR IGNORE INTO notification_schedule
+                    (proposal_id, kind, hours_remaining, fire_at, voting_end)
+                VALUES (?, ?, ?, ?, ?)
+            ''', row)
+            if cursor.rowcount:
+                jobs.append((row[3], cursor.lastrowid, row[0], row[1], row[2], row[4]))
+        conn.commit()
+        conn.close()
+        
+        # Jobs beyond the loaded horizon are picked up by the next window query
+        with self.condition:
+            for job in jobs:
+                if job[0] < self.loaded_until:
+                    heapq.heappush(self.heap, job)
+            self.condition.notify()
+        
+        return len(jobs)
+    
+    def cancel_proposal(self, proposal_id):
+        """Cancel pending notifications for a proposal"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            UPDATE notification_schedule SET status = 'cancelled'
+            WHERE proposal_id = ? AND status = 'pending'
+        ''', (proposal_id,))
+        conn.commit()
+        conn.close()
+    
+    def _load_window(self, conn, now):
+        """Push jobs due before the next horizon onto the heap with one indexed range query"""
+        window_start = self.loaded_until
+        window_end = now + self.horizon
+        
+        # Advance the horizon first so concurrently scheduled jobs are pushed directly;
+        # a job seen by both paths is only fired once because firing claims its row
+        with self.condition:
+            self.loaded_until = window_end
+        
+        rows = conn.execute('''
+            SELECT fire_at, id, proposal_id, kind, hours_remaining, voting_end
+            FROM notification_schedule
+            WHERE status = 'pending' AND fire_at >= ? AND fire_at < ?
+        ''', (window_start, window_end)).fetchall()
+        
+        with self.condition:
+            for row in rows:
+                heapq.heappush(self.heap, row)
+    
+    def start(self):
+        """Start the scheduler thread"""
+        self.stopped = False
+        # Jobs that fell due while the process was down are loaded on the first window
+        self.loaded_until = 0
+        self.thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self.thread.start()
+        self.logger.info("Reminder scheduler started")
+    
+    def stop(self):
+        """Stop the scheduler thread"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.thread:
+            self.thread.join()
+    
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        
+        while True:
+            now = time.time()
+            if now >= self.loaded_until - 1:
+                self._load_window(conn, now)
+            
+            with self.condition:
+                if self.stopped:
+                    break
+                if not self.heap or self.heap[0][0] > now:
+                    next_fire = self.heap[0][0] if self.heap else self.loaded_until
+                    self.condition.wait(max(0, min(next_fire, self.loaded_until) - now))
+                    continue
+                job = heapq.heappop(self.heap)
+            
+            self._fire(conn, job)
+        
+        conn.close()
+    
+    def _fire(self, conn, job):
+        fire_at, job_id, proposal_id, kind, hours_remaining, voting_end = job
+        
+        # Claiming the row makes firing idempotent across restarts and duplicate pushes
+        cursor = conn.execute('''
+            UPDATE notification_schedule SET status = 'firing'
+            WHERE id = ? AND status = 'pending'
+        ''', (job_id,))
+        conn.commit()
+        if not cursor.rowcount:
+            return
+        
+        try:
+            if kind == 'reminder':
+                now = time.time()
+                # A reminder missed by more than the grace period would report a stale countdown
+                if now >= voting_end or now - fire_at > MISFIRE_GRACE:
+                    status = 'skipped'
+                else:
+                    self.notifier.send_voting_reminder(proposal_id, hours_remaining)
+                    status = 'sent'
+            else:
+                self.notifier.send_results_notification(proposal_id, self.results_provider(proposal_id))
+                status = 'sent'
+        except Exception as e:
+            self.logger.error(f"Scheduled {kind} for proposal {proposal_id} failed: {e}")
+            status = 'failed'
+        
+        conn.execute('UPDATE notification_schedule SET status = ? WHERE id = ?', (status, job_id))
+        conn.commit()
+    
+    def tally_results(self, proposal_id):
+        """Count recorded votes for a proposal"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute('''
+                SELECT vote_option, COUNT(*) FROM votes
+                WHERE proposal_id = ? GROUP BY vote_option
+            ''', (proposal_id,)).fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+        finally:
+            conn.close()
+        return dict(rows)
+
+if __name__ == "__main__":
+    from notifications import NotificationManager
+    
+    scheduler = ReminderScheduler(NotificationManager())
+    scheduler.seed_from_proposals()
+    scheduler.start()
+    scheduler.thread.join()
@@ -4,6 +4,13 @@ Database schema for storing voting contract data
 
 import sqlite3
 from datetime import datetime
+from config import EXPORT_PAGE_SIZE
+
+# Columns streamed by the export endpoints; id must come first for keyset paging
+EXPORT_TABLES = {
+    'votes': ['id', 'proposal_id', 'voter_address', 'vote_option', 'voted_at', 'tx_id', 'confirmed_round'],
+    'transactions': ['id', 'tx_id', 'operation', 'sender', 'timestamp', 'status', 'confirmed_round']
+}
 
 class VotingDatabase:
     """Database handler for voting contract data"""
@@ -39,10 +46,15 @@ class VotingDatabase:
                 vote_option TEXT NOT NULL,
                 voted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 tx_id TEXT,
+                confirmed_round INTEGER,
                 FOREIGN KEY (proposal_id) REFERENCES proposals (id)
             )
         ''')
         
+        # Indexes for filtered proposal listings (also created by migration 002)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_proposals_status ON proposals(status)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_proposals_creator ON proposals(creator)')
+        
         # Transactions table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS transactions (
@@ -51,10 +63,19 @@ class VotingDatabase:
                 operation TEXT NOT NULL,
                 sender TEXT NOT NULL,
                 timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'pending'
+                status TEXT DEFAULT 'pending',
+                confirmed_round INTEGER
             )
         ''')
         
+        # Tables created before confirmed rounds were tracked lack the column (migration 006)
+        for table in ['votes', 'transactions']:
+            columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+            if 'confirmed_round' not in columns:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN confirmed_round INTEGER')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_votes_round ON votes(confirmed_round)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_round ON transactions(confirmed_round)')
+        
         conn.commit()
         conn.close()
     
@@ -71,15 +92,86 @@ class VotingDatabase:
         conn.commit()
         conn.close()
     
-    def record_vote(self, proposal_id, voter, option, tx_id):
+    def record_vote(self, proposal_id, voter, option, tx_id, confirmed_round=None):
         """Record a vote in database"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO votes (proposal_id, voter_address, vote_option, tx_id)
-            VALUES (?, ?, ?, ?)
-        ''', (proposal_id, voter, option, tx_id))
+            INSERT INTO votes (proposal_id, voter_address, vote_option, tx_id, confirmed_round)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (proposal_id, voter, option, tx_id, confirmed_round))
         
         conn.commit()
-        conn.close()
\ No newline at end of file
+        conn.close()
+    
+    def get_proposal_app_id(self, proposal_id):
+        """Get the application ID for a stored proposal"""
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute('SELECT app_id FROM proposals WHERE id = ?', (proposal_id,)).fetchone()
+        conn.close()
+        return row[0] if row else None
+    
+    def list_proposals(self, status=None, creator=None, after_id=None, descending=True, limit=50):
+        """Get one keyset page of proposals ordered by id"""
+        clauses = []
+        params = []
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        if creator:
+            clauses.append('creator = ?')
+            params.append(creator)
+        # Seeking past the last id keeps every page an index range scan, however deep
+        if after_id is not None:
+            clauses.append('id < ?' if descending else 'id > ?')
+            params.append(after_id)
+        
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(f'''
+            SELECT id, app_id, title, creator, created_at, voting_end, status
+            FROM proposals {where}
+            ORDER BY id {'DESC' if descending else 'ASC'}
+            LIMIT ?
+        ''', params + [limit]).fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+    
+    def iter_export_pages(self, table, proposal_id=None, min_round=None, max_round=None, after_id=0, page_size=EXPORT_PAGE_SIZE):
+        """Yield (columns, rows) keyset pages of votes or transactions ordered by id
+        
+        Each page is a separate short query, so a long export never holds a
+        read transaction open and memory stays bounded by page_size.
+        """
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Cannot export table {table}")
+        
+        clauses = ['id > ?']
+        params = []
+        if proposal_id is not None:
+            # Transactions carry no proposal, so match them through the votes they submitted
+            clauses.append('proposal_id = ?' if table == 'votes' else
+                           'tx_id IN (SELECT tx_id FROM votes WHERE proposal_id = ?)')
+            params.append(proposal_id)
+        if min_round is not None:
+            clauses.append('confirmed_round >= ?')
+            params.append(min_round)
+        if max_round is not None:
+            clauses.append('confirmed_round <= ?')
+            params.append(max_round)
+        
+        sql = f"SELECT {', '.join(EXPORT_TABLES[table])} FROM {table} WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?"
+        conn = sqlite3.connect(self.db_path)
+        try:
+            while True:
+                rows = conn.execute(sql, [after_id] + params + [page_size]).fetchall()
+                if not rows:
+                    break
+                yield EXPORT_TABLES[table], rows
+                if len(rows) < page_size:
+                    break
+                after_id = rows[-1][0]
+        finally:
+            conn.close()
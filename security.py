@@ -3,27 +3,86 @@ Security module for voting contract
 """
 
 import hashlib
+import heapq
 import hmac
 import secrets
+import time
 from datetime import datetime, timedelta
+from threading import Lock
 from logger import setup_logger
+from config import VOTE_TOKEN_SECRET, VOTE_TOKEN_MAX_AGE, VOTE_TOKEN_CLOCK_SKEW, REPLAY_CACHE_SIZE
+
+class ReplayCache:
+    """Bounded cache of used tokens, each kept until its own token can no longer verify"""
+    
+    def __init__(self, max_entries=REPLAY_CACHE_SIZE):
+        self.logger = setup_logger("security")
+        self.max_entries = max_entries
+        self.entries = {}
+        # (expires_at, key) min-heap; tokens expire out of insertion order
+        self.expiries = []
+        self.full = False
+        self.lock = Lock()
+    
+    def _evict(self, now):
+        entries = self.entries
+        expiries = self.expiries
+        while expiries and expiries[0][0] <= now:
+            entries.pop(heapq.heappop(expiries)[1], None)
+        if self.full and len(entries) < self.max_entries:
+            self.full = False
+    
+    def _add(self, key, expires_at):
+        if key in self.entries:
+            return False
+        if len(self.entries) >= self.max_entries:
+            # Dropping the token closest to expiry keeps new votes working; only it can be replayed, and not for long
+            if not self.full:
+                self.full = True
+                self.logger.warning(f"Replay cache full at {self.max_entries} tokens; evicting those closest to expiry")
+            self.entries.pop(heapq.heappop(self.expiries)[1], None)
+        self.entries[key] = expires_at
+        heapq.heappush(self.expiries, (expires_at, key))
+        return True
+    
+    def add(self, key, expires_at, now=None):
+        """Record a key until expires_at (Unix time), returning False if it is already used"""
+        with self.lock:
+            self._evict(now or time.time())
+            return self._add(key, expires_at)
+    
+    def add_many(self, items, now=None):
+        """Record several (key, expires_at) pairs under one lock acquisition"""
+        with self.lock:
+            self._evict(now or time.time())
+            return [self._add(key, expires_at) for key, expires_at in items]
+    
+    def __len__(self):
+        return len(self.entries)
 
 class SecurityManager:
-    def __init__(self):
+    def __init__(self, secret_key=None, replay_cache=None):
         self.logger = setup_logger("security")
-        self.secret_key = secrets.token_hex(32)
+        self.secret_key = secret_key or VOTE_TOKEN_SECRET
+        if not self.secret_key:
+            # Tokens from a random key only verify inside this process
+            self.logger.warning("VOTE_TOKEN_SECRET not set; using a per-process key")
+            self.secret_key = secrets.token_hex(32)
+        
+        # Keyed HMAC state is copied per token instead of re-deriving the key pads
+        self._hmac_base = hmac.new(self.secret_key.encode(), digestmod=hashlib.sha256)
+        self.replay_cache = replay_cache if replay_cache is not None else ReplayCache()
+    
+    def _sign(self, voter_address, proposal_id, timestamp):
+        mac = self._hmac_base.copy()
+        mac.update(f"{voter_address}:{proposal_id}:{timestamp}".encode())
+        return mac.hexdigest()
     
     def generate_vote_token(self, voter_address, proposal_id):
         """Generate secure token for vote verification"""
         try:
             timestamp = str(int(datetime.now().timestamp()))
-            data = f"{voter_address}:{proposal_id}:{timestamp}"
-            
-            token = hmac.new(
-                self.secret_key.encode(),
-                data.encode(),
-                hashlib.sha256
-            ).hexdigest()
+            token = f"{timestamp}.{self._sign(voter_address, proposal_id, timestamp)}"
             
             self.logger.info(f"Generated vote token for {voter_address}")
             return token
@@ -31,17 +90,35 @@ class SecurityManager:
             self.logger.error(f"Token generation failed: {e}")
             return None
     
-    def verify_vote_token(self, token, voter_address, proposal_id, max_age=3600):
-        """Verify vote token validity"""
+    def _check_token(self, token, voter_address, proposal_id, max_age, now):
+        """Check signature and age, returning (MAC, replay expiry) on success"""
         try:
-            # Token verification logic
-            current_time = datetime.now().timestamp()
+            timestamp, _, mac = token.partition('.')
+            if len(mac) != 64 or not timestamp.isdigit():
+                return None
+            
+            issued_at = int(timestamp)
+            age = now - issued_at
+            if age > max_age or age < -VOTE_TOKEN_CLOCK_SKEW:
+                return None
             
-            # Mock verification for demonstration
-            is_valid = len(token) == 64 and token.isalnum()
+            if not hmac.compare_digest(self._sign(voter_address, proposal_id, timestamp), mac):
+                return None
+        except (AttributeError, TypeError, ValueError):
+            # Malformed input (a non-string token, non-ASCII digits) is just an invalid token
+            return None
+        # The token verifies until issued_at + max_age, so it must stay cached at least that long
+        return mac, issued_at + max_age + VOTE_TOKEN_CLOCK_SKEW
+    
+    def verify_vote_token(self, token, voter_address, proposal_id, max_age=VOTE_TOKEN_MAX_AGE):
+        """Verify vote token validity"""
+        try:
+            now = time.time()
+            checked = self._check_token(token, voter_address, proposal_id, max_age, now)
+            is_valid = checked is not None and self.replay_cache.add(*checked, now=now)
             
             if is_valid:
-                self.logger.info(f"Token verified for {voter_address}")
+                self.logger.debug(f"Token verified for {voter_address}")
             else:
                 self.logger.warning(f"Invalid token for {voter_address}")
             
@@ -50,6 +127,25 @@ class SecurityManager:
             self.logger.error(f"Token verification failed: {e}")
             return False
     
+    def verify_many(self, items, max_age=VOTE_TOKEN_MAX_AGE):
+        """Verify (token, voter_address, proposal_id) tuples for bulk imports"""
+        items = list(items)
+        try:
+            now = time.time()
+            check = self._check_token
+            checked = [check(token, voter, proposal, max_age, now) for token, voter, proposal in items]
+            
+            fresh = iter(self.replay_cache.add_many([item for item in checked if item is not None], now=now))
+            results = [item is not None and next(fresh) for item in checked]
+            
+            rejected = results.count(False)
+            if rejected:
+                self.logger.warning(f"Rejected {rejected} of {len(results)} vote tokens")
+            return results
+        except Exception as e:
+            self.logger.error(f"Batch token verification failed: {e}")
+            return [False] * len(items)
+    
     def rate_limit_check(self, address, action, limit=10, window=3600):
         """Check rate limiting for actions"""
         try:
@@ -0,0 +1,114 @@
+"""
+Production serving entry point with preforked workers
+"""
+
+import argparse
+import importlib
+import logging
+import os
+import signal
+import socket
+import sys
+from logger import setup_logger
+from config import SERVER_WORKERS
+
+APPS = {'api': 5000, 'dashboard': 8080}
+
+def build_shared_app(name):
+    """Create an app wired to shared-memory state; call before forking workers"""
+    from shared_state import SharedRateLimiter
+    from metrics import PerformanceMetrics
+    
+    module = importlib.import_module(name)
+    return module.create_app(limiter=SharedRateLimiter(), metrics=PerformanceMetrics())
+
+class PreforkServer:
+    """Bind once, fork workers that accept on the shared socket, and replace any that die"""
+    
+    def __init__(self, app, host="127.0.0.1", port=5000, workers=SERVER_WORKERS):
+        self.logger = setup_logger("serve")
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.children = set()
+        self.running = False
+        self.listener = None
+    
+    def _bind(self):
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        listener = socket.socket(family, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        listener.listen(1024)
+        listener.set_inheritable(True)
+        self.port = listener.getsockname()[1]
+        return listener
+    
+    def _spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children.add(pid)
+            return
+        
+        # Worker: default signal handling, then serve until terminated
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            from werkzeug.serving import make_server
+            server = make_server(self.host, self.port, self.app, threaded=True, fd=self.listener.fileno())
+            server.serve_forever()
+        finally:
+            os._exit(0)
+    
+    def _shutdown(self, signum, frame):
+        self.running = False
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    def run(self):
+        """Serve until SIGINT/SIGTERM"""
+        self.listener = self._bind()
+        self.running = True
+        signal.signal(signal.SIGTERM, self._shutdown)
+        signal.signal(signal.SIGINT, self._shutdown)
+        
+        for _ in range(self.workers):
+            self._spawn()
+        self.logger.info(f"Serving on http://{self.host}:{self.port} with {self.workers} workers")
+        
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            self.children.discard(pid)
+            if self.running:
+                self.logger.warning(f"Worker {pid} exited with status {status}; restarting")
+                self._spawn()
+        
+        self.listener.close()
+        self.logger.info("All workers stopped")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("app", choices=sorted(APPS), help="Application to serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="Default: 5000 for api, 8080 for dashboard")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--access-log", action="store_true", help="Log every request")
+    args = parser.parse_args()
+    
+    if not hasattr(os, "fork"):
+        sys.exit("Preforked serving needs os.fork (Linux or macOS)")
+    if not args.access_log:
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    
+    app = build_shared_app(args.app)
+    port = args.port if args.port is not None else APPS[args.app]
+    PreforkServer(app, args.host, port, args.workers).run()
@@ -0,0 +1,261 @@
+"""
+Shared-memory state for multi-process serving
+"""
+
+import hashlib
+import mmap
+import multiprocessing
+import struct
+import time
+from collections import Counter
+from logger import setup_logger
+from rate_limiter import RATE_LIMITS
+from config import SHARED_RATE_LIMIT_SLOTS, SHARED_LOCK_STRIPES
+
+COUNTER = struct.Struct("<q")
+# key hash, window number, count in this window, count in the previous window
+SLOT = struct.Struct("<QqII")
+MAX_PROBES = 16
+
+class SharedCounters:
+    """Named 64-bit counters in an anonymous shared mapping
+    
+    Create before forking workers; every child then updates the same memory.
+    """
+    
+    def __init__(self, names):
+        self.index = {name: i for i, name in enumerate(names)}
+        self.memory = mmap.mmap(-1, COUNTER.size * len(self.index))
+        self.lock = multiprocessing.Lock()
+    
+    def increment(self, name, amount=1):
+        offset = self.index[name] * COUNTER.size
+        with self.lock:
+            value = COUNTER.unpack_from(self.memory, offset)[0] + amount
+            COUNTER.pack_into(self.memory, offset, value)
+        return value
+    
+    def get(self, name):
+        return COUNTER.unpack_from(self.memory, self.index[name] * COUNTER.size)[0]
+    
+    def snapshot(self):
+        """Get every counter value"""
+        return {name: self.get(name) for name in self.index}
+
+class SharedRateLimiter:
+    """Rate limiter whose state lives in shared memory so all workers enforce one limit
+    
+    Uses a sliding-window approximation: the previous window's count is
+    weighted by how much of it still overlaps the sliding window. Keys are
+    hashed into a fixed table split into stripes, each with its own lock.
+    """
+    
+    def __init__(self, limits=None, slots=SHARED_RATE_LIMIT_SLOTS, stripes=SHARED_LOCK_STRIPES):
+        self.logger = setup_logger("rate_limiter")
+        self.limits = limits or RATE_LIMITS
+        self.slots = slots
+        self.stripes = stripes
+        self.slots_per_stripe = slots // stripes
+        self.memory = mmap.mmap(-1, SLOT.size * slots)
+        self.locks = [multiprocessing.Lock() for _ in range(stripes)]
+    
+    def _key_hash(self, key):
+        # hash() is salted per interpreter, so use a stable digest; 0 marks an empty slot
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+    
+    def _find_slot(self, key_hash, window):
+        """Offset of the key's slot (or None) and of the first slot it could take; call under its stripe lock"""
+        stripe = key_hash % self.stripes
+        base = stripe * self.slots_per_stripe
+        start = (key_hash // self.stripes) % self.slots_per_stripe
+        
+        free_offset = None
+        for probe in range(min(MAX_PROBES, self.slots_per_stripe)):
+            offset = (base + (start + probe) % self.slots_per_stripe) * SLOT.size
+            slot_hash, slot_window, _, _ = SLOT.unpack_from(self.memory, offset)
+            if slot_hash == key_hash:
+                return offset, free_offset
+            # Slots idle for two windows no longer affect any limit and can be reused
+            if free_offset is None and (slot_hash == 0 or slot_window < window - 1):
+                free_offset = offset
+            # Slots are never emptied, so the key cannot sit past an empty one
+            if slot_hash == 0:
+                break
+        return None, free_offset
+    
+    def _load_slot(self, key_hash, window):
+        """Offset, count and previous count of the key's slot rolled forward to window; call under its stripe lock
+        
+        A new key gets the first free slot, and the offset is None when the
+        table has no room for it.
+        """
+        offset, free_offset = self._find_slot(key_hash, window)
+        if offset is None:
+            return free_offset, 0, 0
+        
+        _, slot_window, count, previous = SLOT.unpack_from(self.memory, offset)
+        if slot_window == window - 1:
+            return offset, 0, count
+        if slot_window != window:
+            return offset, 0, 0
+        return offset, count, previous
+    
+    def _update(self, identifier, action_type, consume):
+        """Return (allowed, remaining, reset_time) and record the request if consume and allowed"""
+        limit_config = self.limits[action_type]
+        window_size = limit_config['window']
+        max_requests = limit_config['count']
+        
+        now = time.time()
+        window = int(now // window_size)
+        overlap = 1 - (now % window_size) / window_size
+        key_hash = self._key_hash(f"{identifier}:{action_type}")
+        stripe = key_hash % self.stripes
+        
+        with self.locks[stripe]:
+            offset, count, previous = self._load_slot(key_hash, window)
+            if offset is None:
+                self.logger.warning(f"Rate limit table full; allowing {identifier} - {action_type}")
+                return True, max_requests, now
+            
+            estimate = previous * overlap + count
+            allowed = estimate + 1 <= max_requests
+            if consume and allowed:
+                count += 1
+                estimate += 1
+            SLOT.pack_into(self.memory, offset, key_hash, window, count, previous)
+        
+        reset_time = (window + 1) * window_size
+        return allowed, max(0, int(max_requests - estimate)), reset_time
+    
+    def is_allowed(self, identifier, action_type):
+        """Check if action is allowed for identifier"""
+        if action_type not in self.limits:
+            self.logger.warning(f"Unknown action type: {action_type}")
+            return True
+        
+        try:
+            allowed = self._update(identifier, action_type, consume=True)[0]
+            if not allowed:
+                self.logger.warning(f"Rate limit exceeded for {identifier} - {action_type}")
+            return allowed
+        except Exception as e:
+            self.logger.error(f"Rate limit check failed: {e}")
+            return True  # Allow on error to avoid blocking legitimate users
+    
+    def reserve_all(self, identifiers, action_type):
+        """Record one request per identifier only if every one of them is allowed
+        
+        Returns whether each identifier is within its limit. Nothing is
+        recorded unless all are, and an identifier listed twice needs room
+        for two.
+        """
+        if action_type not in self.limits:
+            self.logger.warning(f"Unknown action type: {action_type}")
+            return [True] * len(identifiers)
+        
+        try:
+            limit_config = self.limits[action_type]
+            now = time.time()
+            window = int(now // limit_config['window'])
+            overlap = 1 - (now % limit_config['window']) / limit_config['window']
+            needed = Counter(identifiers)
+            hashes = {identifier: self._key_hash(f"{identifier}:{action_type}") for identifier in needed}
+            # Stripes are always locked in ascending order, so overlapping reservations cannot deadlock
+            locks = [self.locks[stripe] for stripe in sorted({key_hash % self.stripes for key_hash in hashes.values()})]
+            for lock in locks:
+                lock.acquire()
+            try:
+                slots = {identifier: self._load_slot(key_hash, window) for identifier, key_hash in hashes.items()}
+                # A key the full table cannot hold is allowed, as in is_allowed
+                allowed = {
+                    identifier: offset is None or previous * overlap + count + needed[identifier] <= limit_config['count']
+                    for identifier, (offset, count, previous) in slots.items()
+                }
+                if all(allowed.values()):
+                    for identifier, (offset, count, previous) in slots.items():
+                        if offset is not None:
+                            SLOT.pack_into(self.memory, offset, hashes[identifier], window,
+                                           count + needed[identifier], previous)
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+            return [allowed[identifier] for identifier in identifiers]
+        except Exception as e:
+            self.logger.error(f"Rate limit reservation failed: {e}")
+            return [True] * len(identifiers)
+    
+    def refund(self, identifier, action_type):
+        """Give back one recorded request, as when the action it allowed did not go through"""
+        if action_type not in self.limits:
+            return
+        window = int(time.time() // self.limits[action_type]['window'])
+        key_hash = self._key_hash(f"{identifier}:{action_type}")
+        with self.locks[key_hash % self.stripes]:
+            offset, _ = self._find_slot(key_hash, window)
+            if offset is None:
+                return
+            offset, count, previous = self._load_slot(key_hash, window)
+            # The request may have rolled into the previous window since it was recorded
+            if count:
+                count -= 1
+            elif previous:
+                previous -= 1
+            SLOT.pack_into(self.memory, offset, key_hash, window, count, previous)
+    
+    def get_remaining_requests(self, identifier, action_type):
+        """Get remaining requests for identifier"""
+        if action_type not in self.limits:
+            return -1
+        return self._update(identifier, action_type, consume=False)[1]
+    
+    def get_reset_time(self, identifier, action_type):
+        """Get time when the current window ends"""
+        if action_type not in self.limits:
+            return time.time()
+        return self._update(identifier, action_type, consume=False)[2]
+    
+    def clear_user_limits(self, identifier):
+        """Clear all rate limits for a user (admin function)"""
+        try:
+            for action_type, limit_config in self.limits.items():
+                key_hash = self._key_hash(f"{identifier}:{action_type}")
+                window = int(time.time() // limit_config['window'])
+                with self.locks[key_hash % self.stripes]:
+                    offset, _ = self._find_slot(key_hash, window)
+                    # The slot keeps its hash so keys probed past it are still found
+                    if offset is not None:
+                        SLOT.pack_into(self.memory, offset, key_hash, window, 0, 0)
+            
+            self.logger.info(f"Cleared rate limits for {identifier}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to clear limits: {e}")
+            return False
+    
+    def get_stats(self):
+        """Get rate limiter statistics
+        
+        Slots only hold key hashes, so users cannot be told apart from
+        actions; active_limits counts occupied slots across all workers.
+        """
+        try:
+            active = requests = 0
+            for stripe, lock in enumerate(self.locks):
+                start = stripe * self.slots_per_stripe * SLOT.size
+                with lock:
+                    for slot_hash, _, count, previous in SLOT.iter_unpack(
+                            self.memory[start:start + self.slots_per_stripe * SLOT.size]):
+                        if slot_hash:
+                            active += 1
+                            requests += count + previous
+            
+            return {
+                'total_requests_tracked': requests,
+                'limits_configured': len(self.limits),
+                'active_limits': active,
+                'table_slots': self.slots
+            }
+        except Exception as e:
+            self.logger.error(f"Failed to get stats: {e}")
+            return {}
@@ -0,0 +1,158 @@
+"""
+Parallel transaction signing across a process pool
+"""
+
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import msgpack
+from algosdk import account, constants, encoding, transaction
+from nacl.signing import SigningKey
+from logger import setup_logger
+from config import SIGNING_WORKERS, SIGNING_CHUNK_SIZE
+
+# Map headers and keys of a signed transaction, in canonical order (sgnr, sig, txn)
+SIGNED_HEADER = b"\x82"
+REKEYED_HEADER = b"\x83" + msgpack.packb('sgnr')
+SIG_KEY = msgpack.packb('sig')
+TXN_KEY = msgpack.packb('txn')
+
+# Signing keys of this worker process by address, set once by _init_worker
+_signing_keys = {}
+
+# Workers start from a fresh interpreter; forking a process with running threads can copy held locks
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def decode_keys(keys):
+    """Turn {address: private key} into the signing keys sign_encoded uses"""
+    decoded = {}
+    for address, private_key in keys.items():
+        raw = base64.b64decode(private_key)
+        public_key = raw[constants.key_len_bytes:]
+        decoded[address] = (SigningKey(raw[:constants.key_len_bytes]), public_key,
+                            encoding.encode_address(public_key))
+    return decoded
+
+def _init_worker(keys):
+    """Decode every signing key once when a worker process starts"""
+    _signing_keys.update(decode_keys(keys))
+
+def signed_envelope(encoded, signature, authorizer=None):
+    """Canonical msgpack of a signed transaction around already encoded transaction bytes"""
+    header = SIGNED_HEADER if authorizer is None else REKEYED_HEADER + msgpack.packb(authorizer)
+    return header + SIG_KEY + msgpack.packb(signature) + TXN_KEY + encoded
+
+def sign_encoded(txns, signing_keys=None):
+    """Sign transactions and return each as canonical msgpack bytes, ready to send
+    
+    signing_keys comes from decode_keys (default: this worker's keys); a
+    key whose address differs from the sender signs as a rekeyed authorizer.
+    Each transaction is encoded once and those bytes are reused inside the
+    signed envelope.
+    """
+    signing_keys = _signing_keys if signing_keys is None else signing_keys
+    signed = []
+    for txn in txns:
+        signing_key, public_key, key_address = signing_keys[txn.sender]
+        encoded = base64.b64decode(encoding.msgpack_encode(txn))
+        signature = signing_key.sign(constants.txid_prefix + encoded).signature
+        
+        signed.append(signed_envelope(encoded, signature, None if key_address == txn.sender else public_key))
+    return signed
+
+def _sign_chunk(txns):
+    return sign_encoded(txns)
+
+class SigningPool:
+    """Sign batches of transactions in worker processes that each load the keys once
+    
+    Keys travel to each worker once, as initializer arguments, so calls only
+    carry transactions out and signed bytes back.
+    """
+    
+    def __init__(self, keys, workers=SIGNING_WORKERS, chunk_size=SIGNING_CHUNK_SIZE):
+        self.logger = setup_logger("signing")
+        self.keys = keys
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(START_METHOD),
+                                        initializer=_init_worker, initargs=(keys,))
+    
+    def sign(self, txns):
+        """Signed msgpack bytes for each transaction, in order"""
+        txns = list(txns)
+        missing = {txn.sender for txn in txns} - self.keys.keys()
+        if missing:
+            raise KeyError(f"No signing key for {', '.join(sorted(missing))}")
+        
+        chunks = [txns[i:i + self.chunk_size] for i in range(0, len(txns), self.chunk_size)]
+        return [signed for chunk in self.pool.map(_sign_chunk, chunks) for signed in chunk]
+    
+    def sign_group(self, txns):
+        """One atomic group signed and concatenated, for send_raw_transaction"""
+        return base64.b64encode(b"".join(self.sign(txns))).decode()
+    
+    def close(self):
+        self.pool.shutdown()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def _benchmark_txns(count):
+    keys = dict(reversed(account.generate_account()) for _ in range(4))
+    addresses = list(keys)
+    params = transaction.SuggestedParams(1000, 1, 1000, base64.b64encode(bytes(32)).decode(), flat_fee=True)
+    txns = [
+        transaction.ApplicationCallTxn(addresses[i % 4], params, 1, transaction.OnComplete.NoOpOC,
+                                       app_args=["vote", "yes"], note=i.to_bytes(8, 'big'))
+        for i in range(count)
+    ]
+    return keys, txns
+
+def benchmark_scaling(count=20000, max_workers=None, chunk_size=SIGNING_CHUNK_SIZE):
+    """Signatures per second signing inline with txn.sign and across 1..max_workers processes"""
+    max_workers = max_workers or os.cpu_count() or 1
+    keys, txns = _benchmark_txns(count)
+    results = {}
+    
+    started = time.perf_counter()
+    for txn in txns:
+        encoding.msgpack_encode(txn.sign(keys[txn.sender]))
+    results['inline txn.sign'] = count / (time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    sign_encoded(txns, decode_keys(keys))
+    results['inline sign_encoded'] = count / (time.perf_counter() - started)
+    
+    for workers in range(1, max_workers + 1):
+        with SigningPool(keys, workers=workers, chunk_size=chunk_size) as pool:
+            # Warm up so process start-up is not timed
+            pool.sign(txns[:workers * chunk_size])
+            started = time.perf_counter()
+            pool.sign(txns)
+            results[f"pool x{workers}"] = count / (time.perf_counter() - started)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--count", type=int, default=20000, help="Transactions signed per measurement")
+    parser.add_argument("--max-workers", type=int, default=None, help="Largest pool measured (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=SIGNING_CHUNK_SIZE, help="Transactions per worker task")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+    
+    results = benchmark_scaling(args.count, args.max_workers, args.chunk_size)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        baseline = results['inline txn.sign']
+        print(f"{'signer':22s} {'sigs/s':>10s} {'speedup':>8s}")
+        for name, rate in results.items():
+            print(f"{name:22s} {rate:10.0f} {rate / baseline:7.2f}x")
@@ -0,0 +1,94 @@
+"""
+CLI startup benchmark driven by python -X importtime
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+STARTUP_THRESHOLD_MS = 100  # Allowed startup time above a bare interpreter
+COMMANDS = [
+    ["cli.py", "--help"],
+    ["cli.py", "list-proposals"]
+]
+# Modules that must stay out of CLI startup; commands import them when needed
+HEAVY_MODULES = ["algosdk", "pyteal", "matplotlib", "pandas", "flask", "msgpack"]
+
+def wall_time_ms(args, runs):
+    """Median wall-clock time to run the interpreter with args"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable] + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def import_profile(args):
+    """Parse -X importtime output into {module: (self_us, cumulative_us)} for top-level imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    
+    top_level = {}
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Skips the header row
+        if not self_us.strip().isdigit():
+            continue
+        module = name.strip()
+        loaded.add(module)
+        # Nested imports are indented under their parent; keep only the roots
+        if not name.startswith("  "):
+            top_level[module] = (int(self_us), int(cumulative_us))
+    return top_level, loaded
+
+def run_benchmark(runs=5, threshold_ms=STARTUP_THRESHOLD_MS, top=5):
+    """Time each command and report import costs; returns the per-command results"""
+    baseline = wall_time_ms(["-c", "pass"], runs)
+    print(f"Bare interpreter: {baseline:.1f} ms")
+    
+    results = []
+    for args in COMMANDS:
+        label = " ".join(args)
+        overhead = wall_time_ms(args, runs) - baseline
+        top_level, loaded = import_profile(args)
+        heavy = sorted({module.split(".")[0] for module in loaded} & set(HEAVY_MODULES))
+        
+        passed = overhead <= threshold_ms and not heavy
+        results.append({
+            'command': label,
+            'startup_ms': round(overhead, 1),
+            'import_ms': round(sum(cumulative for _, cumulative in top_level.values()) / 1000, 1),
+            'heavy_modules': heavy,
+            'passed': passed
+        })
+        
+        print(f"{'PASS' if passed else 'FAIL'} {label}: {overhead:.1f} ms above interpreter start "
+              f"(threshold {threshold_ms} ms)")
+        if heavy:
+            print(f"  heavy modules imported at startup: {', '.join(heavy)}")
+        slowest = sorted(top_level.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        for module, (_, cumulative) in slowest:
+            print(f"  {cumulative / 1000:7.1f} ms  {module}")
+    
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command (median is reported)")
+    parser.add_argument("--threshold", type=float, default=STARTUP_THRESHOLD_MS, help="Allowed startup ms")
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+    
+    results = run_benchmark(args.runs, args.threshold)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if all(result['passed'] for result in results) else 1)
@@ -0,0 +1,200 @@
+"""
+Typed, cached decoding of voting app state
+"""
+
+import base64
+import struct
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+from algosdk import encoding
+from algosdk.error import AlgodHTTPError
+from logger import setup_logger
+from config import VALID_VOTE_OPTIONS, VOTING_ACTIVE_FLAG, RESULTS_KEY, STATE_CACHE_SIZE, STATE_ROUND_TTL
+
+# Stored tallies hold one uint64 per option; get_results returns them with the total appended
+RESULTS_LAYOUT = struct.Struct(f">{len(VALID_VOTE_OPTIONS)}Q")
+RESULTS_RETURN_LAYOUT = struct.Struct(f">{len(VALID_VOTE_OPTIONS) + 1}Q")
+
+def unpack_results(packed):
+    """Unpack packed tallies, with or without the trailing total, into {option: count, 'total_votes': n}"""
+    if len(packed) == RESULTS_RETURN_LAYOUT.size:
+        *tallies, total = RESULTS_RETURN_LAYOUT.unpack(packed)
+    else:
+        tallies = RESULTS_LAYOUT.unpack(packed)
+        total = sum(tallies)
+    results = dict(zip(VALID_VOTE_OPTIONS, tallies))
+    results['total_votes'] = total
+    return results
+
+def decode_state(entries):
+    """Turn algod TealKeyValue entries into {key bytes: int or bytes}"""
+    state = {}
+    for entry in entries or []:
+        value = entry['value']
+        # type 1 is bytes, type 2 is uint
+        state[base64.b64decode(entry['key'])] = (
+            base64.b64decode(value.get('bytes', '')) if value['type'] == 1 else value.get('uint', 0)
+        )
+    return state
+
+class VoteTally:
+    """Tallies and voting window of one voting app at one round"""
+    
+    def __init__(self, app_id, round, results, voting_end=None, active=None, admin=None,
+                 proposal_count=0, min_votes=0):
+        self.app_id = app_id
+        self.round = round
+        self.results = results
+        self.total_votes = results.get('total_votes', 0)
+        self.voting_end = voting_end
+        self.active = active
+        self.admin = admin
+        self.proposal_count = proposal_count
+        self.min_votes = min_votes
+    
+    @classmethod
+    def from_global_state(cls, app_id, round, state):
+        """Build from decoded global state of either contract layout"""
+        packed = state.get(RESULTS_KEY.encode())
+        # Apps created before the total was dropped from the stored value still carry it
+        if isinstance(packed, bytes) and len(packed) in (RESULTS_LAYOUT.size, RESULTS_RETURN_LAYOUT.size):
+            results = unpack_results(packed)
+        else:
+            # Original layout: one votes_<option> counter per option
+            results = {option: state.get(b"votes_" + option.encode(), 0) for option in VALID_VOTE_OPTIONS}
+            results['total_votes'] = state.get(b"total_votes", 0)
+        
+        if b"state" in state:
+            voting_end = state[b"state"] & (VOTING_ACTIVE_FLAG - 1)
+            active = bool(state[b"state"] & VOTING_ACTIVE_FLAG)
+        else:
+            voting_end = state.get(b"voting_end")
+            active = bool(state.get(b"active", 0))
+        
+        admin = state.get(b"admin")
+        return cls(
+            app_id, round, results,
+            voting_end=voting_end,
+            active=active,
+            admin=encoding.encode_address(admin) if isinstance(admin, bytes) and len(admin) == 32 else None,
+            proposal_count=state.get(b"proposal_count", 0),
+            min_votes=state.get(b"min_votes", 0)
+        )
+    
+    def to_dict(self):
+        return dict(self.__dict__)
+
+class StateDecoder:
+    """Decode app state once per (app id, round) and share it between readers
+    
+    Readers that ask for the same app in the same round get the cached
+    decode; readers that arrive while it is being fetched wait for that
+    fetch instead of starting their own. Without an explicit round the
+    current round is used, refreshed at most every round_ttl seconds.
+    """
+    
+    def __init__(self, algod_client, cache_size=STATE_CACHE_SIZE, round_ttl=STATE_ROUND_TTL):
+        self.logger = setup_logger("state_decoder")
+        self.algod_client = algod_client
+        self.cache_size = cache_size
+        self.round_ttl = round_ttl
+        self.cache = OrderedDict()
+        self.in_flight = {}
+        self.lock = Lock()
+        self.round = None
+        self.round_checked = 0.0
+        self.stats = {'hits': 0, 'misses': 0, 'shared': 0}
+    
+    def current_round(self):
+        """Latest round, reused for round_ttl seconds"""
+        now = time.monotonic()
+        with self.lock:
+            if self.round is not None and now - self.round_checked < self.round_ttl:
+                return self.round
+        
+        last_round = self.algod_client.status()['last-round']
+        with self.lock:
+            self.round = max(self.round or 0, last_round)
+            self.round_checked = now
+            return self.round
+    
+    def _memoize(self, key, load):
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return self.cache[key]
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self.in_flight[key] = Future()
+                self.stats['misses'] += 1
+            else:
+                self.stats['shared'] += 1
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            value = load()
+        except Exception as e:
+            # Failures are not cached; the next reader tries again
+            with self.lock:
+                del self.in_flight[key]
+            future.set_exception(e)
+            raise
+        
+        with self.lock:
+            del self.in_flight[key]
+            self.cache[key] = value
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        future.set_result(value)
+        return value
+    
+    def global_state(self, app_id, round=None):
+        """Decoded global state of an app"""
+        round = round or self.current_round()
+        return self._memoize(('global', app_id, round), lambda: decode_state(
+            self.algod_client.application_info(app_id)['params'].get('global-state')
+        ))
+    
+    def tally(self, app_id, round=None):
+        """Typed tallies and voting window of an app"""
+        round = round or self.current_round()
+        return self._memoize(('tally', app_id, round), lambda: VoteTally.from_global_state(
+            app_id, round, self.global_state(app_id, round)
+        ))
+    
+    def local_state(self, app_id, address, round=None):
+        """Decoded local state of an account in an app ({} if it has not opted in)"""
+        round = round or self.current_round()
+        
+        def load():
+            try:
+                info = self.algod_client.account_application_info(address, app_id)
+            except AlgodHTTPError as e:
+                if e.code == 404:
+                    return {}
+                raise
+            return decode_state(info.get('app-local-state', {}).get('key-value'))
+        
+        return self._memoize(('local', app_id, address, round), load)
+    
+    def has_voted(self, app_id, address, round=None):
+        return bool(self.local_state(app_id, address, round).get(b"voted", 0))
+    
+    def box(self, app_id, name, round=None):
+        """Raw value of an app box"""
+        round = round or self.current_round()
+        name = name.encode() if isinstance(name, str) else name
+        return self._memoize(('box', app_id, name, round), lambda: base64.b64decode(
+            self.algod_client.application_box_by_name(app_id, name)['value']
+        ))
+    
+    def box_tally(self, app_id, name, round=None):
+        """Tallies stored in a box using the packed results layout"""
+        round = round or self.current_round()
+        return VoteTally(app_id, round, unpack_results(self.box(app_id, name, round)))
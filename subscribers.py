@@ -0,0 +1,217 @@
+"""
+Subscriber registry backed by the user_preferences table
+"""
+
+import sqlite3
+from logger import setup_logger
+
+CHANNEL_COLUMNS = {
+    'email': 'email_notifications',
+    'sms': 'sms_notifications'
+}
+
+DEFAULT_PAGE_SIZE = 1000
+
+def create_subscriber_tables(cursor):
+    """Create subscriber tables and indexes (shared with migration 005)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_preferences (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_address TEXT UNIQUE,
+            email_notifications BOOLEAN DEFAULT 1,
+            sms_notifications BOOLEAN DEFAULT 0,
+            preferred_language TEXT DEFAULT 'en',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    columns = {row[1]: row for row in cursor.execute('PRAGMA table_info(user_preferences)')}
+    if 'email' not in columns:
+        cursor.execute('ALTER TABLE user_preferences ADD COLUMN email TEXT')
+    # Migration 004 declared user_address NOT NULL, but email-only subscribers have no address
+    if columns['user_address'][3]:
+        _allow_null_user_address(cursor)
+    
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_user_preferences_email
+        ON user_preferences(email) WHERE email IS NOT NULL
+    ''')
+    
+    # Primary key doubles as the fan-out index: one range scan per (type, channel)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notification_subscriptions (
+            notification_type TEXT NOT NULL,
+            channel TEXT NOT NULL,
+            preference_id INTEGER NOT NULL,
+            PRIMARY KEY (notification_type, channel, preference_id),
+            FOREIGN KEY (preference_id) REFERENCES user_preferences (id)
+        ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_subscriptions_preference
+        ON notification_subscriptions(preference_id)
+    ''')
+
+def _allow_null_user_address(cursor):
+    """Rebuild user_preferences without NOT NULL on user_address, keeping ids"""
+    cursor.execute('''
+        CREATE TABLE user_preferences_rebuilt (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_address TEXT UNIQUE,
+            email_notifications BOOLEAN DEFAULT 1,
+            sms_notifications BOOLEAN DEFAULT 0,
+            preferred_language TEXT DEFAULT 'en',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            email TEXT
+        )
+    ''')
+    columns = 'id, user_address, email_notifications, sms_notifications, preferred_language, created_at, updated_at, email'
+    cursor.execute(f'INSERT INTO user_preferences_rebuilt ({columns}) SELECT {columns} FROM user_preferences')
+    cursor.execute('DROP TABLE user_preferences')
+    cursor.execute('ALTER TABLE user_preferences_rebuilt RENAME TO user_preferences')
+    
+    # Subscribers added by email alone used to store the email as their address
+    cursor.execute('UPDATE user_preferences SET user_address = NULL WHERE user_address = email')
+
+class SubscriberRegistry:
+    """Indexed notification subscribers stored alongside user preferences"""
+    
+    def __init__(self, db_path="voting_data.db"):
+        self.db_path = db_path
+        self.logger = setup_logger("subscribers")
+        self.init_registry()
+    
+    def init_registry(self):
+        """Initialize subscriber tables"""
+        conn = sqlite3.connect(self.db_path)
+        create_subscriber_tables(conn.cursor())
+        conn.commit()
+        conn.close()
+    
+    def add_subscriber(self, email, notification_types=None, user_address=None, channels=('email',)):
+        """Add or update a subscriber and replace their subscriptions"""
+        types = notification_types or ['all']
+        # 'all' already matches every type, so storing both would duplicate fan-out rows
+        if 'all' in types:
+            types = ['all']
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        flags = (int('email' in channels), int('sms' in channels))
+        
+        if user_address is None:
+            # Email-only subscribers have no address, so their email identifies the row
+            cursor.execute('''
+                INSERT INTO user_preferences (user_address, email, email_notifications, sms_notifications)
+                VALUES (NULL, ?, ?, ?)
+                ON CONFLICT(email) WHERE email IS NOT NULL DO UPDATE SET
+                    email_notifications = excluded.email_notifications,
+                    sms_notifications = excluded.sms_notifications,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (email, *flags))
+            preference_id = cursor.execute('SELECT id FROM user_preferences WHERE email = ?', (email,)).fetchone()[0]
+        else:
+            # An address subscribing with an email stored earlier on its own takes over that row
+            cursor.execute('''
+                UPDATE user_preferences SET user_address = ?
+                WHERE email = ? AND user_address IS NULL
+                  AND NOT EXISTS (SELECT 1 FROM user_preferences WHERE user_address = ?)
+            ''', (user_address, email, user_address))
+            cursor.execute('''
+                INSERT INTO user_preferences (user_address, email, email_notifications, sms_notifications)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(user_address) DO UPDATE SET
+                    email = excluded.email,
+                    email_notifications = excluded.email_notifications,
+                    sms_notifications = excluded.sms_notifications,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (user_address, email, *flags))
+            preference_id = cursor.execute(
+                'SELECT id FROM user_preferences WHERE user_address = ?', (user_address,)
+            ).fetchone()[0]
+        
+        cursor.execute('DELETE FROM notification_subscriptions WHERE preference_id = ?', (preference_id,))
+        cursor.executemany('''
+            INSERT INTO notification_subscriptions (notification_type, channel, preference_id)
+            VALUES (?, ?, ?)
+        ''', [(notification_type, channel, preference_id) for notification_type in types for channel in channels])
+        
+        conn.commit()
+        conn.close()
+        return preference_id
+    
+    def remove_subscriber(self, email):
+        """Remove all subscriptions for an email address"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            DELETE FROM notification_subscriptions WHERE preference_id IN (
+                SELECT id FROM user_preferences WHERE email = ?
+            )
+        ''', (email,))
+        removed = cursor.rowcount
+        
+        conn.commit()
+        conn.close()
+        return removed > 0
+    
+    def set_channel_enabled(self, user_address, channel, enabled):
+        """Toggle a notification channel without touching subscriptions"""
+        column = CHANNEL_COLUMNS[channel]
+        
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            f'UPDATE user_preferences SET {column} = ?, updated_at = CURRENT_TIMESTAMP WHERE user_address = ?',
+            (int(enabled), user_address)
+        )
+        conn.commit()
+        conn.close()
+    
+    def iter_recipients(self, notification_type, channel='email', page_size=DEFAULT_PAGE_SIZE):
+        """Stream recipients for an event in keyset pages of page_size rows"""
+        column = CHANNEL_COLUMNS[channel]
+        contact = 'p.email' if channel == 'email' else 'p.user_address'
+        select = f'''
+            SELECT s.preference_id, {contact}
+            FROM notification_subscriptions s
+            JOIN user_preferences p ON p.id = s.preference_id
+            WHERE s.notification_type = {{}} AND s.channel = ?2 AND s.preference_id > ?3
+              AND p.{column} = 1
+        '''
+        # Subscribers to 'all' never also hold a specific type, so preference ids are unique
+        # across both ranges and one id cursor pages through them. Each arm reads its primary
+        # key range in order and SQLite merges them; IN (?, 'all') would sort every remaining
+        # row on each page instead.
+        if notification_type == 'all':
+            query = select.format("'all'") + ' ORDER BY 1 LIMIT ?4'
+        else:
+            query = select.format('?1') + ' UNION ALL ' + select.format("'all'") + ' ORDER BY 1 LIMIT ?4'
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            last_id = 0
+            while True:
+                rows = conn.execute(query, (notification_type, channel, last_id, page_size)).fetchall()
+                for _, recipient in rows:
+                    if recipient:
+                        yield recipient
+                if len(rows) < page_size:
+                    break
+                last_id = rows[-1][0]
+        finally:
+            conn.close()
+    
+    def count_subscribers(self, notification_type, channel='email'):
+        """Count subscribers that would receive a notification type"""
+        conn = sqlite3.connect(self.db_path)
+        count = conn.execute(f'''
+            SELECT COUNT(*) FROM notification_subscriptions s
+            JOIN user_preferences p ON p.id = s.preference_id
+            WHERE s.notification_type IN (?, 'all') AND s.channel = ? AND p.{CHANNEL_COLUMNS[channel]} = 1
+        ''', (notification_type, channel)).fetchone()[0]
+        conn.close()
+        return count
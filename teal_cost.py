@@ -0,0 +1,268 @@
+"""
+Opcode cost measurement for the voting approval programs
+"""
+
+import argparse
+import json
+from pyteal import compileTeal, Mode
+from exceptions import ProgramRejectedError
+
+# Opcodes costing more than 1; everything else the voting programs use costs 1
+OPCODE_COSTS = {'sha256': 35, 'keccak256': 130, 'sha512_256': 45, 'ed25519verify': 1900}
+ON_COMPLETION = {
+    'NoOp': 0, 'OptIn': 1, 'CloseOut': 2, 'ClearState': 3, 'UpdateApplication': 4, 'DeleteApplication': 5
+}
+UINT64_MASK = (1 << 64) - 1
+
+def parse_teal(teal):
+    """Split TEAL source into (instructions, labels)"""
+    instructions = []
+    labels = {}
+    for line in teal.splitlines():
+        line = line.split('//')[0].strip()
+        if not line or line.startswith('#pragma'):
+            continue
+        if line.endswith(':'):
+            labels[line[:-1]] = len(instructions)
+            continue
+        op, _, arg = line.partition(' ')
+        instructions.append((op, arg.strip()))
+    return instructions, labels
+
+def _constant(op, arg):
+    if op in ('int', 'pushint'):
+        return ON_COMPLETION[arg] if arg in ON_COMPLETION else int(arg, 0)
+    if arg.startswith('"'):
+        return json.loads(arg).encode()
+    return bytes.fromhex(arg[2:])
+
+def _uint(value):
+    if not isinstance(value, int):
+        raise ProgramRejectedError(f"Expected uint64, got {value!r}")
+    return value
+
+def _check(value):
+    if not 0 <= value <= UINT64_MASK:
+        raise ProgramRejectedError("uint64 overflow")
+    return value
+
+BINARY_OPS = {
+    '+': lambda a, b: _check(a + b),
+    '-': lambda a, b: _check(a - b),
+    '*': lambda a, b: _check(a * b),
+    '/': lambda a, b: a // b if b else _check(-1),
+    '%': lambda a, b: a % b if b else _check(-1),
+    '<': lambda a, b: int(a < b),
+    '>': lambda a, b: int(a > b),
+    '<=': lambda a, b: int(a <= b),
+    '>=': lambda a, b: int(a >= b),
+    '&&': lambda a, b: int(bool(a and b)),
+    '||': lambda a, b: int(bool(a or b)),
+    '&': lambda a, b: a & b,
+    '|': lambda a, b: a | b,
+    '^': lambda a, b: a ^ b,
+    'shl': lambda a, b: (a << b) & UINT64_MASK,
+    'shr': lambda a, b: a >> b
+}
+
+def execute(teal, sender, app_args=(), app_id=1, on_completion='NoOp', timestamp=1700000000,
+            global_state=None, local_state=None):
+    """Run an approval program once and return its approval, cost, state changes and logs
+    
+    global_state maps keys to values and local_state maps addresses to such
+    maps; both are updated in place only when the program approves.
+    """
+    instructions, labels = parse_teal(teal)
+    global_state = global_state if global_state is not None else {}
+    local_state = local_state if local_state is not None else {}
+    pending_global = dict(global_state)
+    pending_local = {address: dict(values) for address, values in local_state.items()}
+    txn = {
+        'Sender': sender, 'ApplicationID': app_id, 'OnCompletion': ON_COMPLETION[on_completion],
+        'NumAppArgs': len(app_args)
+    }
+    args = [arg.encode() if isinstance(arg, str) else arg for arg in app_args]
+    
+    stack = []
+    scratch = [0] * 256
+    frames = []
+    logs = []
+    cost = 0
+    pc = 0
+    
+    while pc < len(instructions):
+        op, arg = instructions[pc]
+        cost += OPCODE_COSTS.get(op, 1)
+        pc += 1
+        
+        if op in ('int', 'pushint', 'byte', 'pushbytes'):
+            stack.append(_constant(op, arg))
+        elif op in BINARY_OPS:
+            b, a = _uint(stack.pop()), _uint(stack.pop())
+            stack.append(BINARY_OPS[op](a, b))
+        elif op == '==':
+            b, a = stack.pop(), stack.pop()
+            stack.append(int(a == b))
+        elif op == '!=':
+            b, a = stack.pop(), stack.pop()
+            stack.append(int(a != b))
+        elif op == '!':
+            stack.append(int(_uint(stack.pop()) == 0))
+        elif op == '~':
+            stack.append(UINT64_MASK ^ _uint(stack.pop()))
+        elif op == 'txn':
+            stack.append(txn[arg])
+        elif op == 'txna':
+            index = int(arg.split()[1])
+            if index >= len(args):
+                raise ProgramRejectedError(f"ApplicationArgs {index} out of range")
+            stack.append(args[index])
+        elif op == 'global':
+            stack.append({'LatestTimestamp': timestamp, 'CurrentApplicationID': app_id}[arg])
+        elif op == 'app_global_get':
+            stack.append(pending_global.get(stack.pop(), 0))
+        elif op == 'app_global_put':
+            value = stack.pop()
+            pending_global[stack.pop()] = value
+        elif op == 'app_local_get':
+            key = stack.pop()
+            address = stack.pop()
+            if address not in pending_local:
+                raise ProgramRejectedError(f"{address} has not opted in")
+            stack.append(pending_local[address].get(key, 0))
+        elif op == 'app_local_put':
+            value = stack.pop()
+            key = stack.pop()
+            address = stack.pop()
+            if address not in pending_local:
+                raise ProgramRejectedError(f"{address} has not opted in")
+            pending_local[address][key] = value
+        elif op == 'concat':
+            b, a = stack.pop(), stack.pop()
+            stack.append(a + b)
+        elif op == 'len':
+            stack.append(len(stack.pop()))
+        elif op == 'itob':
+            stack.append(_uint(stack.pop()).to_bytes(8, 'big'))
+        elif op == 'btoi':
+            stack.append(int.from_bytes(stack.pop(), 'big'))
+        elif op == 'extract_uint64':
+            start = _uint(stack.pop())
+            data = stack.pop()
+            if start + 8 > len(data):
+                raise ProgramRejectedError("extract_uint64 out of range")
+            stack.append(int.from_bytes(data[start:start + 8], 'big'))
+        elif op == 'replace3':
+            value = stack.pop()
+            start = _uint(stack.pop())
+            data = stack.pop()
+            if start + len(value) > len(data):
+                raise ProgramRejectedError("replace out of range")
+            stack.append(data[:start] + value + data[start + len(value):])
+        elif op == 'replace2':
+            start = int(arg)
+            value = stack.pop()
+            data = stack.pop()
+            if start + len(value) > len(data):
+                raise ProgramRejectedError("replace out of range")
+            stack.append(data[:start] + value + data[start + len(value):])
+        elif op == 'bzero':
+            stack.append(bytes(_uint(stack.pop())))
+        elif op == 'log':
+            logs.append(stack.pop())
+        elif op == 'load':
+            stack.append(scratch[int(arg)])
+        elif op == 'store':
+            scratch[int(arg)] = stack.pop()
+        elif op == 'dup':
+            stack.append(stack[-1])
+        elif op == 'pop':
+            stack.pop()
+        elif op == 'swap':
+            stack[-1], stack[-2] = stack[-2], stack[-1]
+        elif op == 'assert':
+            if not _uint(stack.pop()):
+                raise ProgramRejectedError(f"assert failed at instruction {pc - 1}")
+        elif op == 'bnz':
+            if _uint(stack.pop()):
+                pc = labels[arg]
+        elif op == 'bz':
+            if not _uint(stack.pop()):
+                pc = labels[arg]
+        elif op == 'b':
+            pc = labels[arg]
+        elif op == 'callsub':
+            frames.append(pc)
+            pc = labels[arg]
+        elif op == 'retsub':
+            pc = frames.pop()
+        elif op == 'return':
+            approved = bool(_uint(stack.pop()))
+            break
+        elif op == 'err':
+            raise ProgramRejectedError(f"err at instruction {pc - 1}")
+        else:
+            raise ValueError(f"Opcode {op} is not modelled")
+    else:
+        approved = len(stack) == 1 and bool(stack[0])
+    
+    if approved:
+        global_state.clear()
+        global_state.update(pending_global)
+        local_state.clear()
+        local_state.update(pending_local)
+    return {'approved': approved, 'cost': cost, 'logs': logs}
+
+def opt_in(teal, address, local_state, **kwargs):
+    """Opt an address in, creating its local state if the program approves"""
+    local_state.setdefault(address, {})
+    result = execute(teal, address, on_completion='OptIn', local_state=local_state, **kwargs)
+    if not result['approved']:
+        del local_state[address]
+    return result
+
+def measure_operations(teal, voters=3):
+    """Cost of each voting operation over one proposal's lifecycle"""
+    admin = "ADMIN"
+    global_state = {}
+    local_state = {}
+    costs = {'create_app': execute(teal, admin, app_id=0, global_state=global_state)['cost']}
+    
+    costs['opt_in'] = opt_in(teal, admin, local_state)['cost']
+    costs['create_proposal'] = execute(
+        teal, admin, ["create_proposal", "Upgrade"], global_state=global_state, local_state=local_state
+    )['cost']
+    
+    for i in range(voters):
+        voter = f"VOTER{i}"
+        opt_in(teal, voter, local_state)
+        result = execute(teal, voter, ["vote", "yes"], global_state=global_state, local_state=local_state)
+        if not result['approved']:
+            raise ProgramRejectedError(f"Vote from {voter} was rejected")
+        costs['vote'] = result['cost']
+    
+    costs['get_results'] = execute(teal, admin, ["get_results"], global_state=global_state, local_state=local_state)['cost']
+    costs['close_voting'] = execute(teal, admin, ["close_voting"], global_state=global_state, local_state=local_state)['cost']
+    return costs
+
+def compare_contracts():
+    """Per-operation cost of the current and optimized approval programs"""
+    from voting_contract import voting_contract, voting_contract_optimized
+    
+    current = measure_operations(compileTeal(voting_contract(), Mode.Application, version=8))
+    optimized = measure_operations(compileTeal(voting_contract_optimized(), Mode.Application, version=8))
+    return {operation: {'current': current[operation], 'optimized': optimized[operation]} for operation in current}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--json", action="store_true", help="Print the comparison as JSON")
+    args = parser.parse_args()
+    
+    comparison = compare_contracts()
+    if args.json:
+        print(json.dumps(comparison, indent=2))
+    else:
+        print(f"{'operation':18s} {'current':>8s} {'optimized':>10s} {'change':>8s}")
+        for operation, cost in comparison.items():
+            change = (cost['optimized'] - cost['current']) / cost['current']
+            print(f"{operation:18s} {cost['current']:8d} {cost['optimized']:10d} {change:8.0%}")
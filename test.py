@@ -5,6 +5,9 @@ Test script for Algorand Voting Contract
 
 from algosdk import account, mnemonic
 from algosdk.v2client import algod
+import base64
+import os
+import sqlite3
 import pytest
 
 def test_contract_deployment():
@@ -32,6 +35,812 @@ def test_vote_validation():
     assert vote_data["timestamp"] > 0
     print("✅ Vote validation tests passed")
 
+def test_validate_batch_reports_rows():
+    """Test batch validation returns per-row errors"""
+    from validation import InputValidator
+    
+    _, address = account.generate_account()
+    records = [
+        {"voter_address": address, "vote_option": "yes", "proposal_id": 1},
+        {"voter_address": "not_an_address", "vote_option": "maybe", "proposal_id": 1}
+    ]
+    
+    valid, errors = InputValidator().validate_batch(records)
+    assert valid == records[:1]
+    assert {(e["row"], e["field"]) for e in errors} == {(1, "voter_address"), (1, "vote_option")}
+    print("✅ Batch validation tests passed")
+
+class FakeSMTP:
+    """Local SMTP stand-in that records each sendmail call"""
+    def __init__(self, sent, refuse=None):
+        self.sent = sent
+        self.refuse = refuse or {}
+    
+    def sendmail(self, sender, recipients, message):
+        self.sent.append((recipients, message))
+        return {r: (self.refuse[r], b"refused") for r in recipients if r in self.refuse}
+    
+    def quit(self):
+        pass
+
+def test_outbox_batches_recipients(tmp_path):
+    """Test outbox sends one message per batch, retries 4xx refusals and fails 5xx ones"""
+    from outbox import NotificationOutbox
+    from notifications import NotificationManager
+    
+    sent = []
+    outbox = NotificationOutbox(
+        db_path=str(tmp_path / "outbox.db"),
+        smtp_factory=lambda: FakeSMTP(sent, refuse={"user3@example.com": 450, "user4@example.com": 550}),
+        batch_size=2
+    )
+    notifier = NotificationManager(outbox=outbox)
+    for i in range(5):
+        notifier.add_subscriber(f"user{i}@example.com", ['proposal'] if i else ['results'])
+    
+    assert notifier.send_proposal_notification("Test Proposal", 1)
+    assert outbox.drain() == 2
+    assert len(sent) == 2
+    assert all("New Proposal" in message for _, message in sent)
+    assert outbox.pending_count() == 1
+    conn = sqlite3.connect(str(tmp_path / "outbox.db"))
+    assert conn.execute("SELECT recipient FROM outbox_deliveries WHERE status = 'failed'").fetchall() == [
+        ("user4@example.com",)
+    ]
+    conn.close()
+    print("✅ Outbox batching tests passed")
+
+def test_confirmation_tracker_resolves_and_expires():
+    """Test one block follower confirms submitted transactions and expires unsent ones"""
+    from algosdk import transaction
+    from algod_standin import start
+    from confirmation import ConfirmationTracker
+    from exceptions import TransactionExpiredError
+    
+    url, stop = start(block_time=0.1)
+    algod_client = algod.AlgodClient("", url)
+    tracker = ConfirmationTracker(algod_client)
+    try:
+        private_key, address = account.generate_account()
+        params = algod_client.suggested_params()
+        sent = transaction.PaymentTxn(address, params, address, 0)
+        algod_client.send_transaction(sent.sign(private_key))
+        unsent = transaction.PaymentTxn(address, params, address, 1)
+        unsent.last_valid_round = params.first + 2
+        
+        confirmed = tracker.register_transaction(sent)
+        expired = tracker.register_transaction(unsent)
+        assert confirmed.result(timeout=10)['confirmed-round'] > params.first
+        with pytest.raises(TransactionExpiredError):
+            expired.result(timeout=10)
+        assert tracker.register_transaction(sent).result(timeout=1)['txid'] == sent.get_txid()
+    finally:
+        tracker.stop()
+        stop()
+    print("✅ Confirmation tracker tests passed")
+
+def test_subscriber_fan_out_pages_type_and_all(tmp_path):
+    """Test fan-out merges type and 'all' subscribers in one keyset scan without storing emails as addresses"""
+    from migrate import DatabaseMigration
+    from subscribers import SubscriberRegistry
+    
+    db_path = str(tmp_path / "subscribers.db")
+    conn = sqlite3.connect(db_path)
+    DatabaseMigration(db_path).migration_004_add_user_preferences(conn.cursor())
+    conn.execute("ALTER TABLE user_preferences ADD COLUMN email TEXT")
+    conn.execute("INSERT INTO user_preferences (user_address, email) VALUES ('old@example.com', 'old@example.com')")
+    conn.commit()
+    conn.close()
+    
+    registry = SubscriberRegistry(db_path)
+    registry.add_subscriber("old@example.com", ['results'])
+    for i in range(7):
+        registry.add_subscriber(f"user{i}@example.com", ['all'] if i % 3 == 0 else ['proposal'])
+    registry.add_subscriber("user1@example.com", ['proposal'], user_address="ADDRESS1")
+    
+    recipients = list(registry.iter_recipients('proposal', page_size=2))
+    assert sorted(recipients) == sorted(f"user{i}@example.com" for i in range(7))
+    assert registry.count_subscribers('proposal') == 7
+    assert list(registry.iter_recipients('results', page_size=2)) == [
+        "old@example.com", "user0@example.com", "user3@example.com", "user6@example.com"
+    ]
+    
+    conn = sqlite3.connect(db_path)
+    addresses = dict(conn.execute("SELECT email, user_address FROM user_preferences"))
+    conn.close()
+    assert addresses["user1@example.com"] == "ADDRESS1"
+    assert addresses["old@example.com"] is None and addresses["user2@example.com"] is None
+    print("✅ Subscriber fan-out tests passed")
+
+def test_scheduler_reads_naive_times_as_utc(tmp_path):
+    """Test seeded and directly scheduled jobs agree off UTC and stale proposals are not notified"""
+    import os
+    import time
+    from schema import VotingDatabase
+    from scheduler import ReminderScheduler
+    
+    db_path = str(tmp_path / "schedule.db")
+    db = VotingDatabase(db_path)
+    db.add_proposal(100, "Upcoming", "creator", "2999-10-19 12:00:00")
+    db.add_proposal(101, "Long over", "creator", "2001-01-01 00:00:00")
+    
+    original_tz = os.environ.get('TZ')
+    os.environ['TZ'] = 'America/New_York'
+    time.tzset()
+    try:
+        scheduler = ReminderScheduler(None, db_path=db_path, reminder_offsets=[1])
+        scheduler.seed_from_proposals()
+        scheduler.schedule_proposal(3, "2999-10-19 12:00:00")
+    finally:
+        if original_tz is None:
+            os.environ.pop('TZ')
+        else:
+            os.environ['TZ'] = original_tz
+        time.tzset()
+    
+    conn = sqlite3.connect(db_path)
+    jobs = conn.execute('''
+        SELECT proposal_id, kind, fire_at, status FROM notification_schedule ORDER BY proposal_id, kind
+    ''').fetchall()
+    conn.close()
+    assert [job[2] for job in jobs[0:2]] == [job[2] for job in jobs[4:6]] == [32497326000, 32497329600]
+    assert {job[3] for job in jobs[2:4]} == {'skipped'}
+    assert {job[3] for job in jobs[0:2] + jobs[4:6]} == {'pending'}
+    print("✅ Scheduler timezone tests passed")
+
+def test_vote_tokens_cannot_be_replayed():
+    """Test used tokens stay rejected for their whole validity and a full cache drops the one closest to expiry"""
+    import time
+    from config import VOTE_TOKEN_MAX_AGE, VOTE_TOKEN_CLOCK_SKEW
+    from security import SecurityManager, ReplayCache
+    
+    cache = ReplayCache(max_entries=2)
+    manager = SecurityManager("test-key", replay_cache=cache)
+    assert manager.replay_cache is cache
+    
+    # A token dated ahead of this host stays cached until it could no longer verify
+    issued_at = str(int(time.time()) + VOTE_TOKEN_CLOCK_SKEW - 5)
+    ahead = f"{issued_at}.{manager._sign('VOTER', 1, issued_at)}"
+    assert manager.verify_vote_token(ahead, 'VOTER', 1)
+    assert not manager.verify_vote_token(ahead, 'VOTER', 1)
+    assert list(cache.entries.values()) == [int(issued_at) + VOTE_TOKEN_MAX_AGE + VOTE_TOKEN_CLOCK_SKEW]
+    
+    tokens = [manager.generate_vote_token('VOTER', proposal) for proposal in (2, 3)]
+    items = iter([(tokens[0], 'VOTER', 2), (None, 'VOTER', 2), ("\u00b2." + "0" * 64, 'VOTER', 2)])
+    assert manager.verify_many(items) == [True, False, False]
+    
+    # The full cache makes room by dropping tokens[0], which expires before the token dated ahead
+    assert manager.verify_vote_token(tokens[1], 'VOTER', 3)
+    assert not manager.verify_vote_token(tokens[1], 'VOTER', 3)
+    assert not manager.verify_vote_token(ahead, 'VOTER', 1)
+    assert len(cache) == 2 and cache.full
+    print("✅ Vote token replay tests passed")
+
+def test_backup_snapshot_matches_exported_rows(tmp_path):
+    """Test a write landing mid-backup is in neither the snapshot nor the chunks, and the next run picks it up"""
+    import json
+    from schema import VotingDatabase
+    from backup import DataBackup, file_checksum
+    
+    db_path = str(tmp_path / "live.db")
+    db = VotingDatabase(db_path)
+    for i in range(5):
+        db.record_vote(1, f"voter{i}", 'yes', f"TX{i}")
+    
+    class RacingBackup(DataBackup):
+        def snapshot_database(self, target_dir, source=None):
+            snapshot = super().snapshot_database(target_dir, source)
+            db.record_vote(1, "late", 'no', "TX-late")
+            return snapshot
+    
+    manifest_path = RacingBackup(db_path, backup_dir=str(tmp_path / "backups"), chunk_rows=2).full_backup(incremental=True)
+    backup_dir = os.path.dirname(manifest_path)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    votes = manifest['tables']['votes']
+    assert votes['rows'] == 5 and len(votes['chunks']) == 3
+    assert all(file_checksum(os.path.join(backup_dir, chunk['file'])) == chunk['sha256'] for chunk in votes['chunks'])
+    snapshot = sqlite3.connect(os.path.join(backup_dir, manifest['snapshot']['file']))
+    assert snapshot.execute("SELECT COUNT(*) FROM votes").fetchone()[0] == 5
+    snapshot.close()
+    
+    with open(DataBackup(db_path, backup_dir=str(tmp_path / "backups")).backup_votes()) as f:
+        assert json.load(f)['tables']['votes']['rows'] == 1
+    print("✅ Backup consistency tests passed")
+
+def test_restore_round_trips_migrated_database(tmp_path):
+    """Test a full plus incremental backup of a migrated database restores every column and index"""
+    from migrate import DatabaseMigration
+    from schema import VotingDatabase
+    from backup import DataBackup
+    from restore import DataRestore
+    
+    db_path = str(tmp_path / "live.db")
+    backup_dir = str(tmp_path / "backups")
+    assert DatabaseMigration(db_path).run_migrations()
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO proposals (app_id, title, description, creator) VALUES (7, 'Upgrade', 'Details', 'ADMIN')")
+    conn.commit()
+    conn.close()
+    db = VotingDatabase(db_path)
+    db.record_vote(1, "voter1", 'yes', "TX1", confirmed_round=10)
+    
+    backup = DataBackup(db_path, backup_dir=backup_dir, chunk_rows=1)
+    assert backup.full_backup()
+    db.record_vote(1, "voter2", 'no', "TX2", confirmed_round=11)
+    assert backup.backup_votes()
+    
+    restored_path = str(tmp_path / "restored.db")
+    assert DataRestore(restored_path, workers=2).restore(backup_dir) == {'proposals': 1, 'votes': 2}
+    
+    restored = sqlite3.connect(restored_path)
+    assert restored.execute("SELECT app_id, description FROM proposals").fetchall() == [(7, 'Details')]
+    assert restored.execute("SELECT tx_id, confirmed_round FROM votes ORDER BY id").fetchall() == [("TX1", 10), ("TX2", 11)]
+    indexes = {row[0] for row in restored.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    restored.close()
+    assert {'idx_votes_proposal', 'idx_votes_round'} <= indexes
+    print("✅ Backup restore round-trip tests passed")
+
+def test_migrations_run_transactionally_and_roll_back(tmp_path):
+    """Test a failing migration leaves no partial schema and rollbacks undo versions"""
+    from migrate import DatabaseMigration
+    
+    db_path = str(tmp_path / "migrate.db")
+    migration = DatabaseMigration(db_path)
+    assert migration.run_migrations()
+    current = migration.get_current_version()
+    
+    def migration_broken(cursor):
+        cursor.execute('CREATE TABLE half_done (id INTEGER)')
+        raise RuntimeError("boom")
+    migration.migrations.append(migration_broken)
+    assert not migration.run_migrations()
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+    assert migration.get_current_version() == current
+    
+    migration.migrations[-1] = lambda cursor: cursor.execute('CREATE TABLE scratch (id INTEGER PRIMARY KEY)')
+    assert migration.run_migrations()
+    assert migration.get_current_version() == current + 1
+    
+    migration.rollbacks[current + 1] = lambda cursor: cursor.execute('DROP TABLE scratch')
+    assert migration.rollback_migration(3)
+    assert migration.get_current_version() == 3
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    conn.close()
+    assert 'audit_log' in tables and not tables & {'scratch', 'user_preferences', 'notification_subscriptions'}
+    assert 'idx_votes_round' not in tables
+    print("✅ Migration transaction and rollback tests passed")
+
+class FlakyTracker:
+    """Confirmation tracker whose first registration fails, as when algod status() errors"""
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.failed = False
+    
+    def register_transaction(self, txn, tx_id=None, wait_rounds=None):
+        if not self.failed:
+            from algosdk.error import AlgodHTTPError
+            self.failed = True
+            raise AlgodHTTPError("status unavailable", 503)
+        return self.tracker.register_transaction(txn, tx_id=tx_id, wait_rounds=wait_rounds)
+
+def test_bulk_votes_confirm_and_are_never_resent(tmp_path):
+    """Test bulk votes confirm in groups and a tracking failure after send does not resubmit the group"""
+    import csv
+    import io
+    import json
+    from urllib.request import urlopen
+    from algod_standin import start
+    from bulk import BulkSubmitter, RESULT_FIELDS
+    from schema import VotingDatabase
+    
+    url, stop = start(block_time=0.1)
+    algod_client = algod.AlgodClient("", url)
+    keys = dict(reversed(account.generate_account()) for _ in range(5))
+    db = VotingDatabase(str(tmp_path / "bulk.db"))
+    db.add_proposal(77, "Upgrade", "ADMIN", None)
+    records = [{'voter_address': address, 'vote_option': 'YES', 'proposal_id': '1'} for address in keys]
+    try:
+        out = io.StringIO()
+        stats = BulkSubmitter(algod_client, keys, group_size=2, max_pending=8).cast_votes(
+            records + [{'voter_address': 'nobody', 'vote_option': 'yes', 'proposal_id': '1'}],
+            csv.DictWriter(out, RESULT_FIELDS), db=db
+        )
+        assert (stats['confirmed'], stats['failed']) == (5, 1)
+        
+        submitter = BulkSubmitter(algod_client, keys, group_size=2, max_pending=8)
+        submitter.tracker = FlakyTracker(submitter.tracker)
+        out = io.StringIO()
+        submitter.cast_votes(records, csv.DictWriter(out, RESULT_FIELDS), app_id=78, db=db)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue()), RESULT_FIELDS))
+        assert sorted(row['status'] for row in rows) == ['confirmed'] * 4 + ['unconfirmed']
+        assert all(row['tx_id'] for row in rows)
+        with urlopen(url + "/stats") as response:
+            assert json.load(response)['submitted'] == 10
+    finally:
+        stop()
+    print("✅ Bulk submission tests passed")
+
+def test_bulk_instances_record_their_own_titles(tmp_path):
+    """Test each deployed instance is opened and stored with the title and voting end of its row"""
+    import csv
+    import io
+    import json
+    import time
+    import urllib.request
+    from algod_standin import start
+    from bulk import BulkSubmitter, RESULT_FIELDS
+    from config import DEFAULT_VOTING_PERIOD
+    from scheduler import to_timestamp
+    from schema import VotingDatabase
+    from voting_contract import TEMPLATE_PLACEHOLDERS
+    
+    template = b"\x08\x26\x03" + b"".join(
+        bytes([len(placeholder)]) + placeholder for placeholder in TEMPLATE_PLACEHOLDERS.values()
+    ) + b"\x81\x01\x43"
+    url, stop = start(block_time=0.1)
+    private_key, sender = account.generate_account()
+    db = VotingDatabase(str(tmp_path / "instances.db"))
+    # The invalid first row is reported without shifting the rows after it
+    records = [{'title': ''}, {'title': 'First', 'duration': '2'}, {'title': 'Second'}]
+    try:
+        out = io.StringIO()
+        submitter = BulkSubmitter(algod.AlgodClient("", url), {sender: private_key}, group_size=1)
+        stats = submitter.deploy_instances(records, csv.DictWriter(out, RESULT_FIELDS), template, b"\x08\x81\x01",
+                                           sender, db=db)
+        assert (stats['confirmed'], stats['failed']) == (2, 1)
+        # Two creations and the create_proposal call opening each of them
+        with urllib.request.urlopen(url + "/stats") as response:
+            assert json.loads(response.read())['submitted'] == 4
+    finally:
+        stop()
+    
+    rows = {row['row']: row for row in csv.DictReader(io.StringIO(out.getvalue()), RESULT_FIELDS)}
+    proposals = {proposal['app_id']: proposal for proposal in db.list_proposals()}
+    assert rows['1']['status'] == 'invalid'
+    first, second = (proposals[int(rows[row]['app_id'])] for row in ('2', '3'))
+    assert (first['title'], second['title']) == ('First', 'Second')
+    assert abs(to_timestamp(first['voting_end']) - (time.time() + 2 * 3600)) < 60
+    assert abs(to_timestamp(second['voting_end']) - (time.time() + DEFAULT_VOTING_PERIOD)) < 60
+    print("✅ Bulk instance deployment tests passed")
+
+def _api_client(tmp_path, algod_url):
+    """Flask test client for api.py backed by a temporary database and an algod stand-in"""
+    pytest.importorskip("flask")
+    import api
+    from rate_limiter import RateLimiter
+    from schema import VotingDatabase
+    
+    db = VotingDatabase(str(tmp_path / "api.db"))
+    db.add_proposal(77, "Upgrade", "ADMIN", None)
+    return api.create_app(limiter=RateLimiter(), algod_client=algod.AlgodClient("", algod_url), db=db).test_client()
+
+def test_vote_endpoint_relays_only_the_stated_vote(tmp_path, monkeypatch):
+    """Test /api/vote refuses signed transactions other than the voter's call of the proposal's app"""
+    from algosdk import encoding, transaction
+    from algod_standin import start
+    
+    url, stop = start(block_time=0.1)
+    try:
+        client = _api_client(tmp_path, url)
+        # An app built without a database opens none until a request needs it, so forked workers open their own
+        from api import create_app
+        monkeypatch.chdir(tmp_path)
+        assert create_app().extensions['db'] is None and not (tmp_path / "voting_data.db").exists()
+        private_key, address = account.generate_account()
+        params = algod.AlgodClient("", url).suggested_params()
+        signed = lambda txn: encoding.msgpack_encode(txn.sign(private_key))
+        vote = lambda app_id, option: transaction.ApplicationCallTxn(address, params, app_id, 0, app_args=["vote", option])
+        body = {'proposal_id': 1, 'vote_option': 'yes', 'voter_address': address}
+        
+        for txn, error in [(transaction.PaymentTxn(address, params, address, 1), "not a vote call"),
+                           (vote(78, "yes"), "stated proposal"), (vote(77, "no"), "stated vote")]:
+            response = client.post('/api/vote', json=dict(body, signed_txn=signed(txn)))
+            assert response.status_code == 400 and error in response.get_json()['error']
+        
+        response = client.post('/api/vote', json=dict(body, signed_txn=signed(vote(77, "yes"))))
+        assert response.status_code == 200 and response.get_json()['status'] == 'submitted'
+    finally:
+        stop()
+    print("✅ Vote endpoint tests passed")
+
+def test_vote_batch_uses_quota_only_for_sent_votes(tmp_path):
+    """Test /api/votes/batch leaves the quota of votes it does not send untouched"""
+    from algosdk import encoding, transaction
+    from algod_standin import start
+    
+    url, stop = start(block_time=0.1)
+    try:
+        client = _api_client(tmp_path, url)
+        limiter = client.application.extensions['rate_limiter']
+        params = algod.AlgodClient("", url).suggested_params()
+        accounts = [account.generate_account() for _ in range(3)]
+        (key_a, voter_a), (key_b, voter_b), (key_c, voter_c) = accounts
+        vote = lambda voter, note=None: transaction.ApplicationCallTxn(voter, params, 77, 0, app_args=["vote", "yes"],
+                                                                       note=note)
+        item = lambda key, txn: {'proposal_id': 1, 'vote_option': 'yes', 'voter_address': txn.sender,
+                                 'signed_txn': encoding.msgpack_encode(txn.sign(key))}
+        
+        # voter_b already voted this hour, so the group of a and b is held back
+        assert limiter.is_allowed(voter_b, 'vote')
+        group = transaction.assign_group_id([vote(voter_a), vote(voter_b)])
+        batch = [item(key_a, group[0]), item(key_b, group[1]), item(key_c, vote(voter_c))]
+        results = client.post('/api/votes/batch', json={'votes': batch}).get_json()['results']
+        assert [result['status'] for result in results] == ['rejected', 'rate_limited', 'submitted']
+        assert limiter.get_remaining_requests(voter_a, 'vote') == 1
+        assert limiter.get_remaining_requests(voter_c, 'vote') == 0
+        
+        # The same voter twice in one batch only has quota for the first
+        batch = [item(key_a, vote(voter_a)), item(key_a, vote(voter_a, note=b"again"))]
+        results = client.post('/api/votes/batch', json={'votes': batch}).get_json()['results']
+        assert [result['status'] for result in results] == ['submitted', 'rate_limited']
+    finally:
+        stop()
+    print("✅ Vote batch rate limit tests passed")
+
+def test_vote_quota_reservations_are_all_or_nothing():
+    """Test both limiters reserve a group's quota whole or not at all, and take refunds back"""
+    from rate_limiter import RateLimiter
+    from shared_state import SharedRateLimiter
+    
+    limits = {'vote': {'count': 2, 'window': 10 ** 9}}
+    local = RateLimiter()
+    local.limits = limits
+    for limiter in (local, SharedRateLimiter(limits=limits, slots=64, stripes=4)):
+        # b needs two of its two, so the group fits once
+        assert limiter.reserve_all(["a", "b", "b"], 'vote') == [True, True, True]
+        assert limiter.reserve_all(["a", "b"], 'vote') == [True, False]
+        assert limiter.get_remaining_requests("a", 'vote') == 1
+        
+        limiter.refund("b", 'vote')
+        assert limiter.reserve_all(["a", "b"], 'vote') == [True, True]
+        assert limiter.get_remaining_requests("a", 'vote') == 0
+        assert limiter.get_remaining_requests("b", 'vote') == 0
+    print("✅ Vote quota reservation tests passed")
+
+def _hammer_shared_state(limiter, counters, worker, calls):
+    for _ in range(calls):
+        counters.increment('calls')
+        if limiter.is_allowed("shared", 'vote'):
+            counters.increment('allowed')
+        limiter.is_allowed(f"worker{worker}", 'vote')
+
+def test_shared_state_is_exact_across_processes():
+    """Test forked workers share one rate limit table and one set of counters"""
+    import multiprocessing
+    from shared_state import SharedCounters, SharedRateLimiter
+    
+    # Few slots and stripes, so keys from different workers share stripe locks and probe chains
+    limiter = SharedRateLimiter(limits={'vote': {'count': 50, 'window': 10 ** 9}}, slots=64, stripes=4)
+    counters = SharedCounters(['calls', 'allowed'])
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_hammer_shared_state, args=(limiter, counters, i, 40)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    assert [worker.exitcode for worker in workers] == [0, 0, 0, 0]
+    
+    assert counters.snapshot() == {'calls': 160, 'allowed': 50}
+    assert limiter.get_remaining_requests("shared", 'vote') == 0
+    assert all(limiter.get_remaining_requests(f"worker{i}", 'vote') == 10 for i in range(4))
+    assert limiter.get_stats() == {'total_requests_tracked': 210, 'limits_configured': 1,
+                                   'active_limits': 5, 'table_slots': 64}
+    
+    assert limiter.clear_user_limits("shared")
+    assert limiter.get_remaining_requests("shared", 'vote') == 50
+    assert limiter.get_remaining_requests("worker0", 'vote') == 10
+    print("✅ Shared state tests passed")
+
+def test_load_report_counts_refused_votes():
+    """Test the load report counts 4xx refusals as errors and shows what happened to each vote"""
+    from loadgen import EndpointStats, LoadGenerator
+    
+    stats = EndpointStats()
+    for status, body in [(200, b'{"status": "submitted"}'), (400, b'{"error": "Unknown proposal"}'),
+                         (429, b'{"error": "Rate limit exceeded"}'), ('error', None)]:
+        stats.record(status, 0.01, 1.0, outcomes=LoadGenerator._outcomes(status, body, 1))
+    
+    summary = stats.summary(1.0)
+    assert summary['error_rate'] == 0.5 and summary['rate_limited'] == 1
+    assert summary['item_outcomes'] == {'failed': 2, 'rate_limited': 1, 'submitted': 1}
+    
+    # A batch is a 200 whatever happened to its votes, so each vote's status is counted
+    batch = b'{"results": [{"status": "submitted"}, {"status": "invalid"}, {"status": "rate_limited"}], "submitted": 1}'
+    assert LoadGenerator._outcomes(200, batch, 3) == {'submitted': 1, 'failed': 1, 'rate_limited': 1}
+    print("✅ Load report tests passed")
+
+def test_benchmark_compare_ignores_noise():
+    """Test baseline comparison only flags slowdowns beyond the noise band"""
+    from benchmark import compare
+    
+    baseline = {
+        'steady': {'median_ns': 100.0, 'mad_ns': 1.0},
+        'noisy': {'median_ns': 100.0, 'mad_ns': 20.0}
+    }
+    current = {
+        'steady': {'median_ns': 130.0, 'mad_ns': 1.0},
+        'noisy': {'median_ns': 130.0, 'mad_ns': 20.0},
+        'new': {'median_ns': 50.0, 'mad_ns': 1.0}
+    }
+    
+    regressions = compare(baseline, current, threshold=0.10)
+    assert [name for name, *_ in regressions] == ['steady']
+    print("✅ Benchmark comparison tests passed")
+
+def test_list_proposals_keyset_pages(tmp_path):
+    """Test proposal pages follow the id cursor and respect filters"""
+    from schema import VotingDatabase
+    
+    db = VotingDatabase(str(tmp_path / "proposals.db"))
+    for i in range(10):
+        db.add_proposal(100 + i, f"Proposal {i}", f"creator{i % 2}", None)
+    
+    first = db.list_proposals(creator="creator0", limit=3)
+    assert [p['id'] for p in first] == [9, 7, 5]
+    rest = db.list_proposals(creator="creator0", after_id=first[-1]['id'], limit=3)
+    assert [p['id'] for p in rest] == [3, 1]
+    assert [p['id'] for p in db.list_proposals(descending=False, after_id=8)] == [9, 10]
+    print("✅ Proposal pagination tests passed")
+
+def test_export_pages_filter_by_round(tmp_path):
+    """Test export pages cover every matching row once, in id order"""
+    from schema import VotingDatabase
+    
+    db = VotingDatabase(str(tmp_path / "export.db"))
+    for i in range(25):
+        db.record_vote(i % 2, f"voter{i}", 'yes', f"TX{i}", confirmed_round=100 + i)
+    
+    pages = list(db.iter_export_pages('votes', proposal_id=0, min_round=105, max_round=120, page_size=3))
+    ids = [row[0] for _, rows in pages for row in rows]
+    assert ids == [7, 9, 11, 13, 15, 17, 19, 21]
+    assert all(len(rows) <= 3 for _, rows in pages)
+    assert pages[0][0][-1] == 'confirmed_round'
+    print("✅ Export paging tests passed")
+
+def test_columnar_export_is_incremental(tmp_path):
+    """Test repeated Parquet exports append only new votes and rollups stay exact"""
+    pytest.importorskip("pyarrow")
+    from schema import VotingDatabase
+    from columnar_export import ColumnarExporter
+    from analytics import VotingAnalytics
+    
+    db_path = str(tmp_path / "history.db")
+    export_dir = str(tmp_path / "columnar")
+    db = VotingDatabase(db_path)
+    exporter = ColumnarExporter(db_path, export_dir)
+    analytics = VotingAnalytics(db_path)
+    
+    for i in range(6):
+        db.record_vote(1 + i % 2, f"voter{i % 4}", 'yes', f"TX{i}")
+    assert exporter.run_export()['votes']['rows'] == 6
+    db.record_vote(1, "voter9", 'no', "TX6")
+    assert exporter.run_export()['votes']['rows'] == 1
+    
+    votes = analytics.load_columnar('votes', ['id'], proposal_id=1, export_dir=export_dir)
+    assert sorted(votes['id'].to_pylist()) == [1, 3, 5, 7]
+    rollup = analytics.load_columnar('daily_votes', ['votes'], proposal_id=1, export_dir=export_dir)
+    assert sum(rollup['votes'].to_pylist()) == 4
+    print("✅ Columnar export tests passed")
+
+def test_optimized_contract_matches_and_is_cheaper():
+    """Test the optimized program enforces the same vote rules at lower cost"""
+    from pyteal import compileTeal, Mode
+    from voting_contract import voting_contract, voting_contract_optimized
+    from exceptions import ProgramRejectedError
+    from teal_cost import execute, opt_in
+    from vote import decode_results
+    from state_decoder import VoteTally
+    
+    costs = []
+    for contract in (voting_contract, voting_contract_optimized):
+        teal = compileTeal(contract(), Mode.Application, version=8)
+        global_state, local_state = {}, {}
+        run = lambda sender, args, **kwargs: execute(
+            teal, sender, args, global_state=global_state, local_state=local_state, **kwargs
+        )
+        run("ADMIN", [], app_id=0)
+        opt_in(teal, "ADMIN", local_state)
+        opt_in(teal, "VOTER", local_state)
+        opt_in(teal, "ABSTAINER", local_state)
+        run("ADMIN", ["create_proposal", "Upgrade"], timestamp=1000)
+        
+        # The first and the last option, as later options cost more comparisons to find
+        costs.append([run(voter, ["vote", option], timestamp=2000)['cost']
+                      for voter, option in (("VOTER", "yes"), ("ABSTAINER", "abstain"))])
+        assert VoteTally.from_global_state(1, 0, global_state).results == {
+            'yes': 1, 'no': 0, 'abstain': 1, 'total_votes': 2
+        }
+        with pytest.raises(ProgramRejectedError):
+            run("VOTER", ["vote", "no"], timestamp=2000)
+        
+        opt_in(teal, "LATE", local_state)
+        with pytest.raises(ProgramRejectedError):
+            run("LATE", ["vote", "no"], timestamp=1000 + 86400)
+        run("ADMIN", ["close_voting"])
+        with pytest.raises(ProgramRejectedError):
+            run("LATE", ["vote", "no"], timestamp=2000)
+    
+    # The optimized program packs its tallies and returns them from get_results
+    logs = run("ADMIN", ["get_results"])['logs']
+    assert decode_results(logs[-1]) == {'yes': 1, 'no': 0, 'abstain': 1, 'total_votes': 2}
+    assert all(optimized < original for original, optimized in zip(*costs))
+    
+    # An opcode the model has no cost for is an error in the model, not a rejected program
+    with pytest.raises(ValueError, match="not modelled"):
+        execute("#pragma version 8\nbyte 0x00\nsha256\nreturn", "ADMIN")
+    print(f"✅ Optimized contract tests passed ({costs[0]} -> {costs[1]} opcodes per vote)")
+
+class FakeAlgodState:
+    """Algod stand-in serving one app's global state in the original layout"""
+    def __init__(self):
+        self.fetches = 0
+    
+    def status(self):
+        return {'last-round': 42}
+    
+    def application_info(self, app_id):
+        self.fetches += 1
+        encode = lambda key: base64.b64encode(key).decode()
+        return {'params': {'global-state': [
+            {'key': encode(b"votes_yes"), 'value': {'type': 2, 'uint': 7}},
+            {'key': encode(b"total_votes"), 'value': {'type': 2, 'uint': 9}},
+            {'key': encode(b"active"), 'value': {'type': 2, 'uint': 1}}
+        ]}}
+
+def test_state_decoder_shares_one_decode_per_round():
+    """Test readers in one round share a single fetch and typed decode"""
+    from state_decoder import StateDecoder
+    
+    algod_client = FakeAlgodState()
+    decoder = StateDecoder(algod_client)
+    tallies = [decoder.tally(5) for _ in range(10)]
+    
+    assert algod_client.fetches == 1
+    assert all(tally is tallies[0] for tally in tallies)
+    assert tallies[0].results == {'yes': 7, 'no': 0, 'abstain': 0, 'total_votes': 9}
+    assert tallies[0].active and tallies[0].round == 42
+    decoder.tally(5, round=43)
+    assert algod_client.fetches == 2
+    print("✅ State decoder tests passed")
+
+def test_endpoint_pool_prefers_fastest_and_fails_over():
+    """Test reads go to the fastest stand-in, groups pin to one node and a stopped node is skipped"""
+    from algosdk import transaction
+    from algod_standin import start
+    from endpoints import EndpointPool, TimeoutAlgodClient
+    
+    nodes = [start(read_latency=0.05), start(), start(read_latency=0.02)]
+    pool = EndpointPool([url for url, _ in nodes], probe_interval=60, timeout=2)
+    try:
+        pool.start()
+        assert pool.ranked()[0].url == nodes[1][0]
+        algod_client = pool.client()
+        
+        private_key, address = account.generate_account()
+        params = algod_client.suggested_params()
+        txns = transaction.assign_group_id([transaction.PaymentTxn(address, params, address, i) for i in range(3)])
+        algod_client.send_transactions([txn.sign(private_key) for txn in txns])
+        assert {pool.pinned(txn.get_txid()).url for txn in txns} == {nodes[1][0]}
+        
+        with pytest.raises(OSError):
+            TimeoutAlgodClient("", nodes[0][0], timeout=0.01).status()
+        
+        nodes[1][1]()
+        assert algod_client.status()['last-round'] >= 1
+        assert [endpoint.url for endpoint in pool.ranked()] == [nodes[2][0], nodes[0][0], nodes[1][0]]
+    finally:
+        pool.stop()
+        for _, stop in nodes:
+            stop()
+    print("✅ Endpoint pool tests passed")
+
+def test_algod_urls_are_configured_per_network(monkeypatch):
+    """Test each network reads only its own list of algod nodes"""
+    from config import ContractConfig, ALGORAND_MAINNET_URL
+    
+    monkeypatch.delenv("ALGOD_URL", raising=False)
+    monkeypatch.delenv("ALGOD_URLS_MAINNET", raising=False)
+    monkeypatch.setenv("ALGOD_URLS_TESTNET", "http://node-a:4001, http://node-b:4001")
+    assert ContractConfig("testnet").algod_urls == ["http://node-a:4001", "http://node-b:4001"]
+    assert ContractConfig("mainnet").algod_urls == [ALGORAND_MAINNET_URL]
+    print("✅ Network configuration tests passed")
+
+def test_patch_program_fills_template_placeholders():
+    """Test per-instance parameters replace the template placeholders without moving code"""
+    from pyteal import compileTeal, Mode
+    from voting_contract import voting_contract_template, TEMPLATE_PLACEHOLDERS
+    from deploy import patch_program
+    
+    teal = compileTeal(voting_contract_template(), Mode.Application, version=8)
+    assert all(placeholder.hex() in teal for placeholder in TEMPLATE_PLACEHOLDERS.values())
+    
+    # bytecblock of the three placeholders, then "pushint 1; return"
+    template = b"\x08\x26\x03" + b"".join(
+        bytes([len(placeholder)]) + placeholder for placeholder in TEMPLATE_PLACEHOLDERS.values()
+    ) + b"\x81\x01\x43"
+    _, admin = account.generate_account()
+    program = patch_program(template, admin, voting_period=3600, min_votes=3)
+    
+    assert len(program) == len(template)
+    assert (3600).to_bytes(8, 'big') in program and (3).to_bytes(8, 'big') in program
+    assert b"TMPL" not in program and program.endswith(b"\x81\x01\x43")
+    with pytest.raises(ValueError):
+        patch_program(program, admin)
+    print("✅ Template patching tests passed")
+
+def test_signing_pool_matches_algosdk_signatures():
+    """Test pooled signing yields the same bytes as algosdk, including rekeyed senders"""
+    from algosdk import encoding, transaction
+    from signing import SigningPool, decode_keys, sign_encoded
+    
+    private_key, address = account.generate_account()
+    rekeyed_key, rekeyed_address = account.generate_account()
+    params = transaction.SuggestedParams(1000, 1, 1000, base64.b64encode(bytes(32)).decode(), flat_fee=True)
+    txns = [
+        transaction.ApplicationCallTxn(address, params, 1, transaction.OnComplete.NoOpOC, app_args=["vote", "yes"]),
+        transaction.PaymentTxn(address, params, rekeyed_address, 1000, note=b"x" * 300)
+    ]
+    expected = [base64.b64decode(encoding.msgpack_encode(txn.sign(private_key))) for txn in txns]
+    
+    with SigningPool({address: private_key}, workers=2, chunk_size=1) as pool:
+        assert pool.sign(txns) == expected
+        with pytest.raises(KeyError):
+            pool.sign([transaction.PaymentTxn(rekeyed_address, params, address, 1)])
+    
+    authorizer = decode_keys({rekeyed_address: rekeyed_key})[rekeyed_address]
+    assert sign_encoded(txns[:1], {address: authorizer}) == [
+        base64.b64decode(encoding.msgpack_encode(txns[0].sign(rekeyed_key)))
+    ]
+    print("✅ Signing pool tests passed")
+
+def test_vote_template_encodes_like_algosdk():
+    """Test template encodings, group ids and signatures are byte-identical to algosdk's"""
+    from algosdk import encoding, transaction
+    from txn_templates import VoteTxnTemplate, txid
+    
+    # A per-byte fee makes the fee depend on the encoded size
+    params = transaction.SuggestedParams(3, 1000, 2000, base64.b64encode(bytes(range(32))).decode(), gen="testnet-v1.0")
+    template = VoteTxnTemplate(42, params)
+    accounts = [account.generate_account() for _ in range(3)]
+    votes = [(address, option) for (_, address), option in zip(accounts, ["yes", "no", "abstain"])]
+    txns = [transaction.ApplicationCallTxn(address, params, 42, 0, app_args=["vote", option]) for address, option in votes]
+    encode = lambda obj: base64.b64decode(encoding.msgpack_encode(obj))
+    
+    assert template.encode(*votes[0]) == encode(txns[0])
+    assert txid(template.encode(*votes[0])) == txns[0].get_txid()
+    assert template.sign(accounts[0][0], "yes") == encode(txns[0].sign(accounts[0][0]))
+    
+    grouped = template.encode_group(votes)
+    transaction.assign_group_id(txns)
+    assert grouped == [encode(txn) for txn in txns]
+    print("✅ Vote template tests passed")
+
+def test_cast_vote_sends_from_shared_templates(monkeypatch):
+    """Test vote.cast_vote signs from the endpoint's cached template and its vote confirms under that id"""
+    from algod_standin import start
+    from exceptions import InvalidVoteError
+    from txn_templates import get_vote_templates
+    from vote import cast_vote
+    
+    url, stop = start(block_time=0.1)
+    try:
+        algod_client = algod.AlgodClient("", url)
+        for option in ("yes", "abstain"):
+            private_key, _ = account.generate_account()
+            monkeypatch.setenv("PRIVATE_KEY", private_key)
+            tx_id = cast_vote(77, option, algod_client=algod_client)
+            # The stand-in keys confirmations by the id it computes from the bytes it received
+            assert algod_client.pending_transaction_info(tx_id)['confirmed-round'] > 0
+        
+        assert list(get_vote_templates(algod_client).templates) == [77]
+        with pytest.raises(InvalidVoteError):
+            cast_vote(77, "maybe", algod_client=algod_client)
+    finally:
+        stop()
+    print("✅ Templated vote casting tests passed")
+
 if __name__ == "__main__":
     test_contract_deployment()
     test_vote_validation()
@@ -0,0 +1,194 @@
+"""
+Pre-encoded vote transaction templates for repeated app calls
+"""
+
+import argparse
+import base64
+import json
+import threading
+import time
+import msgpack
+from algosdk import account, constants, encoding, error, transaction
+from nacl.signing import SigningKey
+from logger import setup_logger
+from signing import signed_envelope
+from config import VALID_VOTE_OPTIONS, PARAMS_REFRESH_SECONDS
+
+# Stand-ins encoded into the prototypes; both are 32 bytes so they size the fee like real values
+PLACEHOLDER_ADDRESS = encoding.encode_address(bytes(32))
+PLACEHOLDER_GROUP = b"\x01" * 32
+GRP_PREFIX = msgpack.packb('grp') + b"\xc4\x20"  # key, then bin 8 header of a 32 byte value
+SND_PREFIX = msgpack.packb('snd') + b"\xc4\x20"
+
+def _pairs(fields, keys):
+    return b"".join(msgpack.packb(key) + msgpack.packb(fields[key], use_bin_type=True) for key in keys)
+
+class VoteTxnTemplate:
+    """Canonical msgpack of an app's vote calls, with the invariant fields encoded once
+    
+    The fields shared by every vote in one suggested-params window (app id,
+    fee, validity rounds, genesis, "vote" arg) are encoded per option up
+    front; encode() only splices in the sender, the option and the group id.
+    The output is byte-identical to algosdk's encoding of the same
+    ApplicationCallTxn.
+    """
+    
+    def __init__(self, app_id, params, options=VALID_VOTE_OPTIONS):
+        self.app_id = app_id
+        self.first_valid_round = params.first
+        self.last_valid_round = params.last
+        self.parts = {option: self._encode_parts(app_id, params, option) for option in options}
+    
+    @staticmethod
+    def _encode_parts(app_id, params, option):
+        prototype = transaction.ApplicationCallTxn(
+            sender=PLACEHOLDER_ADDRESS, sp=params, index=app_id,
+            on_complete=transaction.OnComplete.NoOpOC, app_args=["vote", option]
+        )
+        # The fee is sized before the group is set, as for a transaction built by hand
+        prototype.group = PLACEHOLDER_GROUP
+        fields = msgpack.unpackb(base64.b64decode(encoding.msgpack_encode(prototype)), raw=False)
+        
+        # Canonical order is sorted by key, so fields split around grp and snd
+        keys = list(fields)
+        before_grp = [key for key in keys if key < 'grp']
+        between = [key for key in keys if 'grp' < key < 'snd']
+        after_snd = [key for key in keys if key > 'snd']
+        count = len(keys)
+        return (
+            bytes([0x80 | (count - 1)]), bytes([0x80 | count]),
+            _pairs(fields, before_grp), _pairs(fields, between) + SND_PREFIX, _pairs(fields, after_snd)
+        )
+    
+    def encode(self, sender, option, group=None):
+        """Unsigned transaction bytes for one vote; sender is an address or its 32 byte public key"""
+        ungrouped_header, grouped_header, head, middle, tail = self.parts[option]
+        public_key = encoding.decode_address(sender) if isinstance(sender, str) else sender
+        if group is None:
+            return ungrouped_header + head + middle + public_key + tail
+        return grouped_header + head + GRP_PREFIX + group + middle + public_key + tail
+    
+    def encode_group(self, votes):
+        """Unsigned bytes for (sender, option) votes submitted as one atomic group"""
+        encoded = [self.encode(sender, option) for sender, option in votes]
+        if len(encoded) < 2:
+            return encoded
+        if len(encoded) > constants.tx_group_limit:
+            raise error.TransactionGroupSizeError
+        
+        group = group_id(encoded)
+        return [self.encode(sender, option, group) for sender, option in votes]
+    
+    def sign(self, private_key, option, group=None):
+        """Signed transaction bytes for a vote from the key's own account"""
+        raw = base64.b64decode(private_key)
+        encoded = self.encode(raw[constants.key_len_bytes:], option, group)
+        signature = SigningKey(raw[:constants.key_len_bytes]).sign(constants.txid_prefix + encoded).signature
+        return signed_envelope(encoded, signature)
+
+def raw_txid(encoded):
+    return encoding.checksum(constants.txid_prefix + encoded)
+
+def txid(encoded):
+    """Transaction id of unsigned transaction bytes"""
+    return base64.b32encode(raw_txid(encoded)).decode().rstrip("=")
+
+def group_id(encoded_txns):
+    """Group id of unsigned transaction bytes, as transaction.calculate_group_id computes it"""
+    txlist = msgpack.packb({'txlist': [raw_txid(encoded) for encoded in encoded_txns]}, use_bin_type=True)
+    return encoding.checksum(constants.tgid_prefix + txlist)
+
+class VoteTemplates:
+    """Vote templates per app, rebuilt when the suggested params are refreshed"""
+    
+    def __init__(self, algod_client, refresh_seconds=PARAMS_REFRESH_SECONDS):
+        self.logger = setup_logger("txn_templates")
+        self.algod_client = algod_client
+        self.refresh_seconds = refresh_seconds
+        self.templates = {}
+        self.fetched_at = 0
+        self.params = None
+        self.lock = threading.Lock()
+    
+    def get(self, app_id):
+        """Template for the current suggested-params window"""
+        with self.lock:
+            if self.params is None or time.time() - self.fetched_at > self.refresh_seconds:
+                self.params = self.algod_client.suggested_params()
+                self.fetched_at = time.time()
+                self.templates.clear()
+            template = self.templates.get(app_id)
+            if template is None:
+                template = self.templates[app_id] = VoteTxnTemplate(app_id, self.params)
+            return template
+
+_vote_templates = {}
+_vote_templates_lock = threading.Lock()
+
+def get_vote_templates(algod_client):
+    """Get the shared vote templates for an algod endpoint"""
+    key = (algod_client.algod_address, algod_client.algod_token)
+    with _vote_templates_lock:
+        templates = _vote_templates.get(key)
+        if templates is None:
+            templates = _vote_templates[key] = VoteTemplates(algod_client)
+        return templates
+
+def benchmark_encoding(count=20000, group_size=1):
+    """Votes per second encoded (and signed) by building ApplicationCallTxns and from a template"""
+    params = transaction.SuggestedParams(1000, 1000, 2000, base64.b64encode(bytes(32)).decode(),
+                                         gen="testnet-v1.0", flat_fee=True)
+    private_key, address = account.generate_account()
+    votes = [(address, VALID_VOTE_OPTIONS[i % len(VALID_VOTE_OPTIONS)]) for i in range(count)]
+    groups = [votes[i:i + group_size] for i in range(0, count, group_size)]
+    results = {}
+    
+    def build(sender, option):
+        return transaction.ApplicationCallTxn(
+            sender=sender, sp=params, index=1, on_complete=transaction.OnComplete.NoOpOC, app_args=["vote", option]
+        )
+    
+    def algosdk_encode():
+        for group in groups:
+            txns = [build(sender, option) for sender, option in group]
+            if len(txns) > 1:
+                transaction.assign_group_id(txns)
+            for txn in txns:
+                encoding.msgpack_encode(txn)
+    
+    def template_encode():
+        template = VoteTxnTemplate(1, params)
+        for group in groups:
+            template.encode_group(group)
+    
+    def algosdk_sign():
+        for sender, option in votes:
+            encoding.msgpack_encode(build(sender, option).sign(private_key))
+    
+    def template_sign():
+        template = VoteTxnTemplate(1, params)
+        for _, option in votes:
+            template.sign(private_key, option)
+    
+    for name, run in (('algosdk encode', algosdk_encode), ('template encode', template_encode),
+                      ('algosdk sign', algosdk_sign), ('template sign', template_sign)):
+        started = time.perf_counter()
+        run()
+        results[name] = count / (time.perf_counter() - started)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--count", type=int, default=20000, help="Votes encoded per measurement")
+    parser.add_argument("--group-size", type=int, default=1, help="Votes per atomic group")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+    
+    results = benchmark_encoding(args.count, args.group_size)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'path':18s} {'votes/s':>10s} {'speedup':>8s}")
+        for name, rate in results.items():
+            baseline = results['algosdk ' + name.split()[-1]]
+            print(f"{name:18s} {rate:10.0f} {rate / baseline:7.2f}x")
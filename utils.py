@@ -3,17 +3,29 @@ Utility functions for Algorand Voting Contract
 """
 
 import time
+from functools import lru_cache
 from algosdk import encoding
 from algosdk.v2client import algod
 
-def validate_address(address):
-    """Validate Algorand address format"""
+ADDRESS_LENGTH = 58
+ADDRESS_CACHE_SIZE = 65536
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def _check_address(address):
+    """Decode an address and verify its checksum (memoized per address)"""
     try:
         encoding.decode_address(address)
         return True
     except Exception:
         return False
 
+def validate_address(address):
+    """Validate Algorand address format"""
+    # Cheap shape checks first so junk input never reaches the decoder or the cache
+    if not isinstance(address, str) or len(address) != ADDRESS_LENGTH:
+        return False
+    return _check_address(address)
+
 def get_current_timestamp():
     """Get current Unix timestamp"""
     return int(time.time())
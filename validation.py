@@ -4,8 +4,25 @@ Input validation module for voting contract
 
 import re
 from datetime import datetime, timedelta
-from algosdk import encoding
 from logger import setup_logger
+from utils import validate_address
+from config import VALID_VOTE_OPTIONS
+
+# Patterns are compiled once at import; the injection checks run as one alternation
+TITLE_FORBIDDEN_PATTERN = re.compile(r'[<>{}&;]')
+DANGEROUS_CONTENT_PATTERN = re.compile(
+    '|'.join([
+        r'<script.*?>.*?</script>',
+        r'javascript:',
+        r'on\w+\s*=',
+        r'<iframe.*?>',
+        r'<object.*?>'
+    ]),
+    re.IGNORECASE
+)
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+TRANSACTION_ID_PATTERN = re.compile(r'^[A-Z2-7]{52}$')
+SANITIZE_PATTERN = re.compile(r'[<>&"\'`]')
 
 class InputValidator:
     def __init__(self):
@@ -13,15 +30,7 @@ class InputValidator:
     
     def validate_algorand_address(self, address):
         """Validate Algorand address format"""
-        try:
-            if not address or len(address) != 58:
-                return False
-            
-            # Check if address is valid base32
-            encoding.decode_address(address)
-            return True
-        except Exception:
-            return False
+        return validate_address(address)
     
     def validate_proposal_title(self, title):
         """Validate proposal title"""
@@ -32,21 +41,18 @@ class InputValidator:
             return False, "Title too long (max 200 characters)"
         
         # Check for malicious content
-        forbidden_chars = ['<', '>', '{', '}', '&', ';']
-        if any(char in title for char in forbidden_chars):
+        if TITLE_FORBIDDEN_PATTERN.search(title):
             return False, "Title contains forbidden characters"
         
         return True, "Valid title"
     
     def validate_vote_option(self, option):
         """Validate vote option"""
-        valid_options = ['yes', 'no', 'abstain']
-        
         if not option:
             return False, "Vote option required"
         
-        if option.lower() not in valid_options:
-            return False, f"Invalid option. Must be one of: {', '.join(valid_options)}"
+        if option.lower() not in VALID_VOTE_OPTIONS:
+            return False, f"Invalid option. Must be one of: {', '.join(VALID_VOTE_OPTIONS)}"
         
         return True, "Valid vote option"
     
@@ -74,17 +80,8 @@ class InputValidator:
             return False, "Description too long (max 2000 characters)"
         
         # Basic HTML/script injection check
-        dangerous_patterns = [
-            r'<script.*?>.*?</script>',
-            r'javascript:',
-            r'on\w+\s*=',
-            r'<iframe.*?>',
-            r'<object.*?>'
-        ]
-        
-        for pattern in dangerous_patterns:
-            if re.search(pattern, description, re.IGNORECASE):
-                return False, "Description contains potentially dangerous content"
+        if DANGEROUS_CONTENT_PATTERN.search(description):
+            return False, "Description contains potentially dangerous content"
         
         return True, "Valid description"
     
@@ -93,9 +90,7 @@ class InputValidator:
         if not email:
             return False, "Email required"
         
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        
-        if not re.match(pattern, email):
+        if not EMAIL_PATTERN.match(email):
             return False, "Invalid email format"
         
         if len(email) > 254:
@@ -112,12 +107,95 @@ class InputValidator:
             return False, "Invalid transaction ID length"
         
         # Check if it's valid base32
-        try:
-            import base64
-            base64.b32decode(tx_id + '======')
-            return True, "Valid transaction ID"
-        except Exception:
+        if not TRANSACTION_ID_PATTERN.match(tx_id):
             return False, "Invalid transaction ID format"
+        return True, "Valid transaction ID"
+    
+    def validate_batch(self, records, record_type='vote'):
+        """Validate many vote, proposal or contract instance records in one call
+        
+        Returns (valid_records, errors) where each error is a dict with the
+        row index, the offending field and a message.
+        """
+        if record_type == 'vote':
+            checks = (
+                ('voter_address', self._validate_address_field),
+                ('vote_option', self.validate_vote_option),
+                ('proposal_id', self._validate_proposal_id)
+            )
+        elif record_type == 'proposal':
+            checks = (
+                ('title', self.validate_proposal_title),
+                ('description', self.validate_proposal_description),
+                ('duration', self._validate_optional_duration)
+            )
+        elif record_type == 'instance':
+            checks = (
+                ('title', self.validate_proposal_title),
+                ('duration', self._validate_optional_duration),
+                ('min_votes', self._validate_optional_min_votes),
+                ('admin', self._validate_optional_address)
+            )
+        else:
+            raise ValueError(f"Unknown record type: {record_type}")
+        
+        valid_records = []
+        errors = []
+        for row, record in enumerate(records):
+            row_valid = True
+            for field, check in checks:
+                try:
+                    is_valid, message = check(record.get(field))
+                except (TypeError, AttributeError):
+                    is_valid, message = False, f"Invalid {field}"
+                if not is_valid:
+                    errors.append({'row': row, 'field': field, 'error': message})
+                    row_valid = False
+            if row_valid:
+                valid_records.append(record)
+        
+        if errors:
+            self.logger.warning(f"Batch validation: {len(errors)} errors in {row + 1} {record_type} records")
+        return valid_records, errors
+    
+    def _validate_address_field(self, address):
+        if not validate_address(address):
+            return False, "Invalid address"
+        return True, "Valid address"
+    
+    def _validate_proposal_id(self, proposal_id):
+        try:
+            is_valid = not isinstance(proposal_id, bool) and int(proposal_id) >= 1
+        except (TypeError, ValueError):
+            is_valid = False
+        
+        if not is_valid:
+            return False, "Proposal ID must be a positive integer"
+        return True, "Valid proposal ID"
+    
+    def _validate_optional_duration(self, hours):
+        # Bulk files may leave duration blank to use the default voting period
+        if hours is None or hours == '':
+            return True, "Default duration"
+        return self.validate_voting_duration(hours)
+    
+    def _validate_optional_min_votes(self, min_votes):
+        if min_votes is None or min_votes == '':
+            return True, "Default minimum votes"
+        try:
+            is_valid = int(min_votes) >= 0
+        except ValueError:
+            is_valid = False
+        
+        if not is_valid:
+            return False, "Minimum votes must be a non-negative integer"
+        return True, "Valid minimum votes"
+    
+    def _validate_optional_address(self, address):
+        # A blank admin makes the deploying account the admin
+        if address is None or address == '':
+            return True, "Default address"
+        return self._validate_address_field(address)
     
     def sanitize_input(self, text):
         """Sanitize user input"""
@@ -125,7 +203,7 @@ class InputValidator:
             return ""
         
         # Remove potentially dangerous characters
-        sanitized = re.sub(r'[<>&"\'`]', '', str(text))
+        sanitized = SANITIZE_PATTERN.sub('', str(text))
         
         # Limit length
         sanitized = sanitized[:1000]
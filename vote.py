@@ -1,9 +1,14 @@
 from algosdk import account
-from algosdk.v2client import algod
-from algosdk.transaction import ApplicationCallTxn, wait_for_confirmation
+from algosdk.v2client.models import SimulateRequest, SimulateRequestTransactionGroup
+from algosdk.transaction import ApplicationCallTxn, SignedTransaction
+from confirmation import get_confirmation_tracker, wait_for_confirmation
 from utils import validate_address, VotingUtils
 from logger import setup_logger, log_transaction, log_error
-from exceptions import InvalidVoteError, VotingClosedError
+from exceptions import InvalidVoteError, VotingClosedError, VotingContractError
+from config import ContractConfig, ABI_RETURN_PREFIX, VALID_VOTE_OPTIONS
+from state_decoder import RESULTS_RETURN_LAYOUT, unpack_results
+from txn_templates import get_vote_templates, txid
+import base64
 import os
 from dotenv import load_dotenv
 
@@ -12,7 +17,7 @@ load_dotenv()
 def create_proposal(app_id, proposal_title):
     """Create a new voting proposal"""
     
-    algod_client = algod.AlgodClient("", "https://testnet-api.algonode.cloud")
+    algod_client = ContractConfig().algod_client()
     private_key = os.getenv('PRIVATE_KEY')
     sender = account.address_from_private_key(private_key)
     
@@ -29,31 +34,59 @@ def create_proposal(app_id, proposal_title):
     signed_txn = txn.sign(private_key)
     tx_id = algod_client.send_transaction(signed_txn)
     
-    wait_for_confirmation(algod_client, tx_id)
+    wait_for_confirmation(algod_client, tx_id, txn=txn)
     print(f"Proposal '{proposal_title}' created successfully!")
 
-def cast_vote(app_id, vote_option):
-    """Cast a vote on the current proposal"""
+def cast_vote(app_id, vote_option, algod_client=None):
+    """Cast a vote on the current proposal and return its transaction id"""
     
-    algod_client = algod.AlgodClient("", "https://testnet-api.algonode.cloud")
+    if vote_option not in VALID_VOTE_OPTIONS:
+        raise InvalidVoteError(f"Invalid vote option: {vote_option}")
+    
+    algod_client = algod_client or ContractConfig().algod_client()
     private_key = os.getenv('PRIVATE_KEY')
     sender = account.address_from_private_key(private_key)
     
-    params = algod_client.suggested_params()
+    # The app's vote fields are encoded once per suggested-params window; only sender and option change
+    template = get_vote_templates(algod_client).get(app_id)
+    signed_txn = template.sign(private_key, vote_option)
+    tx_id = txid(template.encode(sender, vote_option))
+    algod_client.send_raw_transaction(base64.b64encode(signed_txn).decode())
+    
+    get_confirmation_tracker(algod_client).wait(tx_id, last_valid=template.last_valid_round)
+    print(f"Vote cast for option: {vote_option}")
+    return tx_id
+
+def decode_results(return_value):
+    """Unpack the tallies from get_results' ABI return value"""
+    if not return_value.startswith(ABI_RETURN_PREFIX) or len(return_value) != len(ABI_RETURN_PREFIX) + RESULTS_RETURN_LAYOUT.size:
+        raise ValueError("Not a get_results return value")
+    return unpack_results(return_value[len(ABI_RETURN_PREFIX):])
+
+def get_results(app_id, algod_client=None, sender=None):
+    """Read the packed tallies through one simulated get_results call; nothing is submitted"""
+    algod_client = algod_client or ContractConfig().algod_client()
+    sender = sender or account.address_from_private_key(os.getenv('PRIVATE_KEY'))
     
     txn = ApplicationCallTxn(
         sender=sender,
-        sp=params,
+        sp=algod_client.suggested_params(),
         index=app_id,
         on_complete=0,
-        app_args=["vote", vote_option]
+        app_args=["get_results"]
     )
+    request = SimulateRequest(
+        txn_groups=[SimulateRequestTransactionGroup(txns=[SignedTransaction(txn, None)])],
+        allow_empty_signatures=True
+    )
+    group = algod_client.simulate_transactions(request)['txn-groups'][0]
+    if group.get('failure-message'):
+        raise VotingContractError(f"get_results failed: {group['failure-message']}")
     
-    signed_txn = txn.sign(private_key)
-    tx_id = algod_client.send_transaction(signed_txn)
-    
-    wait_for_confirmation(algod_client, tx_id)
-    print(f"Vote cast for option: {vote_option}")
+    logs = group['txn-results'][0]['txn-result'].get('logs', [])
+    if not logs:
+        raise VotingContractError("get_results returned no value; the app predates packed results")
+    return decode_results(base64.b64decode(logs[-1]))
 
 if __name__ == "__main__":
     app_id = int(input("Enter Application ID: "))
@@ -64,4 +97,4 @@ if __name__ == "__main__":
         create_proposal(app_id, title)
     elif action == "vote":
         option = input("Enter vote option (yes/no): ")
-        cast_vote(app_id, option)
\ No newline at end of file
+        cast_vote(app_id, option.strip().lower())
\ No newline at end of file
@@ -1,4 +1,5 @@
 from pyteal import *
+from config import VALID_VOTE_OPTIONS, VOTING_ACTIVE_FLAG as ACTIVE_FLAG, RESULTS_KEY, ABI_RETURN_PREFIX
 
 def voting_contract():
     """
@@ -58,7 +59,7 @@ def voting_contract():
     # Main program logic
     program = Cond(
         [Txn.application_id() == Int(0), Approve()],  # Contract creation
-        [Txn.on_completion() == OnCall.OptIn, Approve()],  # Opt-in
+        [Txn.on_completion() == OnComplete.OptIn, Approve()],  # Opt-in
         [Txn.application_args[0] == op_create_proposal, create_proposal],
         [Txn.application_args[0] == op_vote, cast_vote],
         [Txn.application_args[0] == op_get_results, get_results],
@@ -67,5 +68,122 @@ def voting_contract():
     
     return program
 
+RESULTS_SIZE = 8 * len(VALID_VOTE_OPTIONS)
+
+def _increment(results, offset):
+    """Packed results with the uint64 at a constant offset increased by one"""
+    return Replace(results, Int(offset), Itob(ExtractUint64(results, Int(offset)) + Int(1)))
+
+def voting_contract_optimized(voting_period=None, min_votes=None, admin=None):
+    """
+    Voting contract with a cheaper vote path
+    
+    Same operations as voting_contract, but voting_end and the active flag
+    share one global ("state" = active << 63 | voting_end), so a single read
+    and comparison admits a vote, and operations are dispatched in order of
+    expected frequency. Tallies live in one packed value (RESULTS_KEY), a
+    uint64 per option; the total is not stored, so a vote updates a single
+    field, and get_results appends it to the ABI (uint64,uint64,uint64,uint64)
+    value it returns. Measure with teal_cost.py.
+    
+    voting_period, min_votes and admin override the 24 hour period, the
+    10 vote minimum and the proposal creator as admin.
+    """
+    
+    # The default period and the active flag fold into one constant
+    active_for = Int(86400 + ACTIVE_FLAG) if voting_period is None else voting_period + Int(ACTIVE_FLAG)
+    min_votes = min_votes if min_votes is not None else Int(10)
+    admin = admin if admin is not None else Txn.sender()
+    
+    # Global state keys
+    proposal_count = Bytes("proposal_count")
+    voting_state = Bytes("state")
+    min_votes_required = Bytes("min_votes")
+    admin_address = Bytes("admin")
+    results_key = Bytes(RESULTS_KEY)
+    voted = Bytes("voted")
+    
+    op = Txn.application_args[0]
+    results = ScratchVar(TealType.bytes)
+    
+    create_app = Seq([
+        App.globalPut(results_key, BytesZero(Int(RESULTS_SIZE))),
+        Approve()
+    ])
+    
+    # Create proposal logic
+    create_proposal = Seq([
+        App.globalPut(proposal_count, App.globalGet(proposal_count) + Int(1)),
+        App.globalPut(voting_state, Global.latest_timestamp() + active_for),  # Active for the voting period
+        App.globalPut(min_votes_required, min_votes),
+        App.globalPut(admin_address, admin),
+        Approve()
+    ])
+    
+    # Vote logic
+    cast_vote = Seq([
+        # With the flag in the top bit, "active and not ended" is one comparison
+        Assert(Global.latest_timestamp() + Int(ACTIVE_FLAG) < App.globalGet(voting_state)),
+        Assert(Txn.application_args.length() == Int(2)),
+        Assert(Not(App.localGet(Txn.sender(), voted))),  # Prevent double voting
+        App.localPut(Txn.sender(), voted, Int(1)),
+        # Only known options are counted, so the packed value keeps its fixed layout
+        results.store(App.globalGet(results_key)),
+        Cond(*[
+            [Txn.application_args[1] == Bytes(option),
+             Seq(App.globalPut(results_key, _increment(results.load(), 8 * index)), Approve())]
+            for index, option in enumerate(VALID_VOTE_OPTIONS)
+        ])
+    ])
+    
+    # Close voting logic
+    close_voting = Seq([
+        Assert(Txn.sender() == App.globalGet(admin_address)),
+        App.globalPut(voting_state, BitwiseAnd(App.globalGet(voting_state), Int(ACTIVE_FLAG - 1))),
+        Approve()
+    ])
+    
+    # Read-only results: the packed tallies logged as an ABI return value, for simulate
+    get_results = Seq([
+        results.store(App.globalGet(results_key)),
+        Log(Concat(
+            Bytes(ABI_RETURN_PREFIX), results.load(),
+            Itob(Add(*[ExtractUint64(results.load(), Int(8 * index)) for index in range(len(VALID_VOTE_OPTIONS))]))
+        )),
+        Approve()
+    ])
+    
+    # Main program logic; calls other than NoOp carry no operation and only opt-in is accepted
+    program = Cond(
+        [Not(Txn.application_id()), create_app],
+        [Txn.on_completion(), Return(Txn.on_completion() == OnComplete.OptIn)],
+        [op == Bytes("vote"), cast_vote],
+        [op == Bytes("get_results"), get_results],
+        [op == Bytes("create_proposal"), create_proposal],
+        [op == Bytes("close_voting"), close_voting]
+    )
+    
+    return program
+
+# Placeholders compiled into the template program and patched per instance; each
+# is a byte constant of its value's final size, so patching never moves code
+TEMPLATE_PLACEHOLDERS = {
+    'TMPL_VOTING_PERIOD': b"TMPL_VPD",
+    'TMPL_MIN_VOTES': b"TMPL_MNV",
+    'TMPL_ADMIN': b"TMPL_ADMIN".ljust(32, b"_")
+}
+
+def voting_contract_template():
+    """Optimized voting contract with voting period, minimum votes and admin left as placeholders"""
+    return voting_contract_optimized(
+        voting_period=Btoi(Bytes(TEMPLATE_PLACEHOLDERS['TMPL_VOTING_PERIOD'])),
+        min_votes=Btoi(Bytes(TEMPLATE_PLACEHOLDERS['TMPL_MIN_VOTES'])),
+        admin=Bytes(TEMPLATE_PLACEHOLDERS['TMPL_ADMIN'])
+    )
+
 if __name__ == "__main__":
-    print(compileTeal(voting_contract(), Mode.Application, version=8))
\ No newline at end of file
+    import sys
+    
+    contract = voting_contract_optimized if '--optimized' in sys.argv else voting_contract
+    contract = voting_contract_template if '--template' in sys.argv else contract
+    print(compileTeal(contract(), Mode.Application, version=8))
\ No newline at end of file